@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -54,7 +55,8 @@ ROOT_URLCONF = 'agenda.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates que informa o tempo de render ao ServerTimingMiddleware
+        'BACKEND': 'core.timing.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -73,13 +75,170 @@ WSGI_APPLICATION = 'agenda.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Ajustes do SQLite para várias threads/processos, aplicados a cada conexão
+# aberta (init_command). WAL: leitores não esperam o escritor. busy_timeout:
+# quem encontra o banco ocupado espera em vez de falhar na hora. Transações
+# IMMEDIATE pegam a trava de escrita no BEGIN; com DEFERRED, uma transação que
+# lê e depois escreve recebe "database is locked" sem esperar o busy_timeout.
+# O modo vale para todo atomic(), inclusive um só de leitura, que passaria a
+# esperar pelo escritor e a bloquear os outros: no projeto, atomic() só envolve
+# escritas (core.models, core.importers) e ATOMIC_REQUESTS fica desligado; as
+# leituras rodam em autocommit, sem a trava. Não abra atomic() só para ler.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # KiB
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+            'transaction_mode': 'IMMEDIATE',
+        },
+    }
+}
+
+# Perfil PostgreSQL (AGENDA_DATABASE=postgresql), para quando o SQLite não dá
+# conta. Por padrão usa o pool nativo do Django (psycopg[pool]), com a conexão
+# verificada antes de sair do pool; com AGENDA_DB_POOL=0, usa conexões
+# persistentes com CONN_HEALTH_CHECKS. O Django não aceita os dois juntos.
+if os.environ.get('AGENDA_DATABASE') == 'postgresql':
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('AGENDA_DB_NAME', 'agenda'),
+        'USER': os.environ.get('AGENDA_DB_USER', 'agenda'),
+        'PASSWORD': os.environ.get('AGENDA_DB_PASSWORD', ''),
+        'HOST': os.environ.get('AGENDA_DB_HOST', 'localhost'),
+        'PORT': os.environ.get('AGENDA_DB_PORT', '5432'),
+    }
+    if os.environ.get('AGENDA_DB_POOL', '1') != '0':
+        from psycopg_pool import ConnectionPool
+
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.environ.get('AGENDA_DB_POOL_MIN_SIZE', 2)),
+                'max_size': int(os.environ.get('AGENDA_DB_POOL_MAX_SIZE', 10)),
+                'timeout': 10,
+                'max_idle': 300,
+                'check': ConnectionPool.check_connection,
+            },
+        }
+    else:
+        DATABASES['default']['CONN_MAX_AGE'] = 600
+        DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+    # Réplicas de leitura: hosts separados por vírgula, com as mesmas credenciais
+    for number, host in enumerate(filter(None, os.environ.get('AGENDA_DB_REPLICA_HOSTS', '').split(',')), 1):
+        DATABASES[f'replica{number}'] = dict(DATABASES['default'], HOST=host.strip(),
+                                             TEST={'MIRROR': 'default'})
+
+# Réplicas locais para desenvolvimento e testes: AGENDA_SQLITE_REPLICAS=2 cria
+# os aliases replica1 e replica2 sobre o mesmo arquivo do SQLite
+elif os.environ.get('AGENDA_SQLITE_REPLICAS'):
+    for number in range(1, int(os.environ['AGENDA_SQLITE_REPLICAS']) + 1):
+        DATABASES[f'replica{number}'] = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+
+# Leituras das views de consulta nas réplicas (core.replicas); quem acabou de
+# escrever lê do primário por AGENDA_REPLICA_PIN_SECONDS (atraso tolerado)
+AGENDA_READ_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+AGENDA_REPLICA_PIN_SECONDS = 5
+
+if AGENDA_READ_REPLICAS:
+    DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+    MIDDLEWARE.insert(MIDDLEWARE.index('django.contrib.sessions.middleware.SessionMiddleware'),
+                      'core.middleware.ReplicaPinningMiddleware')
+
+# Fila de escritas por processo (core.write_queue), ligada com
+# AGENDA_WRITE_QUEUE=1: uma thread grava os contatos e agrupa as escritas
+# simultâneas numa transação. Vale para o SQLite com várias threads.
+AGENDA_WRITE_QUEUE = bool(os.environ.get('AGENDA_WRITE_QUEUE'))
+AGENDA_WRITE_QUEUE_MAX_BATCH = 64
+AGENDA_WRITE_QUEUE_MAX_WAIT_MS = 2
+# Segundos que uma requisição espera pela escrita antes de desistir com erro
+AGENDA_WRITE_QUEUE_TIMEOUT = 30
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# O cache em memória é por processo; com vários workers, use um backend
+# compartilhado (AGENDA_REDIS_URL) para que a invalidação chegue a todos.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'agenda',
     }
 }
 
+if os.environ.get('AGENDA_REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['AGENDA_REDIS_URL'],
+    }
+
+# Alias do cache usado pela lista de contatos e tempo de vida das páginas
+AGENDA_CACHE_ALIAS = 'default'
+AGENDA_LIST_CACHE_TIMEOUT = 300
+AGENDA_USER_CACHE_TIMEOUT = 300
+
+# Perfil de produção (AGENDA_PROFILE=production): sessões lidas do cache
+# (cached_db, ou signed_cookies via AGENDA_SESSION_ENGINE) e usuário em cache
+# por CachedUserMiddleware, sem consultar django_session e auth_user a cada
+# requisição. Com mais de um processo, combine com AGENDA_REDIS_URL.
+if os.environ.get('AGENDA_PROFILE') == 'production':
+    SESSION_ENGINE = os.environ.get('AGENDA_SESSION_ENGINE',
+                                    'django.contrib.sessions.backends.cached_db')
+    SESSION_CACHE_ALIAS = AGENDA_CACHE_ALIAS
+    MIDDLEWARE.insert(MIDDLEWARE.index('django.contrib.auth.middleware.AuthenticationMiddleware') + 1,
+                      'core.middleware.CachedUserMiddleware')
+
+
+# Login por e-mail (LoginForm) e, para o admin, por username
+AUTHENTICATION_BACKENDS = [
+    'core.backends.EmailBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+# Falhas de login permitidas por e-mail e por IP na janela deslizante (segundos)
+AGENDA_LOGIN_EMAIL_LIMIT = 5
+AGENDA_LOGIN_IP_LIMIT = 20
+AGENDA_LOGIN_WINDOW = 300
+
+# Endpoint /metrics no formato do Prometheus (core.metrics), ligado com
+# AGENDA_METRICS=1; cada processo grava seus contadores em AGENDA_METRICS_DIR.
+# Desligado, nada é contado e a rota não existe. O endpoint responde a usuários
+# staff e aos IPs/redes de AGENDA_METRICS_ALLOWED_IPS (o Prometheus, sem sessão).
+AGENDA_METRICS = bool(os.environ.get('AGENDA_METRICS'))
+AGENDA_METRICS_DIR = os.environ.get('AGENDA_METRICS_DIR')
+AGENDA_METRICS_ALLOWED_IPS = os.environ.get('AGENDA_METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+
+if AGENDA_METRICS:
+    MIDDLEWARE.insert(0, 'core.middleware.MetricsMiddleware')
+
+# Header Server-Timing e log de requisições e consultas lentas (core.timing),
+# ligado com AGENDA_SERVER_TIMING=1
+AGENDA_SLOW_REQUEST_MS = 500
+AGENDA_SLOW_QUERY_MS = 100
+
+if os.environ.get('AGENDA_SERVER_TIMING'):
+    MIDDLEWARE.insert(0, 'core.middleware.ServerTimingMiddleware')
+
+# Perfis cProfile por requisição (core.profiling), ligado com AGENDA_PROFILING=1:
+# mede uma fração das requisições ou as que trazem o header X-Agenda-Profile
+# com o token; os perfis são lidos pelo comando profile_hotspots
+AGENDA_PROFILING_DIR = os.environ.get('AGENDA_PROFILING_DIR')
+AGENDA_PROFILING_SAMPLE_RATE = float(os.environ.get('AGENDA_PROFILING_SAMPLE_RATE', 0))
+AGENDA_PROFILING_TOKEN = os.environ.get('AGENDA_PROFILING_TOKEN', '')
+AGENDA_PROFILING_KEEP = 200
+
+if os.environ.get('AGENDA_PROFILING'):
+    MIDDLEWARE.insert(0, 'core.middleware.ProfilingMiddleware')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -100,6 +259,25 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Paginação por cursor da lista de contatos
+AGENDA_PAGE_SIZE = 50
+AGENDA_MAX_PAGE_SIZE = 500
+
+# Importação de contatos em lote (linhas por bulk_create/transação)
+AGENDA_IMPORT_BATCH_SIZE = 1000
+
+# Exclusão e edição em lote (ids por DELETE/UPDATE e transação)
+AGENDA_BULK_CHUNK_SIZE = 1000
+
+# AGENDA_UPSERT_KEY=email|telefone: cadastro e importação atualizam o contato do
+# dono com a mesma chave em vez de duplicá-lo. Exige a chave única criada por
+# "manage.py unique_contacts add"; sem ela o upsert fica desligado, com um aviso
+# no log (core.unique_keys).
+AGENDA_UPSERT_KEY = os.environ.get('AGENDA_UPSERT_KEY') or None
+# Por quantos segundos cada processo confia na última leitura da chave no banco;
+# depois de um unique_contacts drop, o upsert pode falhar até esse prazo vencer
+AGENDA_UNIQUE_KEYS_TTL = 60
+
 LOGIN_URL = '/login/'
 LOGOUT_URL = '/logout/'
 # Internationalization
@@ -121,3 +299,6 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Os testes gravam métricas e perfis num diretório temporário próprio
+TEST_RUNNER = 'core.tests.runner.AgendaTestRunner'
@@ -0,0 +1,178 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import alogin, alogout
+from django.contrib.auth.decorators import login_required
+from django.db import DatabaseError, IntegrityError
+from django.http import HttpResponse
+from django.shortcuts import render, redirect
+from core import cache as list_cache, write_queue
+from core.forms import LoginForm, AgendaForm
+from core.importers import DATABASE_ERROR, DUPLICATE_ERROR
+from core.models import Agenda, AgendaVersion
+from core.pagination import akeyset_paginate
+from core.replicas import replica_reads
+from core.search import search_contacts
+from core.views import _parse_id, _register, contacts_condition, logger
+
+# Versões assíncronas das views de core.views, para o deploy em ASGI.
+# Usam a API assíncrona do ORM (afirst, aexists, asave, aupdate, adelete) e do
+# cache; templates, contextos e mensagens são os mesmos das versões síncronas.
+# No Django 5.2 cada consulta ainda roda na thread do sync_to_async (não há
+# driver de banco assíncrono): as views não bloqueiam o event loop, mas cada
+# consulta paga a troca de thread. Não há medição contra um servidor ASGI real.
+
+
+def preload_contacts_version(view):
+    """Carrega usuário e versão dos seus contatos antes de contacts_condition.
+
+    As funções de ETag/Last-Modified de condition() são síncronas; com os
+    valores já na requisição, elas não consultam o banco.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        request.user = await request.auser()
+        request._contacts_version = await AgendaVersion.acurrent(request.user.pk)
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+async def login(request):
+    user = await request.auser()
+    if user.is_authenticated:
+        return redirect("home")
+    if request.method == "POST":
+        form = LoginForm(request.POST, request=request)
+        # LoginForm.clean consulta o usuário e verifica a senha
+        if await sync_to_async(form.is_valid)():
+            await alogin(request, form.user)
+            return redirect("home")
+        return render(request, 'login.html', {'form':form}, status=429 if form.throttled else 200)
+    return render(request, 'login.html', {'form':LoginForm()})
+
+
+async def logout(request):
+    if request.method == "POST":
+        await alogout(request)
+        return render(request, 'logout.html')
+    return redirect("home")
+
+
+async def _register_async(contact):
+    # O upsert e a fila de escritas são síncronos; o cadastro simples vai direto
+    if write_queue.enabled() or getattr(settings, 'AGENDA_UPSERT_KEY', None):
+        await write_queue.arun(_register, contact)
+    else:
+        await contact.asave()
+
+
+@login_required
+async def register_contact(request):
+    context = {}
+    if request.method == "POST":
+        data = {
+            'nome_completo': request.POST.get('nome_completo'),
+            'telefone': request.POST.get('telefone'),
+            'email': request.POST.get('email'),
+            'observacao': request.POST.get('observacao'),
+        }
+        form = AgendaForm(data)
+        if form.is_valid():
+            contact = Agenda(owner=await request.auser(), **form.cleaned_data)
+            try:
+                await _register_async(contact)
+            except IntegrityError:
+                form.add_error(None, DUPLICATE_ERROR)
+            except DatabaseError:
+                logger.exception('Falha ao gravar o contato')
+                form.add_error(None, DATABASE_ERROR)
+            else:
+                return redirect("home")
+        context = {'error': True, 'form': form}
+    return render(request, 'register_contact.html', context)
+
+
+@login_required
+@replica_reads
+@preload_contacts_version
+@contacts_condition
+async def show_contact(request):
+    key = list_cache.page_key(f'lista:{request.user.pk}', request._contacts_version.tag, request.GET.dict())
+    content = await list_cache.aget_page(key)
+    if content is not None:
+        response = HttpResponse(content)
+        response['X-Cache'] = 'HIT'
+        return response
+    query = request.GET.get('q', '').strip()
+    page = await akeyset_paginate(
+        search_contacts(Agenda.objects.filter(owner=request.user), query),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        page_size=request.GET.get('page_size'),
+    )
+    context = {'contacts':page.items, 'page':page, 'query':query}
+    response = render(request, 'show_contact.html', context)
+    await list_cache.aset_page(key, response.content)
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+@login_required
+@replica_reads
+async def edit_contact(request):
+    context = {}
+    if request.method == "POST":
+        id = request.POST.get('id')
+        if not id:
+            context = {'error': True, 'errors': "ID nao encontrado."}
+            return render(request, 'edit_contact.html', context)
+        data = {
+            'nome_completo': request.POST.get('nome_completo'),
+            'telefone': request.POST.get('telefone'),
+            'email': request.POST.get('email'),
+            'observacao': request.POST.get('observacao'),
+        }
+        form = AgendaForm(data)
+        pk = _parse_id(id)
+        contacts = Agenda.objects.filter(owner=await request.auser())
+        if form.is_valid():
+            if pk is None:
+                updated = 0
+            elif write_queue.enabled():
+                updated = await write_queue.arun(contacts.filter(id=pk).update_contact, **form.cleaned_data)
+            else:
+                updated = await contacts.filter(id=pk).aupdate_contact(**form.cleaned_data)
+            if updated:
+                return redirect("home")
+            context = {'error': True, 'errors': "Contato nao encontrado."}
+            return render(request, 'edit_contact.html', context)
+        if pk is None or not await contacts.filter(id=pk).aexists():
+            context = {'error': True, 'errors': "Contato nao encontrado."}
+            return render(request, 'edit_contact.html', context)
+        context = {'error': True, 'form': form}
+    return render(request, 'edit_contact.html', context)
+
+
+@login_required
+@replica_reads
+async def delete_contact(request):
+    context = {}
+    if request.method == "POST":
+        id = request.POST.get('id')
+        if not id:
+            context = {'error': True, 'errors': "ID não encontrado."}
+            return render(request, 'delete_contact.html', context)
+        pk = _parse_id(id)
+        contacts = Agenda.objects.filter(owner=await request.auser())
+        if pk is None:
+            deleted = 0
+        elif write_queue.enabled():
+            deleted = (await write_queue.arun(contacts.filter(id=pk).delete))[0]
+        else:
+            deleted = (await contacts.filter(id=pk).adelete())[0]
+        if not deleted:
+            context = {'error': True, 'errors': "Contato não encontrado."}
+            return render(request, 'delete_contact.html', context)
+        return redirect("home")
+    return render(request, 'delete_contact.html', context)
@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+UserModel = get_user_model()
+
+
+class EmailBackend(ModelBackend):
+    """Autentica pelo e-mail com uma única consulta (indexada) ao usuário.
+
+    Sem o argumento email, não faz nada e deixa o login por username (admin,
+    client.login nos testes) para o ModelBackend.
+    """
+
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if email is None or password is None:
+            return None
+        # O e-mail não é único em auth_user: vale o usuário cuja senha confere
+        users = list(UserModel._default_manager.filter(email=email).order_by('pk'))
+        if not users:
+            # Mesmo custo de hash de quando o usuário existe (ver ModelBackend)
+            UserModel().set_password(password)
+            return None
+        for user in users:
+            if user.check_password(password) and self.user_can_authenticate(user):
+                return user
+        return None
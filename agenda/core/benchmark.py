@@ -0,0 +1,345 @@
+import platform
+import random
+import statistics
+import string
+import threading
+import tracemalloc
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+from time import perf_counter
+from urllib import request as urlrequest
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+
+import django
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from core import synthetic
+from core.models import Agenda
+
+# Benchmark das operações do CRUD de contatos, usado por benchmark_contacts.
+# Cada operação é medida por um "alvo": o Client de teste do Django (em série,
+# com consultas e pico de memória por requisição) ou um servidor HTTP de
+# verdade, o WSGI do Django numa thread ou qualquer servidor externo (uvicorn,
+# gunicorn) apontando para o mesmo banco. Nos alvos HTTP as consultas vêm do
+# header Server-Timing, quando ServerTimingMiddleware está ativo.
+
+OPERATIONS = ('login', 'list', 'search', 'register', 'edit', 'delete')
+
+# Status esperado de cada operação; qualquer outro conta em "errors" do resultado
+EXPECTED_STATUS = {'login': 302, 'list': 200, 'search': 200, 'register': 302, 'edit': 302,
+                   'delete': 302}
+
+USERNAME = 'benchmark'
+EMAIL = 'benchmark@fatec.sp.gov.br'
+PASSWORD = 'benchmark'
+
+# Semente dos contatos do benchmark (core.synthetic)
+SEED = 'benchmark'
+
+Result = namedtuple('Result', 'status queries seconds')
+
+
+def code(i):
+    """Palavra única de cinco letras para o contato i (até 26**5 contatos)."""
+    letters = []
+    for _ in range(5):
+        i, rest = divmod(i, 26)
+        letters.append(string.ascii_lowercase[rest])
+    return ''.join(letters).capitalize()
+
+
+def contact_data(i):
+    """Contato i de core.synthetic, sempre o mesmo; o nome termina em code(i), buscado por search."""
+    data = synthetic.contact(random.Random(f'{SEED}:{i}'), i)
+    data['nome_completo'] = f"{data['nome_completo']} {code(i)}"
+    return data
+
+
+def seed(owner, rows, batch_size=5000):
+    """Deixa owner com exatamente rows contatos; devolve quantos foram inseridos."""
+    contacts = Agenda.objects.filter(owner=owner)
+    existing = contacts.count()
+    if existing > rows:
+        # Banco mantido (--keepdb) de uma execução com mais linhas
+        last_id = contacts.order_by('id').values_list('id', flat=True)[rows - 1]
+        contacts.filter(id__gt=last_id).delete()
+    for start in range(existing, rows, batch_size):
+        batch = []
+        for i in range(start, min(start + batch_size, rows)):
+            contact = Agenda(owner=owner, **contact_data(i))
+            contact.refresh_search_fields()
+            batch.append(contact)
+        Agenda.objects.bulk_create(batch)
+    return max(rows - existing, 0)
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class ClientSession:
+    def __init__(self, user=None):
+        self.client = Client()
+        if user is not None:
+            self.client.force_login(user)
+
+    def request(self, method, path, data):
+        counter = QueryCounter()
+        start = perf_counter()
+        with connection.execute_wrapper(counter):
+            response = getattr(self.client, method.lower())(path, data)
+        return Result(response.status_code, counter.count, perf_counter() - start)
+
+
+class NoRedirect(urlrequest.HTTPRedirectHandler):
+    # O redirect faz parte da resposta medida; seguir mediria outra página
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def server_timing_queries(header):
+    for part in (header or '').split(','):
+        if 'queries"' in part:
+            return int(part.split('desc="')[1].split()[0])
+    return None
+
+
+class HttpSession:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.cookies = CookieJar()
+        self.opener = urlrequest.build_opener(urlrequest.HTTPCookieProcessor(self.cookies), NoRedirect)
+
+    def csrf_token(self):
+        return next((cookie.value for cookie in self.cookies if cookie.name == 'csrftoken'), '')
+
+    def request(self, method, path, data):
+        url, body = self.base_url + path, None
+        if method == 'GET':
+            url += '?' + urlencode(data) if data else ''
+        else:
+            body = urlencode(dict(data, csrfmiddlewaretoken=self.csrf_token())).encode()
+        start = perf_counter()
+        try:
+            response = self.opener.open(urlrequest.Request(url, data=body, method=method), timeout=60)
+        except HTTPError as error:
+            response = error
+        with response:
+            response.read()
+        return Result(response.status, server_timing_queries(response.headers.get('Server-Timing')),
+                      perf_counter() - start)
+
+    def prepare(self):
+        # A página de login entrega o cookie do CSRF
+        self.request('GET', reverse('login'), {})
+        return self
+
+    def login(self, email, password):
+        result = self.prepare().request('POST', reverse('login'), {'email': email, 'password': password})
+        if result.status != 302:
+            raise RuntimeError(f'Login em {self.base_url} falhou ({result.status}).')
+        return self
+
+
+class ClientTarget:
+    name = 'client'
+    concurrency = 1
+    measures_memory = True
+
+    def __init__(self, user):
+        self.user = user
+
+    def session(self):
+        return ClientSession(self.user)
+
+    def anonymous(self):
+        return ClientSession()
+
+
+class HttpTarget:
+    measures_memory = False
+
+    def __init__(self, name, base_url, concurrency):
+        self.name = name
+        self.base_url = base_url
+        self.concurrency = concurrency
+
+    def session(self):
+        return HttpSession(self.base_url).login(EMAIL, PASSWORD)
+
+    def anonymous(self):
+        return HttpSession(self.base_url).prepare()
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class WSGIServerThread:
+    """Servidor WSGI do Django (o do runserver, com uma thread por conexão)."""
+
+    def __init__(self):
+        self.server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler, allow_reuse_address=False)
+        self.server.set_app(WSGIHandler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server.server_port}'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class Workload:
+    """As requisições de cada operação sobre os contatos do usuário do benchmark."""
+
+    def __init__(self, owner, rows):
+        self.owner = owner
+        self.rows = rows
+        contacts = Agenda.objects.filter(owner=owner).order_by('id')
+        self.seeded_ids = list(contacts.values_list('id', flat=True)[:rows])
+        self.last_seeded_id = self.seeded_ids[-1] if self.seeded_ids else 0
+        self.new_ids = []
+
+    def prepare(self, operation):
+        if operation == 'delete':
+            # Apaga os contatos criados por register, e a tabela volta ao tamanho inicial
+            self.new_ids = list(Agenda.objects.filter(owner=self.owner, id__gt=self.last_seeded_id)
+                                .order_by('id').values_list('id', flat=True))
+
+    def login(self, target, session, i):
+        return target.anonymous().request('POST', reverse('login'), {'email': EMAIL, 'password': PASSWORD})
+
+    def list(self, target, session, i):
+        # Parâmetros distintos a cada requisição: mede a página, não o cache da lista
+        return session.request('GET', reverse('show_contact'), {'bench': i})
+
+    def search(self, target, session, i):
+        return session.request('GET', reverse('search_contact'),
+                               {'q': code(i * 7919 % max(self.rows, 1))})
+
+    def register(self, target, session, i):
+        return session.request('POST', reverse('register_contact'), contact_data(self.rows + i))
+
+    def edit(self, target, session, i):
+        # Regrava os dados semeados: o banco continua reaproveitável com --keepdb
+        index = i % len(self.seeded_ids)
+        return session.request('POST', reverse('edit_contact'),
+                               dict(contact_data(index), id=self.seeded_ids[index]))
+
+    def delete(self, target, session, i):
+        # Se algum register falhou há menos contatos novos: a repetição conta como erro
+        pk = self.new_ids[i % len(self.new_ids)] if self.new_ids else 0
+        return session.request('POST', reverse('delete_contact'), {'id': pk})
+
+
+def measure(target, workload, operation, requests, memory_samples):
+    workload.prepare(operation)
+    run = getattr(workload, operation)
+    # Sessões abertas antes de medir: o login de cada cliente não entra na vazão
+    sessions = [target.session() for _ in range(target.concurrency)]
+
+    def worker(k):
+        return [run(target, sessions[k], i) for i in range(k, requests, target.concurrency)]
+
+    start = perf_counter()
+    if target.concurrency == 1:
+        results = worker(0)
+    else:
+        with ThreadPoolExecutor(target.concurrency) as pool:
+            results = [result for chunk in pool.map(worker, range(target.concurrency)) for result in chunk]
+    elapsed = perf_counter() - start
+
+    latencies = sorted(result.seconds for result in results)
+    queries = [result.queries for result in results if result.queries is not None]
+    peak = None
+    if target.measures_memory and memory_samples:
+        # Passada separada: o tracemalloc deixaria as latências acima bem maiores
+        session = target.session()
+        peaks = []
+        tracemalloc.start()
+        try:
+            for i in range(requests, requests + memory_samples):
+                baseline = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+                run(target, session, i)
+                peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        finally:
+            tracemalloc.stop()
+        peak = round(max(peaks) / 1024, 1)
+    return {
+        'rows': workload.rows,
+        'target': target.name,
+        'operation': operation,
+        'requests': len(results),
+        # Respostas com outro status (erro 500, "database is locked", contato não encontrado)
+        'errors': sum(result.status != EXPECTED_STATUS[operation] for result in results),
+        'throughput': round(len(results) / elapsed, 2),
+        'p50_ms': round(statistics.median(latencies) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'queries': round(statistics.mean(queries), 2) if queries else None,
+        'peak_kib': peak,
+    }
+
+
+def metadata(requests, concurrency):
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'requests': requests,
+        'concurrency': concurrency,
+    }
+
+
+def result_key(result):
+    return result['rows'], result['target'], result['operation']
+
+
+def compare(baseline, results, tolerance):
+    """Regressões em relação a um baseline: (resultado, métrica, antes, depois).
+
+    Latência, vazão e memória toleram a variação dada (fração); consultas e
+    erros não podem crescer.
+    """
+    previous = {result_key(result): result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        before = previous.get(result_key(result))
+        if before is None:
+            continue
+        checks = [
+            ('p50_ms', lambda old, new: new > old * (1 + tolerance)),
+            ('p99_ms', lambda old, new: new > old * (1 + tolerance)),
+            ('throughput', lambda old, new: new < old * (1 - tolerance)),
+            ('peak_kib', lambda old, new: new > old * (1 + tolerance)),
+            ('queries', lambda old, new: new > old),
+            ('errors', lambda old, new: new > old),
+        ]
+        for metric, worse in checks:
+            old, new = before.get(metric), result.get(metric)
+            if old is not None and new is not None and worse(old, new):
+                regressions.append((result, metric, old, new))
+    return regressions
@@ -0,0 +1,100 @@
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+from core import write_queue
+from core.importers import CSV_FIELDS, clean_field
+from core.search import search_contacts
+
+# Exclusão e edição em lote, por lista de ids ou pelo mesmo filtro da busca
+# da lista (q). Os ids são processados em blocos, cada um com um DELETE ou
+# UPDATE e sua própria transação (com o marcador de AgendaVersion): um lote
+# grande não segura a trava de escrita do SQLite nem cresce o WAL de uma vez,
+# e o que já foi gravado não se perde se um bloco falhar.
+#
+# Corpo JSON: {"ids": [1, 2, 3]} ou {"q": "silva"}, e, na edição,
+# "fields": {"observacao": "Colega"} com qualquer subconjunto dos campos de
+# AgendaForm, validados pelas mesmas regras.
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def get_chunk_size(value=None):
+    return int(value or getattr(settings, 'AGENDA_BULK_CHUNK_SIZE', DEFAULT_CHUNK_SIZE))
+
+
+def parse_ids(value):
+    if not isinstance(value, list) or not value:
+        raise ValidationError('Informe uma lista de ids.')
+    if not all(isinstance(id, int) and not isinstance(id, bool) for id in value):
+        raise ValidationError('Os ids devem ser números inteiros.')
+    return sorted(set(value))
+
+
+def clean_fields(data):
+    """Valida os campos informados com as regras de AgendaForm.
+
+    Retorna (dados limpos, erros por campo).
+    """
+    if not isinstance(data, dict) or not data:
+        raise ValidationError('Informe os campos a alterar.')
+    unknown = sorted(set(data) - set(CSV_FIELDS))
+    if unknown:
+        raise ValidationError('Campos desconhecidos: %s.' % ', '.join(unknown))
+    cleaned, errors = {}, {}
+    for name, value in data.items():
+        try:
+            cleaned[name] = clean_field(name, value)
+        except ValidationError as error:
+            errors[name] = error.messages
+    return cleaned, errors
+
+
+def parse_request(body, queryset):
+    """Lê o corpo JSON; retorna (queryset filtrado, ids ou None, dados do corpo)."""
+    try:
+        data = json.loads(body)
+    except (UnicodeDecodeError, ValueError):
+        raise ValidationError('Corpo JSON inválido.')
+    if not isinstance(data, dict):
+        raise ValidationError('Corpo JSON inválido.')
+    if 'ids' in data:
+        return queryset, parse_ids(data['ids']), data
+    query = data.get('q')
+    if not isinstance(query, str) or not query.strip():
+        # Sem filtro vazio: um lote nunca alcança a agenda inteira por engano
+        raise ValidationError('Informe "ids" ou um filtro "q".')
+    return search_contacts(queryset, query.strip()), None, data
+
+
+def id_chunks(queryset, ids=None, chunk_size=None):
+    """Blocos de ids a alterar; sem ids, percorre queryset pela chave primária."""
+    chunk_size = get_chunk_size(chunk_size)
+    if ids is not None:
+        for start in range(0, len(ids), chunk_size):
+            yield ids[start:start + chunk_size]
+        return
+    last = 0
+    while True:
+        chunk = list(queryset.filter(id__gt=last).order_by('id').values_list('id', flat=True)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1]
+
+
+def delete_contacts(queryset, ids=None, chunk_size=None):
+    """Exclui os contatos de queryset (só os ids, se dados); retorna quantos."""
+    deleted = 0
+    for chunk in id_chunks(queryset, ids, chunk_size):
+        deleted += write_queue.run(queryset.filter(id__in=chunk).delete)[0]
+    return deleted
+
+
+def update_contacts(queryset, fields, ids=None, chunk_size=None):
+    """Aplica fields aos contatos de queryset (só os ids, se dados); retorna quantos."""
+    updated = 0
+    for chunk in id_chunks(queryset, ids, chunk_size):
+        updated += write_queue.run(queryset.filter(id__in=chunk).update_contact, **fields)
+    return updated
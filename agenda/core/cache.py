@@ -0,0 +1,65 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.http import urlencode
+
+from core import metrics
+
+# Cache das páginas renderizadas da lista de contatos.
+# As chaves incluem a versão dos contatos do dono (AgendaVersion.tag),
+# incrementada na mesma transação de cada escrita: uma página antiga nunca é
+# servida, ela apenas deixa de ser usada e expira. Como a versão vem do banco,
+# a invalidação vale para todos os processos, mesmo com o cache em memória local.
+# Acertos e falhas são contados em core.metrics, somados entre os processos.
+
+DEFAULT_TIMEOUT = 300
+
+
+def get_cache():
+    return caches[getattr(settings, 'AGENDA_CACHE_ALIAS', 'default')]
+
+
+def page_key(prefix, version, params):
+    digest = hashlib.md5(urlencode(sorted(params.items())).encode(), usedforsecurity=False)
+    return f'agenda:{prefix}:{version}:{digest.hexdigest()}'
+
+
+def get_or_set(key, default):
+    """Valor de key, calculado por default() na falta (fora das métricas da lista)."""
+    timeout = getattr(settings, 'AGENDA_LIST_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+    return get_cache().get_or_set(key, default, timeout)
+
+
+def get_page(key):
+    content = get_cache().get(key)
+    count_lookup(content)
+    return content
+
+
+def set_page(key, content):
+    timeout = getattr(settings, 'AGENDA_LIST_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+    get_cache().set(key, content, timeout)
+
+
+async def aget_page(key):
+    content = await get_cache().aget(key)
+    count_lookup(content)
+    return content
+
+
+async def aset_page(key, content):
+    timeout = getattr(settings, 'AGENDA_LIST_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+    await get_cache().aset(key, content, timeout)
+
+
+def count_lookup(content):
+    metrics.inc('agenda_list_cache_requests_total', {'result': 'hit' if content is not None else 'miss'})
+
+
+def stats():
+    # Lido das métricas: zerado com AGENDA_METRICS desligado
+    hits = int(metrics.value('agenda_list_cache_requests_total', {'result': 'hit'}))
+    misses = int(metrics.value('agenda_list_cache_requests_total', {'result': 'miss'}))
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_rate': hits / total if total else 0.0}
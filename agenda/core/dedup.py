@@ -0,0 +1,147 @@
+import re
+from collections import defaultdict, namedtuple
+
+from core.models import Agenda
+
+# Busca de contatos duplicados por chaves de bloqueio.
+# Em vez de comparar todos os pares (O(n²)), cada contato gera suas chaves
+# (telefone só com dígitos, e-mail normalizado e a chave fonética do nome) e é
+# ligado ao primeiro contato que gerou a mesma chave; os grupos saem de uma
+# estrutura union-find. Os contatos são lidos uma vez, em blocos, ordenados por
+# dono: a memória depende da agenda do maior usuário, não da tabela inteira, e
+# duplicatas nunca cruzam usuários. As chaves vêm das colunas de busca já
+# gravadas (telefone_digitos, email_busca, nome_fonetico), sem recalcular nada.
+#
+# O nome sozinho não basta: "Ana Silva" é nome de muita gente. A chave de nome
+# exige um segundo sinal, os últimos dígitos do telefone (o mesmo número com
+# outro DDD ou sem o nono dígito) ou o usuário do e-mail sem pontuação
+# ("ana.silva" e "anasilva"). Nomes de uma palavra só ("Ana") não geram chave.
+KEYS = ('telefone', 'email', 'nome')
+PHONE_SUFFIX_DIGITS = 8
+NON_ALNUM = re.compile(r'[^a-z0-9]')
+DEFAULT_CHUNK_SIZE = 5000
+CONTACT_FIELDS = ('id', 'nome_completo', 'telefone', 'email', 'observacao')
+
+Cluster = namedtuple('Cluster', 'owner_id ids')
+
+
+class UnionFind:
+    """Conjuntos disjuntos; só os ids que casaram com algum outro ocupam memória."""
+
+    def __init__(self):
+        self.parent = {}
+        self.size = {}
+
+    def find(self, x):
+        parent = self.parent
+        if x not in parent:
+            return x
+        while parent[x] != x:
+            # Compressão pela metade do caminho
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return
+        if self.size.get(a, 1) < self.size.get(b, 1):
+            a, b = b, a
+        self.parent.setdefault(a, a)
+        self.parent[b] = a
+        self.size[a] = self.size.get(a, 1) + self.size.pop(b, 1)
+
+    def groups(self):
+        groups = defaultdict(list)
+        for x in self.parent:
+            groups[self.find(x)].append(x)
+        return sorted(sorted(ids) for ids in groups.values())
+
+
+def blocking_keys(nome_fonetico, telefone_digitos, email_busca, keys=KEYS):
+    """(tipo, valor) de cada chave de bloqueio do contato."""
+    if 'telefone' in keys and telefone_digitos:
+        yield 'telefone', telefone_digitos
+    if 'email' in keys and email_busca:
+        yield 'email', email_busca
+    if 'nome' in keys and ' ' in nome_fonetico:
+        if len(telefone_digitos) >= PHONE_SUFFIX_DIGITS:
+            yield 'nome', (nome_fonetico, telefone_digitos[-PHONE_SUFFIX_DIGITS:])
+        user = NON_ALNUM.sub('', email_busca.partition('@')[0])
+        if user:
+            yield 'nome', (nome_fonetico, '@' + user)
+
+
+class DuplicateFinder:
+    def __init__(self, keys=KEYS, chunk_size=None):
+        self.keys = tuple(keys)
+        self.chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+        self.rows = 0
+
+    def clusters(self, queryset=None):
+        """Grupos de duplicatas de queryset, dono a dono, numa única leitura."""
+        queryset = Agenda.objects.all() if queryset is None else queryset
+        rows = (queryset.order_by('owner_id')
+                .values_list('id', 'owner_id', 'nome_fonetico', 'telefone_digitos', 'email_busca')
+                .iterator(chunk_size=self.chunk_size))
+        owner = sets = indexes = None
+        for id, owner_id, nome_fonetico, telefone_digitos, email_busca in rows:
+            if owner_id != owner:
+                if sets is not None:
+                    yield from self._clusters(owner, sets)
+                owner, sets, indexes = owner_id, UnionFind(), {kind: {} for kind in self.keys}
+            self.rows += 1
+            for kind, value in blocking_keys(nome_fonetico, telefone_digitos, email_busca, self.keys):
+                first = indexes[kind].setdefault(value, id)
+                if first != id:
+                    sets.union(first, id)
+        if sets is not None:
+            yield from self._clusters(owner, sets)
+
+    def _clusters(self, owner_id, sets):
+        for ids in sets.groups():
+            yield Cluster(owner_id, ids)
+
+    def matched_keys(self, contacts):
+        """Tipos de chave que ao menos dois contatos do grupo compartilham."""
+        seen, matched = set(), set()
+        for contact in contacts:
+            search = contact['nome_fonetico'], contact['telefone_digitos'], contact['email_busca']
+            for key in blocking_keys(*search, self.keys):
+                if key in seen:
+                    matched.add(key[0])
+                seen.add(key)
+        return [kind for kind in self.keys if kind in matched]
+
+    def describe(self, clusters):
+        """Os grupos com os dados dos contatos, para revisão e merge.
+
+        O contato mais antigo (menor id) é o sugerido para ficar; os demais podem
+        ir para a exclusão em lote.
+        """
+        pending, size = [], 0
+        for cluster in clusters:
+            pending.append(cluster)
+            size += len(cluster.ids)
+            if size >= self.chunk_size:
+                yield from self._describe(pending)
+                pending, size = [], 0
+        if pending:
+            yield from self._describe(pending)
+
+    def _describe(self, clusters):
+        ids = [id for cluster in clusters for id in cluster.ids]
+        # Só pela chave primária: os ids já vêm do queryset de clusters(), e um
+        # filtro por dono faria o SQLite trocar a chave primária pelo índice do dono
+        contacts = {contact['id']: contact for contact in Agenda.objects.filter(id__in=ids).values(
+            *CONTACT_FIELDS, 'nome_fonetico', 'telefone_digitos', 'email_busca')}
+        for cluster in clusters:
+            members = [contacts[id] for id in cluster.ids if id in contacts]
+            yield {
+                'owner': cluster.owner_id,
+                'keep': cluster.ids[0],
+                'ids': cluster.ids,
+                'keys': self.matched_keys(members),
+                'contacts': [{field: contact[field] for field in CONTACT_FIELDS} for contact in members],
+            }
@@ -0,0 +1,121 @@
+import csv
+import json
+
+from core.models import Agenda
+
+# Exportação em fluxo da tabela de contatos.
+# A consulta usa .iterator(), então as linhas chegam do banco em blocos de
+# CHUNK_SIZE e cada bloco é entregue já formatado, sem montar o arquivo inteiro.
+
+CHUNK_SIZE = 2000
+FIELDS = ('id', 'nome_completo', 'telefone', 'email', 'observacao')
+
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'jsonl': ('application/x-ndjson; charset=utf-8', 'jsonl'),
+    'vcard': ('text/vcard; charset=utf-8', 'vcf'),
+}
+
+
+class Echo:
+    """Pseudo-arquivo: csv.writer escreve e recebe a linha de volta."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def jsonl_lines(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False) + '\n'
+
+
+# Linhas do vCard com mais de 75 octetos são dobradas (RFC 6350, seção 3.2)
+VCARD_LINE_OCTETS = 75
+
+# Partículas que ficam com o sobrenome: "Ana da Silva" -> N:da Silva;Ana;;;
+NAME_PARTICLES = frozenset(('da', 'de', 'do', 'das', 'dos'))
+
+
+def vcard_escape(value):
+    return (value.replace('\\', '\\\\').replace('\n', '\\n')
+            .replace(';', '\\;').replace(',', '\\,'))
+
+
+def vcard_fold(line):
+    """Quebra a linha em partes de até 75 octetos em UTF-8, sem partir um caractere.
+
+    Cada continuação começa com um espaço, que conta no limite da linha.
+    """
+    if len(line.encode()) <= VCARD_LINE_OCTETS:
+        return line
+    parts, current, size = [], [], 0
+    for char in line:
+        octets = len(char.encode())
+        if size + octets > VCARD_LINE_OCTETS:
+            parts.append(''.join(current))
+            current, size = [' '], 1
+        current.append(char)
+        size += octets
+    parts.append(''.join(current))
+    return '\r\n'.join(parts)
+
+
+def vcard_name(nome):
+    """Valor de N: sobrenome (a última palavra, com as partículas antes dela) e prenomes."""
+    words = nome.split()
+    start = len(words) - 1
+    while start > 1 and words[start - 1].lower() in NAME_PARTICLES:
+        start -= 1
+    family, given = ' '.join(words[start:]), ' '.join(words[:start])
+    if not given:
+        # Uma palavra só: vai como prenome
+        family, given = '', family
+    return f'{vcard_escape(family)};{vcard_escape(given)};;;'
+
+
+def vcard_lines(rows):
+    for pk, nome, telefone, email, observacao in rows:
+        lines = [
+            'BEGIN:VCARD',
+            'VERSION:3.0',
+            f'UID:agenda-{pk}',
+            f'FN:{vcard_escape(nome)}',
+            f'N:{vcard_name(nome)}',
+            f'TEL;TYPE=CELL:{vcard_escape(telefone)}',
+            f'EMAIL;TYPE=INTERNET:{vcard_escape(email)}',
+        ]
+        if observacao:
+            lines.append(f'NOTE:{vcard_escape(observacao)}')
+        lines.append('END:VCARD')
+        yield '\r\n'.join(vcard_fold(line) for line in lines) + '\r\n'
+
+
+WRITERS = {
+    'csv': csv_lines,
+    'jsonl': jsonl_lines,
+    'vcard': vcard_lines,
+}
+
+
+def export_rows(queryset=None, chunk_size=CHUNK_SIZE):
+    queryset = Agenda.objects.all() if queryset is None else queryset
+    return queryset.order_by('id').values_list(*FIELDS).iterator(chunk_size=chunk_size)
+
+
+def export_chunks(format, queryset=None, chunk_size=CHUNK_SIZE):
+    """Gera o arquivo exportado em pedaços de até chunk_size contatos."""
+    buffer = []
+    for line in WRITERS[format](export_rows(queryset, chunk_size)):
+        buffer.append(line)
+        if len(buffer) >= chunk_size:
+            yield ''.join(buffer)
+            buffer.clear()
+    if buffer:
+        yield ''.join(buffer)
@@ -3,8 +3,25 @@ from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.forms import ModelForm
+from core import throttle
 from core.models import Agenda
 
+# Regras compartilhadas entre os formulários e a importação em lote
+
+def validate_email_institucional(email):
+    if not email.endswith('@fatec.sp.gov.br'):
+        raise ValidationError('Informe seu e-mail institucional.')
+
+def validate_telefone(telefone):
+    if not telefone.isdigit():
+        raise ValidationError('O telefone deve conter apenas números.')
+    if len(telefone) < 10 or len(telefone) > 11:
+        raise ValidationError('O telefone deve ter entre 10 e 11 dígitos.')
+
+def validate_nome_completo(nome_completo):
+    if not nome_completo.replace(" ", "").isalpha():
+        raise ValidationError('O nome completo deve conter apenas letras e espaços.')
+
 class LoginForm(ModelForm):
     class Meta:
         model = User
@@ -25,10 +42,14 @@ class LoginForm(ModelForm):
             },
         }
 
+    def __init__(self, *args, request=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.request = request
+        self.throttled = False
+
     def clean_email(self):
         email = self.cleaned_data['email']
-        if not email.endswith('@fatec.sp.gov.br'):
-            raise ValidationError('Informe seu e-mail institucional.')
+        validate_email_institucional(email)
         return self.cleaned_data['email']
 
     def clean(self):
@@ -37,14 +58,20 @@ class LoginForm(ModelForm):
         password = cleaned_data.get('password')
 
         if email and password:
-            try:
-                user = User.objects.get(email=email)
-            except User.DoesNotExist:
-                raise ValidationError("Usuário com esse e-mail não encontrado.")
-
-            user = authenticate(username=user.username, password=password)
+            ip = self.request.META.get('REMOTE_ADDR') if self.request is not None else None
+            # Bloqueia antes do authenticate(), sem calcular o hash da senha
+            if throttle.blocked_scope(email, ip):
+                self.throttled = True
+                raise ValidationError("Muitas tentativas de login. Tente novamente em alguns minutos.")
+            # Uma consulta pelo e-mail (EmailBackend); a segunda só em caso de
+            # falha, para manter a mensagem que diferencia e-mail e senha
+            user = authenticate(email=email, password=password)
             if user is None:
+                throttle.record_failure(email, ip)
+                if not User.objects.filter(email=email).exists():
+                    raise ValidationError("Usuário com esse e-mail não encontrado.")
                 raise ValidationError("Senha incorreta para o e-mail informado.")
+            throttle.reset(email)
 
             self.user = user
 
@@ -82,20 +109,15 @@ class AgendaForm(ModelForm):
 
     def clean_email(self):
         email = self.cleaned_data['email']
-        if not email.endswith('@fatec.sp.gov.br'):
-            raise ValidationError('Informe seu e-mail institucional.')
+        validate_email_institucional(email)
         return self.cleaned_data['email']
     
     def clean_telefone(self):
         telefone = self.cleaned_data['telefone']
-        if not telefone.isdigit():
-            raise ValidationError('O telefone deve conter apenas números.')
-        if len(telefone) < 10 or len(telefone) > 11:
-            raise ValidationError('O telefone deve ter entre 10 e 11 dígitos.')
+        validate_telefone(telefone)
         return telefone
     
     def clean_nome_completo(self):
         nome_completo = self.cleaned_data['nome_completo']
-        if not nome_completo.replace(" ", "").isalpha():
-            raise ValidationError('O nome completo deve conter apenas letras e espaços.')
+        validate_nome_completo(nome_completo)
         return nome_completo
\ No newline at end of file
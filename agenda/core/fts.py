@@ -0,0 +1,114 @@
+import re
+
+from django.db import connection as default_connection, connections
+from django.db.models import Q
+
+# Índice de texto completo (SQLite FTS5) sobre nome_completo, email e observacao.
+# A tabela virtual usa "external content": guarda só o índice e lê o texto de
+# core_agenda. Os gatilhos mantêm o índice em sincronia com qualquer escrita,
+# inclusive bulk_create e update(), que não passam pelo save().
+#
+# O SQLite recria core_agenda em boa parte das migrações (AddField, AlterField),
+# o que apaga os gatilhos. Migrações que recriam a tabela devem recriá-los ao
+# final com uma cópia do SQL abaixo (como 0007 e 0009), não importando este
+# módulo: o SQL daqui pode mudar, o de uma migração já aplicada não.
+
+TABLE = 'core_agenda_fts'
+
+# Pesos do bm25 na ordem das colunas: nome pesa mais que e-mail e observação
+RANK = 'bm25(10.0, 5.0, 1.0)'
+
+CREATE_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(
+        nome_completo, email, observacao,
+        content='core_agenda', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_ai AFTER INSERT ON core_agenda BEGIN
+        INSERT INTO {TABLE}(rowid, nome_completo, email, observacao)
+        VALUES (new.id, new.nome_completo, new.email, new.observacao);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_ad AFTER DELETE ON core_agenda BEGIN
+        INSERT INTO {TABLE}({TABLE}, rowid, nome_completo, email, observacao)
+        VALUES ('delete', old.id, old.nome_completo, old.email, old.observacao);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_au
+        AFTER UPDATE OF nome_completo, email, observacao ON core_agenda BEGIN
+        INSERT INTO {TABLE}({TABLE}, rowid, nome_completo, email, observacao)
+        VALUES ('delete', old.id, old.nome_completo, old.email, old.observacao);
+        INSERT INTO {TABLE}(rowid, nome_completo, email, observacao)
+        VALUES (new.id, new.nome_completo, new.email, new.observacao);
+    END""",
+    f"INSERT INTO {TABLE}({TABLE}, rank) VALUES ('rank', '{RANK}')",
+]
+
+DROP_SQL = [
+    f'DROP TRIGGER IF EXISTS {TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {TABLE}_au',
+    f'DROP TABLE IF EXISTS {TABLE}',
+]
+
+
+def is_supported(connection=None):
+    return (connection or default_connection).vendor == 'sqlite'
+
+
+def install(connection=None):
+    connection = connection or default_connection
+    if not is_supported(connection):
+        return
+    with connection.cursor() as cursor:
+        for statement in CREATE_SQL:
+            cursor.execute(statement)
+
+
+def uninstall(connection=None):
+    connection = connection or default_connection
+    if not is_supported(connection):
+        return
+    with connection.cursor() as cursor:
+        for statement in DROP_SQL:
+            cursor.execute(statement)
+
+
+def rebuild(connection=None):
+    connection = connection or default_connection
+    if not is_supported(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('rebuild')")
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('optimize')")
+
+
+def match_expression(text):
+    """Converte o texto digitado em uma expressão MATCH segura (termos por prefixo)."""
+    terms = re.findall(r'\w+', text or '')
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def full_text_search(queryset, text, limit=20):
+    """Contatos de queryset que casam com text, do mais para o menos relevante."""
+    expression = match_expression(text)
+    if not expression:
+        return []
+    # A conexão do queryset: a réplica de leitura, se a view usa uma
+    connection = connections[queryset.db]
+    if not is_supported(connection):
+        # Sem FTS5: busca simples, sem ranking
+        condition = Q()
+        for term in re.findall(r'\w+', text):
+            condition &= (Q(nome_completo__icontains=term) | Q(email__icontains=term)
+                          | Q(observacao__icontains=term))
+        return list(queryset.filter(condition).order_by('nome_completo', 'id')[:limit])
+    # O filtro do queryset (ex.: dono) entra na consulta, antes do LIMIT
+    subquery, params = queryset.values('id').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s AND rowid IN ({subquery}) '
+            f'ORDER BY rank LIMIT %s',
+            [expression, *params, limit],
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+    contacts = queryset.in_bulk(ids)
+    return [contacts[pk] for pk in ids if pk in contacts]
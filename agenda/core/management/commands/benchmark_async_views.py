@@ -0,0 +1,77 @@
+import asyncio
+import statistics
+import time
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient
+from django.urls import reverse
+
+# Pares (síncrona, assíncrona) comparados; todos são leituras
+VIEWS = (
+    ('show_contact', 'async_show_contact'),
+    ('edit_contact', 'async_edit_contact'),
+    ('delete_contact', 'async_delete_contact'),
+)
+
+
+class Command(BaseCommand):
+    help = ('Compara requisições/s e latência p99 das views síncronas e assíncronas '
+            'sob carga concorrente, passando pelo handler ASGI do Django no próprio processo '
+            '(AsyncClient); não substitui uma medição contra um servidor ASGI real.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', required=True, help='Usuário existente usado nas requisições.')
+        parser.add_argument('--requests', type=int, default=500, help='Requisições por view.')
+        parser.add_argument('--concurrency', type=int, default=50)
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options['username'])
+        except get_user_model().DoesNotExist:
+            raise CommandError("Usuário '%s' não encontrado." % options['username'])
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests e --concurrency devem ser positivos.')
+        # async_to_sync (e não asyncio.run) mantém o código síncrono do ORM na
+        # thread atual, como faz o servidor ASGI
+        results = async_to_sync(self.run)(user, options['requests'], options['concurrency'])
+        self.stdout.write(f"{'view':<24}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+        for name, (rate, p50, p99) in results.items():
+            self.stdout.write(f'{name:<24}{rate:>10.1f}{p50:>10.2f}{p99:>10.2f}')
+
+    async def run(self, user, requests, concurrency):
+        clients = []
+        for _ in range(concurrency):
+            client = AsyncClient()
+            await client.aforce_login(user)
+            clients.append(client)
+        results = {}
+        try:
+            for pair in VIEWS:
+                for name in pair:
+                    results[name] = await self.measure(clients, reverse(name), requests)
+        finally:
+            for client in clients:
+                await client.alogout()
+        return results
+
+    async def measure(self, clients, url, requests):
+        latencies = []
+        pending = iter(range(requests))
+
+        async def worker(client):
+            # Cada requisição usa parâmetros distintos, para não medir só o cache da lista
+            for i in pending:
+                start = time.perf_counter()
+                response = await client.get(url, {'bench': i})
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    raise CommandError(f'{url} respondeu {response.status_code}.')
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for client in clients))
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        return requests / elapsed, statistics.median(latencies) * 1000, p99 * 1000
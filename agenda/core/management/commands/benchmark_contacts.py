@@ -0,0 +1,140 @@
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from core import benchmark
+
+TARGETS = ('client', 'wsgi')
+
+
+class Command(BaseCommand):
+    help = ('Mede vazão, latência p50/p99, consultas e pico de memória por requisição das operações '
+            'do CRUD de contatos, com 10 mil a 1 milhão de contatos, e compara com um baseline.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10000],
+                            help='Tamanhos da agenda medidos (ex.: 10000 100000 1000000).')
+        parser.add_argument('--requests', type=int, default=200, help='Requisições por operação.')
+        parser.add_argument('--login-requests', type=int, default=10,
+                            help='Requisições de login (cada uma calcula o hash da senha).')
+        parser.add_argument('--concurrency', type=int, default=8,
+                            help='Clientes simultâneos nos alvos HTTP.')
+        parser.add_argument('--memory-samples', type=int, default=10,
+                            help='Requisições por operação medidas com tracemalloc (alvo client).')
+        parser.add_argument('--targets', nargs='+', choices=TARGETS, default=list(TARGETS))
+        parser.add_argument('--url', help='Mede um servidor externo (uvicorn, gunicorn) que usa o mesmo '
+                                          'banco configurado; substitui --targets.')
+        parser.add_argument('--current-database', action='store_true',
+                            help='Usa o banco configurado, não um banco separado (implícito com --url).')
+        parser.add_argument('--database',
+                            default=os.path.join(tempfile.gettempdir(), 'agenda-benchmark.sqlite3'),
+                            help='Arquivo do banco separado, no SQLite.')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Mantém o banco separado e seus contatos para a próxima execução.')
+        parser.add_argument('--output', help='Grava os resultados em JSON neste arquivo.')
+        parser.add_argument('--baseline', help='JSON de uma execução anterior para comparar.')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Piora tolerada em latência, vazão e memória (fração).')
+
+    def handle(self, *args, **options):
+        if min(options['rows']) < 1 or options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--rows, --requests e --concurrency devem ser positivos.')
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as f:
+                baseline = json.load(f)
+
+        separate = not (options['url'] or options['current_database'])
+        if separate:
+            old_name = self.setup_database(options)
+        try:
+            # Os alvos no processo rodam com Server-Timing, de onde o alvo wsgi lê as consultas
+            middleware = ['core.middleware.ServerTimingMiddleware'] + [
+                name for name in settings.MIDDLEWARE if name != 'core.middleware.ServerTimingMiddleware']
+            with override_settings(MIDDLEWARE=middleware,
+                                   ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver', '127.0.0.1']):
+                results = self.run(options)
+        finally:
+            if separate:
+                connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+        self.report(results)
+        document = {'meta': benchmark.metadata(options['requests'], options['concurrency']),
+                    'results': results}
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(document, f, indent=2)
+                f.write('\n')
+        if baseline is not None:
+            self.compare(baseline, results, options['tolerance'])
+
+    def setup_database(self, options):
+        old_name = connection.settings_dict['NAME']
+        if connection.vendor == 'sqlite':
+            connection.settings_dict.setdefault('TEST', {})['NAME'] = options['database']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False,
+                                           keepdb=options['keepdb'])
+        return old_name
+
+    def get_user(self):
+        # Usuário próprio: com o owner em todas as consultas, os contatos de outros
+        # usuários do banco não entram na medição
+        user, _ = get_user_model().objects.get_or_create(username=benchmark.USERNAME,
+                                                         defaults={'email': benchmark.EMAIL})
+        user.set_password(benchmark.PASSWORD)
+        user.save()
+        return user
+
+    def run(self, options):
+        user = self.get_user()
+        results = []
+        for rows in sorted(set(options['rows'])):
+            inserted = benchmark.seed(user, rows)
+            self.stderr.write(f'{rows} contatos ({inserted} inseridos agora).')
+            workload = benchmark.Workload(user, rows)
+            if options['url']:
+                targets = [benchmark.HttpTarget('http', options['url'], options['concurrency'])]
+                results.extend(self.measure_all(targets, workload, options))
+                continue
+            targets = [benchmark.ClientTarget(user)] if 'client' in options['targets'] else []
+            if 'wsgi' in options['targets']:
+                with benchmark.WSGIServerThread() as server:
+                    targets.append(benchmark.HttpTarget('wsgi', server.url, options['concurrency']))
+                    results.extend(self.measure_all(targets, workload, options))
+            else:
+                results.extend(self.measure_all(targets, workload, options))
+        return results
+
+    def measure_all(self, targets, workload, options):
+        results = []
+        for target in targets:
+            for operation in benchmark.OPERATIONS:
+                requests = options['login_requests'] if operation == 'login' else options['requests']
+                samples = min(options['memory_samples'], requests)
+                results.append(benchmark.measure(target, workload, operation, requests, samples))
+        return results
+
+    def report(self, results):
+        self.stdout.write(f"{'linhas':>9} {'alvo':<7}{'operação':<10}{'req/s':>10}{'p50 ms':>10}"
+                          f"{'p99 ms':>10}{'consultas':>11}{'pico KiB':>10}{'erros':>7}")
+        for result in results:
+            queries = '-' if result['queries'] is None else f"{result['queries']:.2f}"
+            peak = '-' if result['peak_kib'] is None else f"{result['peak_kib']:.1f}"
+            self.stdout.write(f"{result['rows']:>9} {result['target']:<7}{result['operation']:<10}"
+                              f"{result['throughput']:>10.1f}{result['p50_ms']:>10.2f}"
+                              f"{result['p99_ms']:>10.2f}{queries:>11}{peak:>10}{result['errors']:>7}")
+
+    def compare(self, baseline, results, tolerance):
+        regressions = benchmark.compare(baseline, results, tolerance)
+        for result, metric, old, new in regressions:
+            self.stdout.write(f"Regressão: {result['operation']} ({result['target']}, {result['rows']} "
+                              f"linhas) {metric} {old} -> {new}")
+        if regressions:
+            raise CommandError(f'{len(regressions)} regressões em relação ao baseline.')
+        self.stdout.write('Sem regressões em relação ao baseline.')
@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.exporters import FORMATS, export_chunks
+from core.models import Agenda
+
+
+class Command(BaseCommand):
+    help = 'Exporta os contatos (todos, ou os de um usuário) em CSV, JSON Lines ou vCard 3.0.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--output', default='-', help="Arquivo de saída ou '-' para a saída padrão.")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--owner', help='Username: exporta só os contatos deste usuário.')
+
+    def handle(self, *args, **options):
+        queryset = None
+        if options['owner']:
+            try:
+                owner = get_user_model().objects.get_by_natural_key(options['owner'])
+            except get_user_model().DoesNotExist:
+                raise CommandError("Usuário '%s' não encontrado." % options['owner'])
+            queryset = Agenda.objects.filter(owner=owner)
+        chunks = export_chunks(options['format'], queryset=queryset, chunk_size=options['chunk_size'])
+        if options['output'] == '-':
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+            for chunk in chunks:
+                output.write(chunk)
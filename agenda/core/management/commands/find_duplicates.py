@@ -0,0 +1,52 @@
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core import dedup
+from core.models import Agenda
+
+
+class Command(BaseCommand):
+    help = ('Encontra grupos de contatos duplicados (mesmo telefone, e-mail ou nome com a mesma '
+            'pronúncia e o mesmo final de telefone ou usuário de e-mail) e grava um grupo por linha '
+            'em JSON, para revisão e merge.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--owner', help='Só os contatos deste usuário (username).')
+        parser.add_argument('--keys', nargs='+', choices=dedup.KEYS, default=list(dedup.KEYS),
+                            help='Chaves que identificam uma duplicata.')
+        parser.add_argument('--chunk-size', type=int, default=dedup.DEFAULT_CHUNK_SIZE,
+                            help='Contatos lidos do banco por vez.')
+        parser.add_argument('--output', help='Arquivo JSONL de saída (padrão: a saída padrão).')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size deve ser positivo.')
+        queryset = Agenda.objects.all()
+        if options['owner']:
+            try:
+                owner = get_user_model().objects.get_by_natural_key(options['owner'])
+            except get_user_model().DoesNotExist:
+                raise CommandError("Usuário '%s' não encontrado." % options['owner'])
+            queryset = queryset.filter(owner=owner)
+
+        finder = dedup.DuplicateFinder(options['keys'], options['chunk_size'])
+        began = time.perf_counter()
+        clusters = duplicates = 0
+        output = open(options['output'], 'w', encoding='utf-8') if options['output'] else None
+        try:
+            for cluster in finder.describe(finder.clusters(queryset)):
+                clusters += 1
+                duplicates += len(cluster['ids']) - 1
+                line = json.dumps(cluster, ensure_ascii=False)
+                if output is not None:
+                    output.write(line + '\n')
+                else:
+                    self.stdout.write(line)
+        finally:
+            if output is not None:
+                output.close()
+        self.stderr.write(f'{finder.rows} contatos lidos em {time.perf_counter() - began:.1f} s: '
+                          f'{clusters} grupos, {duplicates} contatos a remover no merge.')
@@ -0,0 +1,64 @@
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from core import unique_keys
+from core.importers import get_upsert_key, import_csv
+from core.models import UNIQUE_KEYS
+
+
+class Command(BaseCommand):
+    help = 'Importa contatos de um arquivo CSV (colunas nome_completo, telefone, email, observacao).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Arquivo CSV ou '-' para a entrada padrão.")
+        parser.add_argument('--owner', required=True, help='Username do dono dos contatos importados.')
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--max-errors', type=int, default=None,
+                            help='Quantas linhas com erro listar no relatório.')
+        parser.add_argument('--encoding', default='utf-8-sig')
+        parser.add_argument('--upsert', choices=list(UNIQUE_KEYS), default=None,
+                            help='Atualiza o contato do dono com a mesma chave em vez de inserir outro '
+                                 '(padrão: AGENDA_UPSERT_KEY); exige a chave criada por unique_contacts.')
+
+    def handle(self, *args, **options):
+        try:
+            options['owner'] = get_user_model().objects.get_by_natural_key(options['owner'])
+        except get_user_model().DoesNotExist:
+            raise CommandError("Usuário '%s' não encontrado." % options['owner'])
+        if options['upsert'] is None:
+            options['upsert'] = get_upsert_key()
+        elif not unique_keys.is_installed(options['upsert']):
+            raise CommandError(f"A chave única {options['upsert']} não existe: crie-a com "
+                               f"unique_contacts add --keys {options['upsert']}.")
+        began = time.perf_counter()
+        try:
+            if options['path'] == '-':
+                report = self.run(sys.stdin, options)
+            else:
+                with open(options['path'], encoding=options['encoding'], newline='') as stream:
+                    report = self.run(stream, options)
+        except OSError as error:
+            raise CommandError(error)
+        except ValidationError as error:
+            raise CommandError(' '.join(error.messages))
+        elapsed = time.perf_counter() - began
+
+        for line, errors in report.errors:
+            for field, messages in errors.items():
+                self.stderr.write(f"linha {line}: {field}: {' '.join(messages)}")
+        if report.truncated:
+            self.stderr.write(f'... e mais {report.error_count - len(report.errors)} linhas com erro.')
+        updated = f'{report.updated} atualizados, {report.duplicates} repetidos no arquivo, ' \
+            if options['upsert'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{report.created} contatos importados, {updated}{report.error_count} linhas com erro '
+            f'de {report.rows} lidas em {elapsed:.1f} s ({report.rows / elapsed:.0f} linhas/s).'
+        ))
+
+    def run(self, stream, options):
+        return import_csv(stream, options['owner'], batch_size=options['batch_size'], max_errors=options['max_errors'],
+                          upsert_key=options['upsert'])
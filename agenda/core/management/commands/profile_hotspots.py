@@ -0,0 +1,38 @@
+import io
+import pstats
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import profiling
+
+
+class Command(BaseCommand):
+    help = 'Soma os perfis recentes gravados pelo ProfilingMiddleware e lista as funções mais caras.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help='Diretório dos perfis (padrão: AGENDA_PROFILING_DIR).')
+        parser.add_argument('--view', help='Só os perfis desta view (nome da URL).')
+        parser.add_argument('--last', type=int, default=50, help='Quantos perfis recentes somar.')
+        parser.add_argument('--top', type=int, default=25, help='Quantas funções listar.')
+        parser.add_argument('--sort', choices=['cumulative', 'tottime', 'calls'], default='cumulative')
+
+    def handle(self, *args, **options):
+        files = profiling.profile_files(options['dir'])
+        if options['view']:
+            files = [profile for profile in files if profile.view == options['view']]
+        files = files[-options['last']:] if options['last'] > 0 else []
+        if not files:
+            raise CommandError('Nenhum perfil encontrado.')
+
+        views = {}
+        for profile in files:
+            views.setdefault(profile.view, []).append(profile.duration_ms)
+        self.stdout.write(f'{len(files)} perfis:')
+        for view, durations in sorted(views.items()):
+            self.stdout.write(f'  {view}: {len(durations)} requisições, média de '
+                              f'{sum(durations) / len(durations):.0f} ms, máximo de {max(durations)} ms')
+
+        output = io.StringIO()
+        stats = pstats.Stats(*(profile.path for profile in files), stream=output)
+        stats.strip_dirs().sort_stats(options['sort']).print_stats(options['top'])
+        self.stdout.write(output.getvalue(), ending='')
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core import fts
+
+
+class Command(BaseCommand):
+    help = 'Recria o índice de texto completo (FTS5) dos contatos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if not fts.is_supported(connection):
+            raise CommandError('O índice de texto completo só está disponível no SQLite.')
+        fts.install(connection)
+        fts.rebuild(connection)
+        self.stdout.write(self.style.SUCCESS('Índice de busca recriado.'))
@@ -0,0 +1,77 @@
+import multiprocessing
+import time
+from contextlib import nullcontext
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from core import synthetic
+from core.models import Agenda
+
+
+def insert_task(task):
+    return synthetic.insert_batch(*task)
+
+
+class Command(BaseCommand):
+    help = ('Gera contatos sintéticos (nomes brasileiros, telefones e e-mails válidos) para um '
+            'usuário, de forma determinística a partir de uma semente.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, required=True, help='Quantos contatos gerar.')
+        parser.add_argument('--owner', required=True, help='Username do dono dos contatos.')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Semente: a mesma semente, início e lote geram os mesmos contatos.')
+        parser.add_argument('--start', type=int,
+                            help='Número do primeiro contato (padrão: quantos o usuário já tem), '
+                                 'usado nos e-mails e na semente de cada lote.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Contatos por bulk_create.')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Processos inserindo lotes em paralelo (ignorado no SQLite, que '
+                                 'aceita um escritor por vez).')
+        parser.add_argument('--defer-indexes', action='store_true',
+                            help='Remove os índices de core_agenda durante a carga e os recria no '
+                                 'final; bem mais rápido para milhões de linhas, mas a lista e a '
+                                 'busca ficam lentas até o fim.')
+
+    def handle(self, *args, **options):
+        if options['count'] < 1 or options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--count, --batch-size e --workers devem ser positivos.')
+        try:
+            owner = get_user_model().objects.get_by_natural_key(options['owner'])
+        except get_user_model().DoesNotExist:
+            raise CommandError("Usuário '%s' não encontrado." % options['owner'])
+        workers = options['workers']
+        if workers > 1 and connection.vendor == 'sqlite':
+            self.stderr.write('SQLite aceita um escritor por vez: usando um processo.')
+            workers = 1
+
+        start = options['start']
+        if start is None:
+            start = Agenda.objects.filter(owner=owner).count()
+        tasks = [(owner.pk, options['seed'], first, count)
+                 for first, count in synthetic.batches(start, options['count'], options['batch_size'])]
+
+        began = time.perf_counter()
+        with synthetic.deferred_indexes(connection) if options['defer_indexes'] else nullcontext():
+            if workers == 1:
+                created = self.report(map(insert_task, tasks), options['count'], began)
+            else:
+                # Cada processo abre a própria conexão; a do pai não pode ser herdada aberta
+                connections.close_all()
+                with multiprocessing.Pool(workers, initializer=django.setup) as pool:
+                    created = self.report(pool.imap_unordered(insert_task, tasks), options['count'], began)
+        elapsed = time.perf_counter() - began
+        self.stdout.write(f'{created} contatos criados para {owner.get_username()} em {elapsed:.1f} s '
+                          f'({created / elapsed:.0f}/s).')
+
+    def report(self, counts, total, began):
+        created, step = 0, max(total // 10, 1)
+        for count in counts:
+            previous, created = created, created + count
+            if created < total and created // step > previous // step:
+                rate = created / (time.perf_counter() - began)
+                self.stdout.write(f'  {created}/{total} ({rate:.0f}/s)')
+        return created
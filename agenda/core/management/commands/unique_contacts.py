@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from core import unique_keys
+from core.models import UNIQUE_KEYS, unique_constraint
+
+
+class Command(BaseCommand):
+    help = ('Cria, remove ou lista as chaves únicas por dono sobre o e-mail e o telefone '
+            'normalizados, usadas pelo upsert (AGENDA_UPSERT_KEY). As chaves criadas são '
+            'recriadas pelo migrate se uma migração refizer a tabela.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['status', 'add', 'drop'], nargs='?', default='status')
+        parser.add_argument('--keys', nargs='+', choices=list(UNIQUE_KEYS), default=list(UNIQUE_KEYS))
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        database = options['database']
+        installed = unique_keys.installed(database)
+        keys = options['keys']
+        if options['action'] == 'add':
+            keys = [key for key in keys if key not in installed]
+            for key in keys:
+                duplicates = unique_keys.duplicate_groups(key, database)
+                if duplicates:
+                    raise CommandError(
+                        f'{duplicates} grupos de contatos com o mesmo {key} para um dono; '
+                        f'faça o merge antes (find_duplicates --keys {key}).')
+            unique_keys.install(keys, database)
+        elif options['action'] == 'drop':
+            unique_keys.uninstall([key for key in keys if key in installed], database)
+        installed = unique_keys.installed(database)
+        for key in UNIQUE_KEYS:
+            state = 'criada' if key in installed else 'ausente'
+            self.stdout.write(f'{key}: {state} ({unique_constraint(key).name})')
@@ -0,0 +1,253 @@
+import glob
+import ipaddress
+import json
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+
+from django.conf import settings
+
+# Métricas no formato de exposição do Prometheus, somadas entre processos,
+# ligadas com AGENDA_METRICS (desligadas, inc() não faz nada). Cada processo
+# escreve só no próprio arquivo mapeado em memória (metrics-<pid>.db em
+# AGENDA_METRICS_DIR), com um lock entre as suas threads; /metrics lê e soma
+# todos os arquivos. O número de arquivos acompanha o de processos: esvazie o
+# diretório ao iniciar o deploy. Arquivos de processos antigos continuam
+# somando, como os contadores do Prometheus esperam.
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+
+HELP = {
+    'agenda_requests_total': ('counter', 'Requisições por view, método e status.'),
+    'agenda_request_duration_seconds': ('histogram', 'Duração das requisições por view.'),
+    'agenda_db_queries_total': ('counter', 'Consultas SQL por view.'),
+    'agenda_list_cache_requests_total': ('counter', 'Leituras do cache da lista por resultado.'),
+    'agenda_login_blocked_total': ('counter', 'Tentativas de login bloqueadas pelo limite, por escopo.'),
+    'agenda_contacts': ('gauge', 'Número de contatos (contador mantido em AgendaVersion).'),
+}
+
+INITIAL_SIZE = 64 * 1024
+HEADER = struct.Struct('i')
+
+
+def is_enabled():
+    return getattr(settings, 'AGENDA_METRICS', False)
+
+
+def ip_allowed(ip):
+    """Se ip está em AGENDA_METRICS_ALLOWED_IPS (endereços ou redes, como 10.0.0.0/8)."""
+    try:
+        address = ipaddress.ip_address(ip or '')
+    except ValueError:
+        return False
+    networks = getattr(settings, 'AGENDA_METRICS_ALLOWED_IPS', ())
+    return any(address in ipaddress.ip_network(network.strip(), strict=False)
+               for network in networks if network.strip())
+
+
+def get_dir():
+    return getattr(settings, 'AGENDA_METRICS_DIR', None) or os.path.join(tempfile.gettempdir(),
+                                                                           'agenda-metrics')
+
+
+class MmapedDict:
+    """Dicionário chave -> float em um arquivo mapeado em memória.
+
+    Layout: 4 bytes com o total usado, depois entradas (tamanho da chave,
+    chave alinhada em 8 bytes, valor double). A entrada é escrita antes de o
+    total ser atualizado, então um leitor nunca vê uma entrada pela metade.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a+b')
+        if os.fstat(self._file.fileno()).st_size < INITIAL_SIZE:
+            self._file.truncate(INITIAL_SIZE)
+        self._capacity = os.fstat(self._file.fileno()).st_size
+        self._mmap = mmap.mmap(self._file.fileno(), self._capacity)
+        self._positions = {}
+        self._lock = threading.Lock()
+        used = HEADER.unpack_from(self._mmap, 0)[0]
+        if used == 0:
+            used = 8
+            HEADER.pack_into(self._mmap, 0, used)
+        self._used = used
+        for key, _, position in self._entries(self._mmap, used):
+            self._positions[key] = position
+
+    @staticmethod
+    def _entries(data, used):
+        position = 8
+        while position < used:
+            size = HEADER.unpack_from(data, position)[0]
+            key = bytes(data[position + 4:position + 4 + size]).decode()
+            position += 4 + size + (-(4 + size) % 8)
+            yield key, struct.unpack_from('d', data, position)[0], position
+            position += 8
+
+    @classmethod
+    def read(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < 8:
+            return
+        for key, value, _ in cls._entries(data, HEADER.unpack_from(data, 0)[0]):
+            yield key, value
+
+    def _allocate(self, key):
+        encoded = key.encode()
+        padding = -(4 + len(encoded)) % 8
+        size = 4 + len(encoded) + padding + 8
+        if self._used + size > self._capacity:
+            self._capacity *= 2
+            self._file.truncate(self._capacity)
+            self._mmap.close()
+            self._mmap = mmap.mmap(self._file.fileno(), self._capacity)
+        start = self._used
+        HEADER.pack_into(self._mmap, start, len(encoded))
+        self._mmap[start + 4:start + 4 + len(encoded)] = encoded
+        position = start + 4 + len(encoded) + padding
+        struct.pack_into('d', self._mmap, position, 0.0)
+        self._used += size
+        HEADER.pack_into(self._mmap, 0, self._used)
+        self._positions[key] = position
+        return position
+
+    def add(self, key, amount):
+        with self._lock:
+            position = self._positions.get(key)
+            if position is None:
+                position = self._allocate(key)
+            value = struct.unpack_from('d', self._mmap, position)[0]
+            struct.pack_into('d', self._mmap, position, value + amount)
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def _forget_store():
+    # Depois do fork o filho abre o próprio arquivo, com locks novos
+    global _store, _store_lock
+    _store, _store_lock = None, threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_store)
+
+
+def get_store():
+    global _store
+    directory = get_dir()
+    path = os.path.join(directory, f'metrics-{os.getpid()}.db')
+    store = _store
+    if store is None or store.path != path:
+        with _store_lock:
+            if _store is None or _store.path != path:
+                os.makedirs(directory, exist_ok=True)
+                _store = MmapedDict(path)
+            store = _store
+    return store
+
+
+def sample_key(name, labels):
+    return json.dumps([name, sorted(labels.items())], separators=(',', ':'))
+
+
+def inc(name, labels, amount=1.0):
+    if not is_enabled():
+        return
+    get_store().add(sample_key(name, labels), amount)
+
+
+def observe_request(view, method, status, duration, queries):
+    if not is_enabled():
+        return
+    inc('agenda_requests_total', {'view': view, 'method': method, 'status': str(status)})
+    bucket = next(b for b in BUCKETS if duration <= b)
+    inc('agenda_request_duration_seconds_bucket', {'view': view, 'le': format_value(bucket)})
+    inc('agenda_request_duration_seconds_sum', {'view': view}, duration)
+    inc('agenda_request_duration_seconds_count', {'view': view})
+    inc('agenda_db_queries_total', {'view': view}, queries)
+
+
+def collect():
+    """Soma os valores de todos os arquivos: {(nome, labels): valor}."""
+    totals = {}
+    for path in glob.glob(os.path.join(get_dir(), 'metrics-*.db')):
+        for key, value in MmapedDict.read(path):
+            name, labels = json.loads(key)
+            sample = (name, tuple(tuple(pair) for pair in labels))
+            totals[sample] = totals.get(sample, 0.0) + value
+    return totals
+
+
+def value(name, labels=None):
+    """Valor somado de uma amostra entre todos os processos (0 se ausente)."""
+    return collect().get((name, tuple(sorted((labels or {}).items()))), 0.0)
+
+
+def format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_sample(name, labels, value):
+    if labels:
+        pairs = ','.join(f'{key}="{escape(val)}"' for key, val in labels)
+        return f'{name}{{{pairs}}} {format_value(value)}'
+    return f'{name} {format_value(value)}'
+
+
+def histogram_lines(samples, name):
+    # Os arquivos guardam a contagem de cada faixa; a exposição é acumulada
+    views = {}
+    for (sample, labels), value in samples.items():
+        if sample.startswith(name):
+            labels = dict(labels)
+            views.setdefault(labels.pop('view'), {})[(sample, labels.get('le'))] = value
+    lines = []
+    for view, values in sorted(views.items()):
+        total = 0.0
+        for bucket in BUCKETS:
+            le = format_value(bucket)
+            total += values.get((f'{name}_bucket', le), 0.0)
+            lines.append(format_sample(f'{name}_bucket', (('view', view), ('le', le)), total))
+        for suffix in ('_sum', '_count'):
+            value = values.get((name + suffix, None), 0.0)
+            lines.append(format_sample(name + suffix, (('view', view),), value))
+    return lines
+
+
+def render(extra=None):
+    """Texto do formato de exposição do Prometheus (versão 0.0.4)."""
+    samples = collect()
+    families = {'agenda_request_duration_seconds':
+                histogram_lines(samples, 'agenda_request_duration_seconds')}
+    for (name, labels), value in sorted(samples.items()):
+        if not name.startswith('agenda_request_duration_seconds'):
+            families.setdefault(name, []).append(format_sample(name, labels, value))
+    for name, labels, value in extra or ():
+        families.setdefault(name, []).append(format_sample(name, tuple(sorted(labels.items())), value))
+    lines = []
+    for family, samples in sorted(families.items()):
+        if not samples:
+            continue
+        kind, description = HELP.get(family, ('untyped', ''))
+        lines.append(f'# HELP {family} {description}')
+        lines.append(f'# TYPE {family} {kind}')
+        lines.extend(samples)
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,294 @@
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import get_user_model
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+from core import metrics, profiling, replicas, timing
+from core.cache import get_cache
+
+# Usuário autenticado em cache, para não ler auth_user a cada requisição.
+# A entrada é por usuário e só é usada se o hash de sessão ainda confere, como
+# em auth.get_user(); salvar o usuário (troca de senha, desativação,
+# last_login) ou fazer logout apaga a entrada (ver core.signals).
+
+DEFAULT_TIMEOUT = 300
+
+
+def user_key(user_id):
+    return f'agenda:user:{user_id}'
+
+
+def get_timeout():
+    return getattr(settings, 'AGENDA_USER_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+
+
+def invalidate_user(user_id):
+    get_cache().delete(user_key(user_id))
+
+
+def _session_user_id(request):
+    try:
+        user_id = get_user_model()._meta.pk.to_python(request.session[auth.SESSION_KEY])
+    except KeyError:
+        return None
+    if request.session.get(auth.BACKEND_SESSION_KEY) not in settings.AUTHENTICATION_BACKENDS:
+        return None
+    return user_id
+
+
+def _verified(request, user):
+    session_hash = request.session.get(auth.HASH_SESSION_KEY)
+    return bool(session_hash) and constant_time_compare(session_hash, user.get_session_auth_hash())
+
+
+def get_cached_user(request):
+    if not hasattr(request, '_cached_user'):
+        user_id = _session_user_id(request)
+        user = get_cache().get(user_key(user_id)) if user_id is not None else None
+        if user is None or not _verified(request, user):
+            # Caminho normal: consulta o banco, verifica a sessão e a encerra se inválida
+            user = auth.get_user(request)
+            if user.is_authenticated:
+                get_cache().set(user_key(user.pk), user, get_timeout())
+        request._cached_user = user
+    return request._cached_user
+
+
+async def aget_cached_user(request):
+    if not hasattr(request, '_acached_user'):
+        user_id = await request.session.aget(auth.SESSION_KEY)
+        user = await get_cache().aget(user_key(user_id)) if user_id is not None else None
+        backend = await request.session.aget(auth.BACKEND_SESSION_KEY)
+        if (user is None or backend not in settings.AUTHENTICATION_BACKENDS
+                or not _verified(request, user)):
+            user = await auth.aget_user(request)
+            if user.is_authenticated:
+                await get_cache().aset(user_key(user.pk), user, get_timeout())
+        request._acached_user = user
+    return request._acached_user
+
+
+class CachedUserMiddleware:
+    """Substitui o request.user do AuthenticationMiddleware (deve vir depois dele)."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _install(self, request):
+        request.user = SimpleLazyObject(lambda: get_cached_user(request))
+        request.auser = lambda: aget_cached_user(request)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self._install(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        self._install(request)
+        return await self.get_response(request)
+
+
+class ServerTimingMiddleware:
+    """Header Server-Timing com tempo de banco, de template e total, e o número
+    de consultas; registra em core.timing as requisições e consultas lentas.
+
+    Deve ser o primeiro middleware, para que o total inclua os demais.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_request_ms, self.slow_query_ms = timing.get_thresholds()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _start(self):
+        timings = timing.RequestTimings(self.slow_query_ms)
+        return timings, timing.current.set(timings)
+
+    def _finish(self, request, response, timings):
+        response['Server-Timing'] = timings.header()
+        total_ms = timings.total * 1000
+        if total_ms >= self.slow_request_ms:
+            timing.logger.warning(
+                'Requisição lenta: %s %s %.1f ms (banco %.1f ms em %d consultas, template %.1f ms)',
+                request.method, request.path, total_ms, timings.db * 1000, timings.queries,
+                timings.template * 1000)
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings, token = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            timing.current.reset(token)
+        return self._finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings, token = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            timing.current.reset(token)
+        return self._finish(request, response, timings)
+
+
+class MetricsMiddleware:
+    """Contadores e histograma por view para o endpoint /metrics (core.metrics).
+
+    Reaproveita a medição do ServerTimingMiddleware quando ele está ativo;
+    senão instala a própria, para contar as consultas da requisição.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_query_ms = timing.get_thresholds()[1]
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _start(self):
+        timings = timing.current.get()
+        if timings is not None:
+            return timings, None
+        timings = timing.RequestTimings(self.slow_query_ms)
+        return timings, timing.current.set(timings)
+
+    def _finish(self, request, response, timings):
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else 'unmatched'
+        metrics.observe_request(view, request.method, response.status_code, timings.total,
+                                timings.queries)
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings, token = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                timing.current.reset(token)
+        return self._finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings, token = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                timing.current.reset(token)
+        return self._finish(request, response, timings)
+
+
+class ProfilingMiddleware:
+    """Grava um perfil cProfile das requisições escolhidas por core.profiling.wanted.
+
+    A resposta medida traz o header X-Agenda-Profile com o nome do arquivo.
+    Em ASGI o perfil cobre a thread do event loop: views síncronas rodam em
+    outra thread (sync_to_async) e ficam de fora; use o deploy WSGI para elas.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _start(self, request):
+        return profiling.start() if profiling.wanted(request) else None
+
+    def _finish(self, request, response, profiler, start):
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else 'unmatched'
+        name = profiling.save(profiler, view, request.method, response.status_code,
+                              perf_counter() - start)
+        response[profiling.HEADER] = name
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profiler = self._start(request)
+        if profiler is None:
+            return self.get_response(request)
+        start = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiling.stop(profiler)
+        return self._finish(request, response, profiler, start)
+
+    async def __acall__(self, request):
+        profiler = self._start(request)
+        if profiler is None:
+            return await self.get_response(request)
+        start = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiling.stop(profiler)
+        return self._finish(request, response, profiler, start)
+
+
+class ReplicaPinningMiddleware:
+    """Estado das réplicas de leitura por requisição (core.replicas).
+
+    Lê o cookie que fixa o cliente no primário e o renova quando a requisição
+    escreve. Deve vir antes do SessionMiddleware, para ver a gravação da sessão.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _start(self, request):
+        routing = replicas.Routing(pinned=replicas.PIN_COOKIE in request.COOKIES)
+        return routing, replicas.current.set(routing)
+
+    def _finish(self, response, routing):
+        if routing.wrote:
+            response.set_cookie(replicas.PIN_COOKIE, '1', max_age=replicas.get_pin_seconds(),
+                                httponly=True, samesite='Lax')
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        routing, token = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            replicas.current.reset(token)
+        return self._finish(response, routing)
+
+    async def __acall__(self, request):
+        routing, token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            replicas.current.reset(token)
+        return self._finish(response, routing)
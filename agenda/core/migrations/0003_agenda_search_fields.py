@@ -0,0 +1,79 @@
+import unicodedata
+
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+
+# Cópia congelada da normalização desta migração: core.normalization pode mudar
+# (e ganhar colunas) sem alterar o que uma migração antiga grava
+
+def strip_accents(value):
+    decomposed = unicodedata.normalize('NFKD', value)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def search_values(nome_completo, telefone, email):
+    return {
+        'nome_busca': ' '.join(strip_accents(nome_completo or '').lower().split()),
+        'telefone_digitos': ''.join(c for c in (telefone or '') if c.isdigit()),
+        'email_busca': (email or '').strip().lower(),
+    }
+
+
+def backfill_search_fields(apps, schema_editor):
+    Agenda = apps.get_model('core', 'Agenda')
+    manager = Agenda.objects.using(schema_editor.connection.alias)
+    last_id = 0
+    while True:
+        batch = list(
+            manager.filter(id__gt=last_id).order_by('id')
+            .only('id', 'nome_completo', 'telefone', 'email')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for agenda in batch:
+            for field, value in search_values(agenda.nome_completo, agenda.telefone, agenda.email).items():
+                setattr(agenda, field, value)
+        manager.bulk_update(batch, ['nome_busca', 'telefone_digitos', 'email_busca'])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_agenda_nome_id_index'),
+    ]
+
+    # Os índices são criados depois do preenchimento, que assim não paga a
+    # manutenção do índice linha a linha.
+    operations = [
+        migrations.AddField(
+            model_name='agenda',
+            name='nome_busca',
+            field=models.CharField(default='', editable=False, max_length=150),
+        ),
+        migrations.AddField(
+            model_name='agenda',
+            name='telefone_digitos',
+            field=models.CharField(default='', editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='agenda',
+            name='email_busca',
+            field=models.CharField(default='', editable=False, max_length=254),
+        ),
+        migrations.RunPython(backfill_search_fields, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='agenda',
+            index=models.Index(fields=['nome_busca'], name='core_agenda_nome_busca_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='agenda',
+            index=models.Index(fields=['telefone_digitos'], name='core_agenda_tel_digitos_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='agenda',
+            index=models.Index(fields=['email_busca'], name='core_agenda_email_busca_idx'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+from django.db import migrations
+
+# Cópia congelada do SQL de core.fts: o módulo pode mudar sem alterar o que
+# esta migração cria. Só no SQLite (FTS5).
+
+TRIGGERS_SQL = [
+    """CREATE TRIGGER IF NOT EXISTS core_agenda_fts_ai AFTER INSERT ON core_agenda BEGIN
+        INSERT INTO core_agenda_fts(rowid, nome_completo, email, observacao)
+        VALUES (new.id, new.nome_completo, new.email, new.observacao);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS core_agenda_fts_ad AFTER DELETE ON core_agenda BEGIN
+        INSERT INTO core_agenda_fts(core_agenda_fts, rowid, nome_completo, email, observacao)
+        VALUES ('delete', old.id, old.nome_completo, old.email, old.observacao);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS core_agenda_fts_au
+        AFTER UPDATE OF nome_completo, email, observacao ON core_agenda BEGIN
+        INSERT INTO core_agenda_fts(core_agenda_fts, rowid, nome_completo, email, observacao)
+        VALUES ('delete', old.id, old.nome_completo, old.email, old.observacao);
+        INSERT INTO core_agenda_fts(rowid, nome_completo, email, observacao)
+        VALUES (new.id, new.nome_completo, new.email, new.observacao);
+    END""",
+]
+
+CREATE_SQL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS core_agenda_fts USING fts5(
+        nome_completo, email, observacao,
+        content='core_agenda', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    *TRIGGERS_SQL,
+    "INSERT INTO core_agenda_fts(core_agenda_fts, rank) VALUES ('rank', 'bm25(10.0, 5.0, 1.0)')",
+    "INSERT INTO core_agenda_fts(core_agenda_fts) VALUES ('rebuild')",
+    "INSERT INTO core_agenda_fts(core_agenda_fts) VALUES ('optimize')",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS core_agenda_fts_ai',
+    'DROP TRIGGER IF EXISTS core_agenda_fts_ad',
+    'DROP TRIGGER IF EXISTS core_agenda_fts_au',
+    'DROP TABLE IF EXISTS core_agenda_fts',
+]
+
+
+def install_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in CREATE_SQL:
+        schema_editor.execute(statement)
+
+
+def uninstall_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_agenda_search_fields'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_fts, uninstall_fts),
+    ]
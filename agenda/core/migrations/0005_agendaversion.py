@@ -0,0 +1,26 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def create_marker(apps, schema_editor):
+    AgendaVersion = apps.get_model('core', 'AgendaVersion')
+    AgendaVersion.objects.using(schema_editor.connection.alias).get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_agenda_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgendaVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=1)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(create_marker, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations
+
+# auth_user pertence ao django.contrib.auth, então o índice usado pelo
+# EmailBackend é criado em SQL em vez de um Meta.indexes.
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0005_agendaversion'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX core_auth_user_email_idx ON auth_user (email);',
+            reverse_sql='DROP INDEX core_auth_user_email_idx;',
+        ),
+    ]
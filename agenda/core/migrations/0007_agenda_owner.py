@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Gatilhos do FTS, cópia congelada de core.fts (a tabela virtual não é
+# recriada com core_agenda; só os gatilhos somem)
+TRIGGERS_SQL = [
+    """CREATE TRIGGER IF NOT EXISTS core_agenda_fts_ai AFTER INSERT ON core_agenda BEGIN
+        INSERT INTO core_agenda_fts(rowid, nome_completo, email, observacao)
+        VALUES (new.id, new.nome_completo, new.email, new.observacao);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS core_agenda_fts_ad AFTER DELETE ON core_agenda BEGIN
+        INSERT INTO core_agenda_fts(core_agenda_fts, rowid, nome_completo, email, observacao)
+        VALUES ('delete', old.id, old.nome_completo, old.email, old.observacao);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS core_agenda_fts_au
+        AFTER UPDATE OF nome_completo, email, observacao ON core_agenda BEGIN
+        INSERT INTO core_agenda_fts(core_agenda_fts, rowid, nome_completo, email, observacao)
+        VALUES ('delete', old.id, old.nome_completo, old.email, old.observacao);
+        INSERT INTO core_agenda_fts(rowid, nome_completo, email, observacao)
+        VALUES (new.id, new.nome_completo, new.email, new.observacao);
+    END""",
+]
+
+
+def assign_owner(apps, schema_editor):
+    # Os contatos existentes passam para o primeiro superusuário (ou usuário)
+    Agenda = apps.get_model('core', 'Agenda')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    db = schema_editor.connection.alias
+    orphans = Agenda.objects.using(db).filter(owner__isnull=True)
+    if not orphans.exists():
+        return
+    owner = (User.objects.using(db).filter(is_superuser=True).order_by('pk').first()
+             or User.objects.using(db).order_by('pk').first())
+    if owner is None:
+        raise RuntimeError('Existem contatos sem dono e nenhum usuário: crie um usuário '
+                           '(createsuperuser) antes de aplicar esta migração.')
+    orphans.update(owner=owner)
+
+
+def install_fts(apps, schema_editor):
+    # AlterField recria core_agenda no SQLite e apaga os gatilhos do FTS
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in TRIGGERS_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0006_auth_user_email_index'),
+    ]
+
+    operations = [
+        # Na reversão, RemoveField também recria a tabela: reinstala os gatilhos no fim
+        migrations.RunPython(migrations.RunPython.noop, install_fts),
+        migrations.RemoveIndex(model_name='agenda', name='core_agenda_nome_id_idx'),
+        migrations.RemoveIndex(model_name='agenda', name='core_agenda_nome_busca_idx'),
+        migrations.RemoveIndex(model_name='agenda', name='core_agenda_tel_digitos_idx'),
+        migrations.RemoveIndex(model_name='agenda', name='core_agenda_email_busca_idx'),
+        migrations.AddField(
+            model_name='agenda',
+            name='owner',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE,
+                                    related_name='contatos', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(assign_owner, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='agenda',
+            name='owner',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE,
+                                    related_name='contatos', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(install_fts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='agenda',
+            index=models.Index(fields=['owner', 'nome_completo', 'id'], name='core_agenda_own_nome_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='agenda',
+            index=models.Index(fields=['owner', 'nome_busca'], name='core_agenda_own_nome_busca_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='agenda',
+            index=models.Index(fields=['owner', 'telefone_digitos'], name='core_agenda_own_tel_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='agenda',
+            index=models.Index(fields=['owner', 'email_busca'], name='core_agenda_own_email_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:57
+
+from django.db import migrations, models
+
+
+def count_rows(apps, schema_editor):
+    db = schema_editor.connection.alias
+    Agenda = apps.get_model('core', 'Agenda')
+    AgendaVersion = apps.get_model('core', 'AgendaVersion')
+    AgendaVersion.objects.using(db).filter(pk=1).update(row_count=Agenda.objects.using(db).count())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_agenda_owner'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agendaversion',
+            name='row_count',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(count_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,123 @@
+# Generated by Django 5.2.1 on 2026-10-18 15:49
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+
+# Cópia congelada de core.phonetic.phonetic_key: as regras podem mudar sem
+# alterar o que esta migração grava (depois, manage.py backfill_phonetic --all)
+
+PARTICLES = frozenset(('da', 'de', 'do', 'das', 'dos', 'e'))
+
+ACCENTED = str.maketrans({'ç': 's', 'Ç': 's'})
+
+RULES = [(re.compile(pattern), replacement) for pattern, replacement in (
+    (r'[^a-z]', ''),
+    (r'ph', 'f'),
+    (r'th', 't'),
+    (r'[cs]h', 'x'),
+    (r'lh', 'l'),
+    (r'nh', 'n'),
+    (r'h', ''),
+    (r'y', 'i'),
+    (r'w', 'v'),
+    (r'c(?=[ei])', 's'),
+    (r'qu(?=[ei])', 'k'),
+    (r'[qc]', 'k'),
+    (r'g(?=[ei])', 'j'),
+    (r'gu(?=[ei])', 'g'),
+    (r'(?<=[aeiou])s(?=[aeiou])', 'z'),
+    (r'z$', 's'),
+    (r'n(?=[bp])', 'm'),
+    (r'(.)\1+', r'\1'),
+)]
+
+
+# Gatilhos do FTS, cópia congelada de core.fts (a tabela virtual não é
+# recriada com core_agenda; só os gatilhos somem)
+TRIGGERS_SQL = [
+    """CREATE TRIGGER IF NOT EXISTS core_agenda_fts_ai AFTER INSERT ON core_agenda BEGIN
+        INSERT INTO core_agenda_fts(rowid, nome_completo, email, observacao)
+        VALUES (new.id, new.nome_completo, new.email, new.observacao);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS core_agenda_fts_ad AFTER DELETE ON core_agenda BEGIN
+        INSERT INTO core_agenda_fts(core_agenda_fts, rowid, nome_completo, email, observacao)
+        VALUES ('delete', old.id, old.nome_completo, old.email, old.observacao);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS core_agenda_fts_au
+        AFTER UPDATE OF nome_completo, email, observacao ON core_agenda BEGIN
+        INSERT INTO core_agenda_fts(core_agenda_fts, rowid, nome_completo, email, observacao)
+        VALUES ('delete', old.id, old.nome_completo, old.email, old.observacao);
+        INSERT INTO core_agenda_fts(rowid, nome_completo, email, observacao)
+        VALUES (new.id, new.nome_completo, new.email, new.observacao);
+    END""",
+]
+
+
+def phonetic_key(name):
+    decomposed = unicodedata.normalize('NFKD', (name or '').translate(ACCENTED))
+    name = ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+    keys = []
+    for word in name.split():
+        if word in PARTICLES:
+            continue
+        for pattern, replacement in RULES:
+            word = pattern.sub(replacement, word)
+        if word:
+            keys.append(word)
+    return ' '.join(keys)
+
+
+def backfill_phonetic(apps, schema_editor):
+    Agenda = apps.get_model('core', 'Agenda')
+    manager = Agenda.objects.using(schema_editor.connection.alias)
+    last_id = 0
+    while True:
+        batch = list(
+            manager.filter(id__gt=last_id).order_by('id')
+            .only('id', 'nome_completo')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for agenda in batch:
+            agenda.nome_fonetico = phonetic_key(agenda.nome_completo)
+        manager.bulk_update(batch, ['nome_fonetico'])
+        last_id = batch[-1].id
+
+
+def install_fts(apps, schema_editor):
+    # AddField recria core_agenda no SQLite e apaga os gatilhos do FTS
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in TRIGGERS_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_agendaversion_row_count'),
+    ]
+
+    # No SQLite, AddField com default recria core_agenda: apaga os gatilhos do
+    # FTS (reinstalados aqui) e as chaves de unique_contacts (recriadas ao fim
+    # do migrate, core.unique_keys). O índice é criado depois do preenchimento,
+    # que assim não paga a manutenção do índice linha a linha.
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, install_fts),
+        migrations.AddField(
+            model_name='agenda',
+            name='nome_fonetico',
+            field=models.CharField(default='', editable=False, max_length=150),
+        ),
+        migrations.RunPython(install_fts, migrations.RunPython.noop),
+        migrations.RunPython(backfill_phonetic, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='agenda',
+            index=models.Index(fields=['owner', 'nome_fonetico'], name='core_agenda_own_nome_fon_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+import time
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def split_marker(apps, schema_editor):
+    # O marcador global vira um por usuário. As versões novas partem do relógio,
+    # à frente de qualquer ETag ou chave de cache já entregue
+    db = schema_editor.connection.alias
+    Agenda = apps.get_model('core', 'Agenda')
+    AgendaVersion = apps.get_model('core', 'AgendaVersion')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    AgendaVersion.objects.using(db).all().delete()
+    counts = dict(Agenda.objects.using(db).values_list('owner_id').annotate(n=Count('id')).order_by())
+    version = time.time_ns() // 1000
+    AgendaVersion.objects.using(db).bulk_create(
+        [AgendaVersion(owner_id=pk, version=version, row_count=counts.get(pk, 0))
+         for pk in User.objects.using(db).values_list('pk', flat=True).iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_agenda_nome_fonetico'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    # Os usuários novos ganham o marcador ao serem criados (core.signals)
+    operations = [
+        migrations.AddField(
+            model_name='agendaversion',
+            name='owner',
+            field=models.OneToOneField(null=True, on_delete=django.db.models.deletion.CASCADE,
+                                       related_name='agenda_version', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(split_marker, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='agendaversion',
+            name='owner',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE,
+                                       related_name='agenda_version', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
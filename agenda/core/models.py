@@ -1,10 +1,260 @@
-from django.db import models
+import time
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import models, router, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.lookups import Exact
+from django.utils import timezone
+
+from core.normalization import search_values
+
+SEARCH_FIELDS = ('nome_busca', 'nome_fonetico', 'telefone_digitos', 'email_busca')
+
+# Chaves únicas opcionais por dono, sobre as colunas normalizadas. Não ficam no
+# Meta: uma tabela com duplicatas não aceitaria a migração. São criadas e
+# removidas pelo comando unique_contacts, depois do merge das duplicatas
+# (find_duplicates), e recriadas pelo migrate (core.unique_keys); com elas,
+# AGENDA_UPSERT_KEY liga o upsert.
+UNIQUE_KEYS = {'email': 'email_busca', 'telefone': 'telefone_digitos'}
+UPSERT_FIELDS = ('nome_completo', 'telefone', 'email', 'observacao', *SEARCH_FIELDS)
+
+
+def unique_constraint(key):
+    field = UNIQUE_KEYS[key]
+    return models.UniqueConstraint(fields=['owner', field], name=f'core_agenda_own_{field}_uniq')
+
+
+class AgendaVersion(models.Model):
+    """Marcador de modificação dos contatos de um dono (uma linha por usuário).
+
+    Toda escrita em Agenda incrementa a versão dos donos afetados na mesma
+    transação. A versão alimenta o ETag/Last-Modified das leituras e as chaves
+    do cache da lista: a escrita de um usuário não invalida as dos outros, nem
+    disputa a mesma linha. row_count acompanha o número de contatos do dono,
+    sem COUNT(*) (ver /metrics).
+    """
+    owner = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+                                 related_name='agenda_version')
+    version = models.PositiveBigIntegerField(default=1)
+    updated_at = models.DateTimeField(default=timezone.now)
+    row_count = models.BigIntegerField(default=0)
+
+    @property
+    def tag(self):
+        # Versão + instante da escrita: continua única mesmo se o banco voltar a
+        # um estado anterior (backup restaurado, rollback de testes)
+        return f'{self.version}.{int(self.updated_at.timestamp() * 1_000_000)}'
+
+    @classmethod
+    def _recreate(cls, owner_id, using):
+        # Se a linha sumir, recomeça de um valor derivado do relógio, à frente de
+        # qualquer versão já entregue, para não reaproveitar ETags ou chaves de cache
+        marker, _ = cls.objects.using(using).get_or_create(owner_id=owner_id, defaults={
+            'version': time.time_ns() // 1000,
+            'row_count': Agenda.objects.using(using).filter(owner_id=owner_id).count(),
+        })
+        return marker
+
+    @classmethod
+    def current(cls, owner_id, using=None):
+        marker = cls.objects.using(using).filter(owner_id=owner_id).first()
+        return marker if marker is not None else cls._recreate(owner_id, using)
+
+    @classmethod
+    async def acurrent(cls, owner_id, using=None):
+        marker = await cls.objects.using(using).filter(owner_id=owner_id).afirst()
+        return marker if marker is not None else await sync_to_async(cls._recreate)(owner_id, using)
+
+    @classmethod
+    def total_rows(cls, using=None):
+        return cls.objects.using(using).aggregate(total=Sum('row_count'))['total'] or 0
+
+    @classmethod
+    def touch(cls, using=None, owners=()):
+        """Marca uma escrita nos contatos de owners.
+
+        owners é um iterável de ids de dono ou um dict id -> variação no número
+        de contatos. Um UPDATE por variação distinta.
+        """
+        deltas = owners if isinstance(owners, dict) else dict.fromkeys(owners, 0)
+        by_delta = {}
+        for owner_id, delta in deltas.items():
+            by_delta.setdefault(delta, []).append(owner_id)
+        now = timezone.now()
+        for delta, owner_ids in by_delta.items():
+            updated = cls.objects.using(using).filter(owner_id__in=owner_ids).update(
+                version=F('version') + 1, updated_at=now, row_count=F('row_count') + delta)
+            if updated < len(owner_ids):
+                found = set(cls.objects.using(using).filter(owner_id__in=owner_ids)
+                            .values_list('owner_id', flat=True))
+                for owner_id in owner_ids:
+                    if owner_id not in found:
+                        cls._recreate(owner_id, using)
+
+
+class AgendaQuerySet(models.QuerySet):
+    # Toda escrita em lote atualiza o marcador de modificação dos donos afetados
+
+    def _filtered_owner(self):
+        """Dono fixado por filter(owner=...) neste queryset, ou None.
+
+        As views sempre filtram pelo dono: a escrita não precisa de uma consulta
+        a mais para saber qual marcador atualizar.
+        """
+        where = self.query.where
+        if where.connector != 'AND' or where.negated:
+            return None
+        owner = self.model._meta.get_field('owner')
+        for child in where.children:
+            if (isinstance(child, Exact) and getattr(child.lhs, 'target', None) is owner
+                    and not hasattr(child.rhs, 'resolve_expression')):
+                return child.rhs
+        return None
+
+    def update(self, **kwargs):
+        with transaction.atomic(using=self.db, savepoint=False):
+            owner_id = self._filtered_owner()
+            owners = [owner_id] if owner_id is not None else \
+                list(self.order_by().values_list('owner_id', flat=True).distinct())
+            rows = super().update(**kwargs)
+            if rows:
+                AgendaVersion.touch(self.db, owners)
+        return rows
+
+    def delete(self):
+        with transaction.atomic(using=self.db, savepoint=False):
+            owner_id = self._filtered_owner()
+            counts = None if owner_id is not None else dict(
+                self.order_by().values_list('owner_id').annotate(n=Count('id')))
+            deleted = super().delete()
+            if deleted[0]:
+                if counts is None:
+                    counts = {owner_id: deleted[1].get(self.model._meta.label, 0)}
+                AgendaVersion.touch(self.db, {owner: -n for owner, n in counts.items()})
+        return deleted
+
+    def bulk_create(self, objs, *args, **kwargs):
+        if kwargs.get('update_conflicts'):
+            return self._upsert(list(objs), *args, **kwargs)[0]
+        with transaction.atomic(using=self.db, savepoint=False):
+            created = super().bulk_create(objs, *args, **kwargs)
+            if created:
+                AgendaVersion.touch(self.db, Counter(obj.owner_id for obj in created))
+        return created
+
+    def _upsert(self, objs, *args, **kwargs):
+        # As linhas que já existiam viram UPDATE: só as novas contam em row_count
+        with transaction.atomic(using=self.db, savepoint=False):
+            existing = self._count_existing(objs, kwargs['unique_fields'])
+            created = super().bulk_create(objs, *args, **kwargs)
+            if created:
+                deltas = Counter(obj.owner_id for obj in created)
+                deltas.subtract(existing)
+                AgendaVersion.touch(self.db, dict(deltas))
+        return created, existing.total()
+
+    def _count_existing(self, objs, unique_fields):
+        # Quantas das chaves de objs já existem, por dono (unique_fields inclui owner)
+        attnames = [self.model._meta.get_field(name).attname for name in unique_fields]
+        keys = {tuple(getattr(obj, attname) for attname in attnames) for obj in objs}
+        lookups = {f'{attname}__in': {key[i] for key in keys} for i, attname in enumerate(attnames)}
+        found = self.model._base_manager.using(self.db).filter(**lookups).values_list(*attnames)
+        owner = attnames.index('owner_id')
+        return Counter(key[owner] for key in keys.intersection(found))
+
+    def upsert(self, objs, key):
+        """Insere ou atualiza pela chave única do dono (ver unique_constraint).
+
+        Um INSERT ... ON CONFLICT DO UPDATE por lote; retorna (inseridos,
+        atualizados). Exige a chave criada por unique_contacts.
+        """
+        field = UNIQUE_KEYS[key]
+        for obj in objs:
+            obj.refresh_search_fields()
+        # A mesma instrução não pode atualizar uma linha duas vezes: vale a última
+        objs = list({(obj.owner_id, getattr(obj, field)): obj for obj in objs}.values())
+        if not objs:
+            return 0, 0
+        _, existing = self._upsert(objs, update_conflicts=True, unique_fields=['owner', field],
+                                   update_fields=UPSERT_FIELDS)
+        return len(objs) - existing, existing
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        with transaction.atomic(using=self.db, savepoint=False):
+            rows = super().bulk_update(objs, fields, *args, **kwargs)
+            if rows:
+                AgendaVersion.touch(self.db, {obj.owner_id for obj in objs})
+        return rows
+
+    @staticmethod
+    def _with_search_values(fields):
+        return {**fields, **search_values(
+            nome_completo=fields.get('nome_completo'),
+            telefone=fields.get('telefone'),
+            email=fields.get('email'),
+        )}
+
+    def update_contact(self, **fields):
+        """update() que também recalcula as colunas de busca afetadas."""
+        return self.update(**self._with_search_values(fields))
+
+    async def aupdate_contact(self, **fields):
+        return await self.aupdate(**self._with_search_values(fields))
+
 
 class Agenda(models.Model):
+    # Sem índice próprio: os índices compostos abaixo começam por owner
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+                              related_name='contatos', db_index=False)
     nome_completo = models.CharField(max_length=150)
     telefone = models.CharField(max_length=20)
     email = models.EmailField()
     observacao = models.TextField(blank=True)
 
+    # Colunas normalizadas e indexadas para a busca (mantidas pelo save)
+    nome_busca = models.CharField(max_length=150, editable=False, default='')
+    # Chave fonética do nome (core.phonetic), para a busca aproximada
+    nome_fonetico = models.CharField(max_length=150, editable=False, default='')
+    telefone_digitos = models.CharField(max_length=20, editable=False, default='')
+    email_busca = models.CharField(max_length=254, editable=False, default='')
+
+    objects = AgendaQuerySet.as_manager()
+
+    class Meta:
+        # Toda leitura é filtrada por owner: os índices começam por ele, e o custo
+        # da lista e da busca depende só dos contatos do usuário
+        indexes = [
+            # Suporta a paginação por cursor de show_contact
+            models.Index(fields=['owner', 'nome_completo', 'id'], name='core_agenda_own_nome_id_idx'),
+            models.Index(fields=['owner', 'nome_busca'], name='core_agenda_own_nome_busca_idx'),
+            models.Index(fields=['owner', 'nome_fonetico'], name='core_agenda_own_nome_fon_idx'),
+            models.Index(fields=['owner', 'telefone_digitos'], name='core_agenda_own_tel_idx'),
+            models.Index(fields=['owner', 'email_busca'], name='core_agenda_own_email_idx'),
+        ]
+
     def __str__(self):
         return f"{self.nome_completo} - {self.email}"
+
+    def refresh_search_fields(self):
+        for field, value in search_values(self.nome_completo, self.telefone, self.email).items():
+            setattr(self, field, value)
+
+    def save(self, *args, **kwargs):
+        self.refresh_search_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *SEARCH_FIELDS}
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        adding = self._state.adding
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+            AgendaVersion.touch(using, {self.owner_id: 1 if adding else 0})
+
+    def delete(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            deleted = super().delete(*args, **kwargs)
+            AgendaVersion.touch(using, {self.owner_id: -deleted[1].get(self._meta.label, 0)})
+        return deleted
@@ -0,0 +1,53 @@
+import re
+import unicodedata
+
+# Formas normalizadas usadas pelas colunas de busca de Agenda.
+# "João  da Silva" -> "joao da silva", "(19) 99999-0000" -> "19999990000",
+# e a chave fonética do nome: "Luiz da Souza" -> "luis souza"
+
+
+NON_DIGITS = re.compile(r'\D')
+
+
+def strip_accents(value):
+    if value.isascii():
+        return value
+    decomposed = unicodedata.normalize('NFKD', value)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def normalize_name(value):
+    return ' '.join(strip_accents(value or '').lower().split())
+
+
+def normalize_email(value):
+    return (value or '').strip().lower()
+
+
+def phone_digits(value):
+    return NON_DIGITS.sub('', value or '')
+
+
+def phonetic_name(value):
+    # Import tardio: core.phonetic usa normalize_name deste módulo
+    from core.phonetic import phonetic_key
+    return phonetic_key(value)
+
+
+# (campo de origem, coluna de busca, normalização)
+SEARCH_SOURCES = (
+    ('nome_completo', 'nome_busca', normalize_name),
+    ('nome_completo', 'nome_fonetico', phonetic_name),
+    ('telefone', 'telefone_digitos', phone_digits),
+    ('email', 'email_busca', normalize_email),
+)
+
+
+def search_values(nome_completo=None, telefone=None, email=None):
+    """Valores das colunas de busca para os campos informados (None = ausente)."""
+    given = {'nome_completo': nome_completo, 'telefone': telefone, 'email': email}
+    return {
+        target: normalize(given[source])
+        for source, target, normalize in SEARCH_SOURCES
+        if given[source] is not None
+    }
@@ -0,0 +1,110 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.db.models import Q
+
+# Paginação por cursor (keyset) sobre (nome_completo, id).
+# O custo de qualquer página é o de uma busca no índice, ao contrário do OFFSET,
+# que precisa percorrer todas as linhas anteriores.
+
+DEFAULT_PAGE_SIZE = 50
+DEFAULT_MAX_PAGE_SIZE = 500
+
+
+def get_page_size(value=None):
+    default = getattr(settings, 'AGENDA_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    maximum = getattr(settings, 'AGENDA_MAX_PAGE_SIZE', DEFAULT_MAX_PAGE_SIZE)
+    try:
+        size = int(value) if value else default
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, maximum))
+
+
+def encode_cursor(nome_completo, pk):
+    raw = json.dumps([nome_completo, pk], ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        nome_completo, pk = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError, binascii.Error, UnicodeError):
+        return None
+    if not isinstance(nome_completo, str) or not isinstance(pk, int):
+        return None
+    return nome_completo, pk
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor=None, previous_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def keyset_queryset(queryset, after=None, before=None, page_size=None):
+    """Retorna o queryset fatiado (uma linha a mais que a página) e a direção."""
+    page_size = get_page_size(page_size)
+    before_key = decode_cursor(before)
+    if before_key is not None:
+        nome, pk = before_key
+        queryset = queryset.filter(
+            Q(nome_completo__lt=nome) | Q(nome_completo=nome, id__lt=pk)
+        ).order_by('-nome_completo', '-id')
+        return queryset[:page_size + 1], 'previous', page_size
+
+    after_key = decode_cursor(after)
+    if after_key is not None:
+        nome, pk = after_key
+        queryset = queryset.filter(
+            Q(nome_completo__gt=nome) | Q(nome_completo=nome, id__gt=pk)
+        )
+    return queryset.order_by('nome_completo', 'id')[:page_size + 1], 'next', page_size
+
+
+def build_page(rows, direction, page_size, has_cursor):
+    rows = list(rows)
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if direction == 'previous':
+        rows.reverse()
+        has_next, has_previous = True, has_more
+    else:
+        has_next, has_previous = has_more, has_cursor
+    next_cursor = previous_cursor = None
+    if rows and has_next:
+        next_cursor = encode_cursor(rows[-1].nome_completo, rows[-1].id)
+    if rows and has_previous:
+        previous_cursor = encode_cursor(rows[0].nome_completo, rows[0].id)
+    return KeysetPage(rows, next_cursor, previous_cursor)
+
+
+def keyset_paginate(queryset, after=None, before=None, page_size=None):
+    sliced, direction, size = keyset_queryset(queryset, after, before, page_size)
+    return build_page(sliced, direction, size, has_cursor=decode_cursor(after) is not None)
+
+
+async def akeyset_paginate(queryset, after=None, before=None, page_size=None):
+    sliced, direction, size = keyset_queryset(queryset, after, before, page_size)
+    rows = [row async for row in sliced]
+    return build_page(rows, direction, size, has_cursor=decode_cursor(after) is not None)
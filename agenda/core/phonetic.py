@@ -0,0 +1,56 @@
+import re
+from functools import lru_cache
+
+from core.normalization import normalize_name
+
+# Chave fonética de nomes em português, usada como chave de bloqueio na busca
+# de duplicatas (core.dedup) e guardada em Agenda.nome_fonetico para a busca
+# aproximada (core.search). Não pretende ser uma transcrição: só aproxima
+# grafias que soam igual, como Luiz/Luis, Thiago/Tiago, Raphael/Rafael,
+# Souza/Sousa, Kátia/Cátia, Isabella/Izabela e Gonçalves/Gonsalves. Acentos,
+# caixa e espaços saem em normalize_name; partículas (da, de, dos...) não
+# entram na chave.
+# Mudar as regras exige recalcular a coluna: manage.py backfill_phonetic --all.
+
+PARTICLES = frozenset(('da', 'de', 'do', 'das', 'dos', 'e'))
+
+# Letras cujo som depende do acento, trocadas antes de normalize_name removê-lo:
+# sem a cedilha, "ç" viraria "c" e depois "k"
+ACCENTED = str.maketrans({'ç': 's', 'Ç': 's'})
+
+# Aplicadas em ordem a cada palavra
+RULES = [(re.compile(pattern), replacement) for pattern, replacement in (
+    (r'[^a-z]', ''),
+    (r'ph', 'f'),
+    (r'th', 't'),
+    (r'[cs]h', 'x'),
+    (r'lh', 'l'),
+    (r'nh', 'n'),
+    (r'h', ''),
+    (r'y', 'i'),
+    (r'w', 'v'),
+    (r'c(?=[ei])', 's'),
+    (r'qu(?=[ei])', 'k'),  # "que", "gui": o u não soa
+    (r'[qc]', 'k'),
+    (r'g(?=[ei])', 'j'),
+    (r'gu(?=[ei])', 'g'),
+    (r'(?<=[aeiou])s(?=[aeiou])', 'z'),  # "Sousa" soa como "Souza"
+    (r'z$', 's'),  # "Luiz" soa como "Luis"
+    (r'n(?=[bp])', 'm'),
+    (r'(.)\1+', r'\1'),
+)]
+
+
+@lru_cache(maxsize=65536)
+def word_key(word):
+    for pattern, replacement in RULES:
+        word = pattern.sub(replacement, word)
+    return word
+
+
+# Nomes se repetem muito numa importação (mesmos nomes e sobrenomes comuns)
+@lru_cache(maxsize=65536)
+def phonetic_key(name):
+    """Chave fonética do nome: uma por palavra, sem partículas ("" se vazio)."""
+    words = (word_key(word) for word in normalize_name((name or '').translate(ACCENTED)).split() if word not in PARTICLES)
+    return ' '.join(word for word in words if word)
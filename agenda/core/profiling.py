@@ -0,0 +1,102 @@
+import cProfile
+import glob
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
+
+# Perfis cProfile de requisições escolhidas, para ProfilingMiddleware.
+# Uma requisição é medida por sorteio (AGENDA_PROFILING_SAMPLE_RATE) ou quando
+# traz o header X-Agenda-Profile com AGENDA_PROFILING_TOKEN. Só um perfil roda
+# por vez em cada processo: o cProfile mede a thread inteira e dois perfis
+# simultâneos se sobreporiam; quem chega com outro em andamento não é medido.
+# Cada perfil vira um arquivo .prof (formato do pstats) em AGENDA_PROFILING_DIR,
+# que guarda só os AGENDA_PROFILING_KEEP mais recentes. O comando
+# profile_hotspots soma os arquivos e lista as funções mais caras.
+
+HEADER = 'X-Agenda-Profile'
+
+DEFAULT_KEEP = 200
+
+ProfileFile = namedtuple('ProfileFile', 'path timestamp view method status duration_ms')
+
+FILE_NAME = re.compile(r'^(?P<timestamp>\d+)-\d+-(?P<view>[\w.]+)-(?P<method>[A-Z]+)'
+                       r'-(?P<status>\d+)-(?P<duration_ms>\d+)ms\.prof$')
+
+_running = threading.Lock()
+
+
+def get_dir():
+    return getattr(settings, 'AGENDA_PROFILING_DIR', None) or os.path.join(tempfile.gettempdir(),
+                                                                             'agenda-profiles')
+
+
+def get_keep():
+    return getattr(settings, 'AGENDA_PROFILING_KEEP', DEFAULT_KEEP)
+
+
+def wanted(request):
+    token = getattr(settings, 'AGENDA_PROFILING_TOKEN', '')
+    header = request.headers.get(HEADER)
+    if token and header and constant_time_compare(header, token):
+        return True
+    rate = getattr(settings, 'AGENDA_PROFILING_SAMPLE_RATE', 0)
+    return rate > 0 and random.random() < rate
+
+
+def start():
+    """Liga um perfil, ou devolve None se já houver outro em andamento."""
+    if not _running.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Outra ferramenta de profiling já está ativa
+        _running.release()
+        return None
+    return profiler
+
+
+def stop(profiler):
+    try:
+        profiler.disable()
+    finally:
+        _running.release()
+
+
+def save(profiler, view, method, status, duration):
+    directory = get_dir()
+    os.makedirs(directory, exist_ok=True)
+    view = re.sub(r'[^\w.]', '_', view)
+    name = f'{time.time_ns()}-{os.getpid()}-{view}-{method}-{status}-{round(duration * 1000)}ms.prof'
+    profiler.dump_stats(os.path.join(directory, name))
+    rotate(directory, get_keep())
+    return name
+
+
+def profile_files(directory=None):
+    """Perfis do diretório, do mais antigo ao mais recente."""
+    files = []
+    for path in glob.glob(os.path.join(directory or get_dir(), '*.prof')):
+        match = FILE_NAME.match(os.path.basename(path))
+        if match:
+            files.append(ProfileFile(path, int(match['timestamp']), match['view'], match['method'],
+                                     int(match['status']), int(match['duration_ms'])))
+    return sorted(files, key=lambda profile: profile.timestamp)
+
+
+def rotate(directory, keep):
+    files = profile_files(directory)
+    for profile in files[:max(len(files) - keep, 0)]:
+        try:
+            os.remove(profile.path)
+        except FileNotFoundError:
+            # Já removido pela rotação de outro processo
+            pass
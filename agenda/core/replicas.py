@@ -0,0 +1,104 @@
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+
+# Leituras das views de consulta nas réplicas (AGENDA_READ_REPLICAS).
+# As views marcadas com replica_reads leem os contatos de uma réplica
+# sorteada; todo o resto, inclusive sessão e usuário, fica no primário.
+# Réplicas atrasam: a requisição que escreve (o roteador vê cada escrita)
+# recebe o cookie PIN_COOKIE e, enquanto ele vale, as leituras desse cliente
+# vão ao primário. Assim o redirect para home depois de um cadastro, e as
+# listas abertas em seguida, já veem a escrita.
+#
+# O estado da requisição fica numa ContextVar, criada por
+# ReplicaPinningMiddleware; sem o middleware, tudo é lido do primário.
+
+PIN_COOKIE = 'agenda_primary'
+DEFAULT_PIN_SECONDS = 5
+
+# Apps lidos das réplicas: os contatos e o marcador de versão
+REPLICA_APPS = {'core'}
+
+current = ContextVar('agenda_replica_routing', default=None)
+
+
+class Routing:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.alias = None
+        self.wrote = False
+
+
+def get_replicas():
+    return getattr(settings, 'AGENDA_READ_REPLICAS', [])
+
+
+def get_pin_seconds():
+    return getattr(settings, 'AGENDA_REPLICA_PIN_SECONDS', DEFAULT_PIN_SECONDS)
+
+
+def read_alias():
+    """Réplica das leituras em curso, ou None (primário)."""
+    routing = current.get()
+    if routing is None or routing.wrote:
+        return None
+    return routing.alias
+
+
+def _choose(request):
+    routing = current.get()
+    replicas = get_replicas()
+    if routing is None or routing.pinned or not replicas or request.method not in ('GET', 'HEAD'):
+        return None
+    routing.alias = random.choice(replicas)
+    return routing
+
+
+def replica_reads(view):
+    """Lê os contatos de uma réplica nos GETs da view, se o cliente não está fixado."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            routing = _choose(request)
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                if routing is not None:
+                    routing.alias = None
+        return wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        routing = _choose(request)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            if routing is not None:
+                routing.alias = None
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in REPLICA_APPS:
+            return read_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        routing = current.get()
+        if routing is not None:
+            routing.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {'default', *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # As réplicas recebem o esquema pela replicação
+        return False if db in get_replicas() else None
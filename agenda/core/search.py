@@ -0,0 +1,45 @@
+from django.db.models import Q
+
+from core.normalization import normalize_email, normalize_name, phone_digits
+from core.phonetic import phonetic_key
+
+# Maior code point possível: "prefixo" <= valor < "prefixo" + PREFIX_END
+# é uma faixa que usa o índice B-tree em qualquer banco, ao contrário de LIKE.
+PREFIX_END = '\U0010ffff'
+
+
+def prefix_filter(field, prefix):
+    return Q(**{f'{field}__gte': prefix, f'{field}__lt': prefix + PREFIX_END})
+
+
+def search_filter(query, fuzzy=False):
+    """Monta o filtro de busca: telefone por dígitos, e-mail ou prefixo do nome.
+
+    Com fuzzy, o nome casa pela chave fonética (core.phonetic): "Luis" encontra
+    "Luiz" e "Teresa" encontra "Tereza", pelo mesmo índice por faixa.
+    """
+    query = (query or '').strip()
+    if not query:
+        return None
+    if '@' in query:
+        return prefix_filter('email_busca', normalize_email(query))
+    digits = phone_digits(query)
+    if digits and not any(c.isalpha() for c in query):
+        return prefix_filter('telefone_digitos', digits)
+    nome = normalize_name(query)
+    if not nome:
+        return None
+    key = phonetic_key(query) if fuzzy else ''
+    if key:
+        # Só o nome: com o OR do e-mail, o SQLite deixa a faixa do índice e
+        # percorre todos os contatos do dono
+        return prefix_filter('nome_fonetico', key)
+    # Só partículas ("da") não geram chave: fica a busca exata
+    return prefix_filter('nome_busca', nome) | prefix_filter('email_busca', normalize_email(query))
+
+
+def search_contacts(queryset, query, fuzzy=False):
+    condition = search_filter(query, fuzzy)
+    if condition is None:
+        return queryset
+    return queryset.filter(condition)
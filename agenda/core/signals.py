@@ -0,0 +1,66 @@
+import sys
+
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_out
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_migrate
+from django.dispatch import receiver
+
+from core import timing, unique_keys
+from core.middleware import invalidate_user
+from core.models import AgendaVersion
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_contacts_marker(sender, instance, created, using, raw=False, **kwargs):
+    # Com o marcador já criado, toda escrita nos contatos é um único UPDATE nele
+    if created and not raw:
+        AgendaVersion.objects.using(using).create(owner=instance)
+
+
+@receiver(user_logged_out)
+def invalidate_cached_user_on_logout(sender, request, user, **kwargs):
+    if user is not None:
+        invalidate_user(user.pk)
+
+
+@receiver(connection_created)
+def install_query_timing(sender, connection, **kwargs):
+    timing.install(connection)
+
+
+
+# As chaves de unique_contacts estão fora do estado das migrações: as que uma
+# migração apagar (o SQLite recria core_agenda) são recriadas ao final
+
+_unique_keys_before = {}
+
+
+@receiver(pre_migrate)
+def remember_unique_keys(sender, app_config, using, **kwargs):
+    if app_config.name == 'core':
+        _unique_keys_before[using] = unique_keys.installed(using)
+
+
+@receiver(post_migrate)
+def restore_unique_keys(sender, app_config, using, verbosity=1, stdout=None, **kwargs):
+    if app_config.name != 'core':
+        return
+    keys = _unique_keys_before.pop(using, None)
+    if not keys:
+        return
+    restored, blocked = unique_keys.restore(keys, using)
+    stdout = stdout or sys.stdout
+    for key in restored:
+        if verbosity >= 1:
+            stdout.write(f'  Chave única {key} de unique_contacts recriada.\n')
+    for key, groups in blocked.items():
+        # Aviso mesmo com verbosity 0: o upsert por esta chave deixa de funcionar
+        stdout.write(f'  AVISO: chave única {key} de unique_contacts não recriada: {groups} grupos '
+                     f'de contatos duplicados (find_duplicates --keys {key}, depois unique_contacts add).\n')
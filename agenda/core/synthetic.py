@@ -0,0 +1,115 @@
+import random
+import unicodedata
+from contextlib import contextmanager
+
+from core.models import Agenda
+from core.normalization import search_values
+
+# Contatos sintéticos para benchmarks e planejamento de capacidade.
+# Os dados passam pela validação de AgendaForm: nomes só com letras e espaços,
+# telefones de 10 (fixo) ou 11 dígitos (celular) com DDD real e e-mails
+# @fatec.sp.gov.br. Cada lote usa um gerador próprio semeado pela semente e
+# pela posição da primeira linha, então o resultado não depende da ordem em
+# que os lotes são inseridos nem de quantos processos os inserem.
+#
+# Para cargas de milhões de linhas, deferred_indexes() remove os índices de
+# core_agenda durante a carga e os recria no final: manter os índices
+# compostos linha a linha custa mais que a própria inserção.
+
+FIRST_NAMES = (
+    'Ana', 'Adriana', 'Alessandra', 'Aline', 'Amanda', 'Antônio', 'Beatriz', 'Bruna', 'Bruno',
+    'Camila', 'Carlos', 'Cláudia', 'Conceição', 'Daniel', 'Daniela', 'Diego', 'Eduardo', 'Fábio',
+    'Felipe', 'Fernanda', 'Francisco', 'Gabriel', 'Gabriela', 'Guilherme', 'Gustavo', 'Helena',
+    'Igor', 'Isabela', 'João', 'Jéssica', 'José', 'Juliana', 'Larissa', 'Leonardo', 'Letícia',
+    'Lucas', 'Luciana', 'Luiz', 'Marcelo', 'Márcia', 'Marcos', 'Maria', 'Mariana', 'Matheus',
+    'Natália', 'Otávio', 'Patrícia', 'Paulo', 'Pedro', 'Rafael', 'Rafaela', 'Renata', 'Ricardo',
+    'Rodrigo', 'Sandra', 'Sérgio', 'Tatiane', 'Thiago', 'Vanessa', 'Vinícius', 'Vitória', 'Wagner',
+)
+
+SURNAMES = (
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira', 'Lima',
+    'Gomes', 'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida', 'Lopes', 'Soares', 'Fernandes',
+    'Vieira', 'Barbosa', 'Rocha', 'Dias', 'Nascimento', 'Andrade', 'Moreira', 'Nunes', 'Marques',
+    'Machado', 'Mendes', 'Freitas', 'Cardoso', 'Ramos', 'Gonçalves', 'Santana', 'Teixeira',
+    'Araújo', 'Correia', 'Moura', 'Cavalcanti', 'Monteiro', 'Batista', 'Fonseca', 'Conceição',
+)
+
+# "Maria da Silva", "João dos Santos"
+PARTICLES = ('da', 'de', 'do', 'dos', 'das')
+
+# DDDs do Brasil; São Paulo aparece mais vezes, como na base real
+AREA_CODES = (
+    '11', '11', '11', '12', '13', '14', '15', '16', '17', '18', '19', '19', '19',
+    '21', '22', '24', '27', '28', '31', '32', '33', '34', '35', '37', '38', '41', '42', '43',
+    '44', '45', '46', '47', '48', '49', '51', '53', '54', '55', '61', '62', '63', '64', '65',
+    '66', '67', '68', '69', '71', '73', '74', '75', '77', '79', '81', '82', '83', '84', '85',
+    '86', '87', '88', '89', '91', '92', '93', '94', '95', '96', '97', '98', '99',
+)
+
+NOTES = ('Colega de turma', 'Trabalho', 'Família', 'Professor', 'Estágio', 'Grupo do TCC',
+         'Fornecedor', 'Vizinho')
+
+DOMAIN = 'fatec.sp.gov.br'
+
+
+def ascii_lower(text):
+    return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode().lower()
+
+
+def contact(rng, number):
+    """Dados de um contato; number entra no e-mail para que ele seja único."""
+    first = rng.choice(FIRST_NAMES)
+    surnames = rng.sample(SURNAMES, rng.choice((1, 2, 2, 3)))
+    if rng.random() < 0.15:
+        surnames.insert(-1, rng.choice(PARTICLES))
+    if rng.random() < 0.7:
+        # Celular: 9 + 8 dígitos; fixo: começa de 2 a 5 e tem 8 dígitos
+        telefone = f'{rng.choice(AREA_CODES)}9{rng.randrange(10 ** 8):08d}'
+    else:
+        telefone = f'{rng.choice(AREA_CODES)}{rng.randint(2, 5)}{rng.randrange(10 ** 7):07d}'
+    return {
+        'nome_completo': ' '.join([first, *surnames]),
+        'telefone': telefone,
+        'email': f'{ascii_lower(first)}.{ascii_lower(surnames[-1])}{number}@{DOMAIN}',
+        'observacao': rng.choice(NOTES) if rng.random() < 0.2 else '',
+    }
+
+
+def generate(seed, start, count):
+    """Os contatos start..start+count-1 de uma semente, como um lote."""
+    rng = random.Random(f'{seed}:{start}')
+    return [contact(rng, number) for number in range(start, start + count)]
+
+
+def generate_rows(seed, start, count):
+    """Como generate, já com as colunas de busca (sem passar por Agenda.save)."""
+    rows = generate(seed, start, count)
+    for data in rows:
+        data.update(search_values(data['nome_completo'], data['telefone'], data['email']))
+    return rows
+
+
+def insert_batch(owner_id, seed, start, count):
+    rows = generate_rows(seed, start, count)
+    return len(Agenda.objects.bulk_create([Agenda(owner_id=owner_id, **data) for data in rows]))
+
+
+def batches(start, count, batch_size):
+    """(início, tamanho) de cada lote."""
+    end = start + count
+    return [(first, min(batch_size, end - first)) for first in range(start, end, batch_size)]
+
+
+@contextmanager
+def deferred_indexes(connection):
+    """Remove os índices do Meta de Agenda e os recria ao sair, mesmo com erro."""
+    indexes = Agenda._meta.indexes
+    with connection.schema_editor() as editor:
+        for index in indexes:
+            editor.remove_index(Agenda, index)
+    try:
+        yield
+    finally:
+        with connection.schema_editor() as editor:
+            for index in indexes:
+                editor.add_index(Agenda, index)
@@ -0,0 +1,27 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class AgendaTestRunner(DiscoverRunner):
+    """Aponta métricas e perfis para um diretório temporário, apagado no final.
+
+    Sem isso, os testes gravariam nos diretórios padrão, compartilhados com o
+    servidor de desenvolvimento.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._directory = tempfile.mkdtemp(prefix='agenda-tests-')
+        self._saved = {name: getattr(settings, name, None)
+                       for name in ('AGENDA_METRICS_DIR', 'AGENDA_PROFILING_DIR')}
+        settings.AGENDA_METRICS_DIR = f'{self._directory}/metrics'
+        settings.AGENDA_PROFILING_DIR = f'{self._directory}/profiles'
+
+    def teardown_test_environment(self, **kwargs):
+        for name, value in self._saved.items():
+            setattr(settings, name, value)
+        shutil.rmtree(self._directory, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
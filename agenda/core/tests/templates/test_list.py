@@ -14,12 +14,14 @@ class List_Contact_OK_Test(TestCase):
         self.login_url = reverse('login')
         self.list_url = reverse('show_contact')
         self.agenda = Agenda.objects.create(
+            owner=new_user,
             nome_completo='Renan Marques Test',
             telefone='19987654321',
             email='renan.marques3@fatec.sp.gov.br',
             observacao='teste'
         )
         self.agenda2 = Agenda.objects.create(
+            owner=new_user,
             nome_completo='Renan Marques Test 2',
             telefone='19912345678',
             email='renan.marques.teste2@fatec.sp.gov.br',
@@ -0,0 +1,106 @@
+from io import StringIO
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, AsyncClient
+from django.urls import reverse
+from http import HTTPStatus
+from core import async_views
+from core.models import Agenda
+
+
+class AsyncViewsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='admin', email='admin@fatec.sp.gov.br',
+                                             password='fatec')
+        self.contact = Agenda.objects.create(nome_completo='Renan Marques', telefone='19987654321',
+                                             email='renan@fatec.sp.gov.br', observacao='Teste',
+                                             owner=self.user)
+        self.client = AsyncClient()
+
+    def test_views_are_coroutines(self):
+        """Testa que as views não passam pelo pool do sync_to_async"""
+        for name in ('login', 'logout', 'register_contact', 'show_contact', 'edit_contact',
+                     'delete_contact'):
+            with self.subTest(view=name):
+                self.assertTrue(iscoroutinefunction(getattr(async_views, name)))
+
+    async def test_requires_login(self):
+        response = await self.client.get(reverse('async_show_contact'))
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    async def test_login_and_logout(self):
+        """Testa o fluxo de login e logout assíncrono"""
+        response = await self.client.post(reverse('async_login'),
+                                          {'email': 'admin@fatec.sp.gov.br', 'password': 'fatec'})
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        response = await self.client.get(reverse('async_show_contact'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        await self.client.post(reverse('async_logout'))
+        response = await self.client.get(reverse('async_show_contact'))
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    async def test_login_wrong_password(self):
+        response = await self.client.post(reverse('async_login'),
+                                          {'email': 'admin@fatec.sp.gov.br', 'password': 'errada'})
+        self.assertContains(response, 'Senha incorreta para o e-mail informado.')
+
+    async def test_show_contact(self):
+        """Testa a lista, o cache e o GET condicional na versão assíncrona"""
+        await self.client.aforce_login(self.user)
+        first = await self.client.get(reverse('async_show_contact'))
+        self.assertContains(first, 'Renan Marques')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        second = await self.client.get(reverse('async_show_contact'))
+        self.assertEqual(second['X-Cache'], 'HIT')
+        response = await self.client.get(reverse('async_show_contact'),
+                                         headers={'if-none-match': first['ETag']})
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    async def test_register_edit_delete(self):
+        """Testa cadastro, edição e exclusão pelas views assíncronas"""
+        await self.client.aforce_login(self.user)
+        data = {'nome_completo': 'Ana Lima', 'telefone': '19999999999',
+                'email': 'ana@fatec.sp.gov.br', 'observacao': ''}
+        response = await self.client.post(reverse('async_register_contact'), data)
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        ana = await Agenda.objects.aget(nome_completo='Ana Lima')
+        self.assertEqual(ana.nome_busca, 'ana lima')
+
+        response = await self.client.post(reverse('async_edit_contact'),
+                                          dict(data, id=ana.id, nome_completo='Ana Maria'))
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        ana = await Agenda.objects.aget(id=ana.id)
+        self.assertEqual(ana.nome_busca, 'ana maria')
+
+        response = await self.client.post(reverse('async_delete_contact'), {'id': ana.id})
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        self.assertFalse(await Agenda.objects.filter(id=ana.id).aexists())
+
+    async def test_not_found_messages(self):
+        """Testa que as mensagens de erro são as mesmas das views síncronas"""
+        await self.client.aforce_login(self.user)
+        response = await self.client.post(reverse('async_edit_contact'), {
+            'id': 9999, 'nome_completo': 'Ana', 'telefone': '19999999999',
+            'email': 'ana@fatec.sp.gov.br', 'observacao': ''})
+        self.assertEqual(response.context['errors'], 'Contato nao encontrado.')
+        response = await self.client.post(reverse('async_delete_contact'), {'id': 'abc'})
+        self.assertEqual(response.context['errors'], 'Contato não encontrado.')
+        response = await self.client.post(reverse('async_register_contact'), {})
+        self.assertTrue(response.context['error'])
+
+
+class BenchmarkAsyncViewsCommandTest(TestCase):
+    def test_reports_every_view(self):
+        User.objects.create_user(username='admin', email='admin@fatec.sp.gov.br', password='fatec')
+        out = StringIO()
+        call_command('benchmark_async_views', username='admin', requests=4, concurrency=2, stdout=out)
+        for name in ('show_contact', 'async_show_contact', 'edit_contact', 'async_delete_contact'):
+            self.assertIn(name, out.getvalue())
+
+    def test_unknown_user(self):
+        with self.assertRaises(CommandError):
+            call_command('benchmark_async_views', username='ninguem', stdout=StringIO())
@@ -0,0 +1,73 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, Client
+from django.urls import reverse
+from http import HTTPStatus
+from core.models import Agenda
+
+
+class AutocompleteTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.owner = User.objects.create_user(username='admin', email='admin@fatec.sp.gov.br',
+                                              password='fatec')
+        self.client.login(username='admin', password='fatec')
+        self.url = reverse('autocomplete_contact')
+        for nome in ['Ana Souza', 'André Lima', 'Bruno Alves', 'Ângela Dias']:
+            Agenda.objects.create(nome_completo=nome, telefone='19999999999',
+                                  email='contato@fatec.sp.gov.br', observacao='Não deve vazar',
+                                  owner=self.owner)
+
+    def test_requires_login(self):
+        self.client.logout()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_returns_only_id_and_name(self):
+        """Testa que o autocomplete devolve apenas id e nome"""
+        response = self.client.get(self.url, {'q': 'an'})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        results = response.json()['results']
+        self.assertEqual([r['nome_completo'] for r in results], ['Ana Souza', 'André Lima', 'Ângela Dias'])
+        self.assertEqual(set(results[0]), {'id', 'nome_completo'})
+        self.assertNotContains(response, 'Não deve vazar')
+
+    def test_limit(self):
+        """Testa que só os N primeiros resultados são devolvidos"""
+        response = self.client.get(self.url, {'limit': 2})
+        self.assertEqual(len(response.json()['results']), 2)
+        response = self.client.get(self.url, {'limit': 'x'})
+        self.assertEqual(len(response.json()['results']), 4)
+
+    def test_single_query(self):
+        """Testa que a lista não materializa a tabela inteira"""
+        self.client.get(self.url)  # aquece a sessão
+        with self.assertNumQueries(4):  # sessão, usuário, versão e a consulta limitada
+            self.client.get(self.url, {'q': 'b'})
+
+
+class ContactDetailTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.owner = User.objects.create_user(username='admin', email='admin@fatec.sp.gov.br',
+                                              password='fatec')
+        self.client.login(username='admin', password='fatec')
+        self.contact = Agenda.objects.create(nome_completo='Renan Marques', telefone='19987654321',
+                                             email='renan@fatec.sp.gov.br', observacao='Teste',
+                                             owner=self.owner)
+
+    def test_detail(self):
+        """Testa o carregamento dos dados de um contato"""
+        response = self.client.get(reverse('contact_detail', args=[self.contact.id]))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.json(), {
+            'id': self.contact.id,
+            'nome_completo': 'Renan Marques',
+            'telefone': '19987654321',
+            'email': 'renan@fatec.sp.gov.br',
+            'observacao': 'Teste',
+        })
+
+    def test_detail_not_found(self):
+        response = self.client.get(reverse('contact_detail', args=[9999]))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        self.assertEqual(response.json()['error'], 'Contato não encontrado.')
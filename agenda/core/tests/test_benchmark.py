@@ -0,0 +1,113 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, TransactionTestCase
+from core import benchmark, synthetic
+from core.forms import AgendaForm
+from core.models import Agenda, AgendaVersion
+
+
+class WorkloadDataTest(TestCase):
+    def test_contact_data_is_valid(self):
+        """Testa que os contatos gerados passam pela validação do formulário"""
+        for i in (0, 1, 25, 26, 999_999):
+            with self.subTest(i=i):
+                self.assertTrue(AgendaForm(benchmark.contact_data(i)).is_valid())
+        self.assertEqual(benchmark.contact_data(26), benchmark.contact_data(26))
+
+    def test_codes_are_unique(self):
+        codes = {benchmark.code(i) for i in range(20000)}
+        self.assertEqual(len(codes), 20000)
+
+    def test_seed_grows_and_trims(self):
+        """Testa que seed completa ou reduz os contatos até o tamanho pedido"""
+        owner = User.objects.create_user(username=benchmark.USERNAME, password=benchmark.PASSWORD)
+        self.assertEqual(benchmark.seed(owner, 30, batch_size=7), 30)
+        self.assertEqual(benchmark.seed(owner, 30), 0)
+        self.assertEqual(benchmark.seed(owner, 10), 0)
+        self.assertEqual(Agenda.objects.filter(owner=owner).count(), 10)
+        self.assertEqual(AgendaVersion.current(owner.pk).row_count, 10)
+        contact = Agenda.objects.order_by('id').last()
+        self.assertEqual(contact.nome_busca, synthetic.ascii_lower(contact.nome_completo))
+
+    def test_server_timing_queries(self):
+        header = 'db;dur=1.2;desc="4 queries", template;dur=3.0, total;dur=9.1'
+        self.assertEqual(benchmark.server_timing_queries(header), 4)
+        self.assertIsNone(benchmark.server_timing_queries(None))
+
+
+class CompareTest(TestCase):
+    def result(self, **values):
+        return dict({'rows': 10, 'target': 'client', 'operation': 'list', 'throughput': 100,
+                     'p50_ms': 5, 'p99_ms': 10, 'queries': 4, 'peak_kib': 100, 'errors': 0}, **values)
+
+    def test_regressions(self):
+        """Testa a tolerância de latência e vazão e o limite estrito de consultas"""
+        baseline = {'results': [self.result()]}
+        self.assertEqual(benchmark.compare(baseline, [self.result(p99_ms=11.5, throughput=85)], 0.2), [])
+        regressions = benchmark.compare(baseline, [self.result(p99_ms=13, throughput=70, queries=5)], 0.2)
+        self.assertEqual({metric for _, metric, _, _ in regressions}, {'p99_ms', 'throughput', 'queries'})
+
+    def test_new_results_are_ignored(self):
+        baseline = {'results': [self.result()]}
+        self.assertEqual(benchmark.compare(baseline, [self.result(rows=1000, queries=50)], 0.2), [])
+
+
+class MeasureTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username=benchmark.USERNAME, email=benchmark.EMAIL,
+                                             password=benchmark.PASSWORD)
+        benchmark.seed(self.user, 20)
+
+    def test_every_operation(self):
+        """Testa cada operação pelo Client, e que a agenda volta ao tamanho inicial"""
+        target = benchmark.ClientTarget(self.user)
+        workload = benchmark.Workload(self.user, 20)
+        results = {operation: benchmark.measure(target, workload, operation, 3, 2)
+                   for operation in benchmark.OPERATIONS}
+        for operation, result in results.items():
+            with self.subTest(operation=operation):
+                self.assertEqual(result['errors'], 0)
+                self.assertEqual(result['requests'], 3)
+                self.assertGreater(result['throughput'], 0)
+                self.assertGreater(result['peak_kib'], 0)
+        self.assertEqual(results['list']['queries'], 4)
+        self.assertEqual(Agenda.objects.filter(owner=self.user).count(), 20)
+
+
+class BenchmarkContactsCommandTest(TransactionTestCase):
+    def test_command(self):
+        """Testa os alvos client e wsgi, o JSON gerado e a comparação com ele"""
+        output = os.path.join(tempfile.mkdtemp(), 'resultado.json')
+        out = StringIO()
+        call_command('benchmark_contacts', current_database=True, rows=[15], requests=3,
+                     login_requests=1, concurrency=1, memory_samples=1, output=output,
+                     stdout=out, stderr=StringIO())
+        with open(output, encoding='utf-8') as f:
+            document = json.load(f)
+        self.assertEqual(document['meta']['requests'], 3)
+        self.assertEqual({(r['target'], r['operation']) for r in document['results']},
+                         {(t, o) for t in ('client', 'wsgi') for o in benchmark.OPERATIONS})
+        wsgi_list = next(r for r in document['results'] if r['target'] == 'wsgi' and r['operation'] == 'list')
+        self.assertEqual(wsgi_list['queries'], 4)
+        self.assertIn('wsgi   register', out.getvalue())
+
+        # Um baseline impossível de alcançar
+        for result in document['results']:
+            result['queries'] = 0
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(document, f)
+        with self.assertRaises(CommandError):
+            call_command('benchmark_contacts', current_database=True, rows=[15], requests=3,
+                         login_requests=1, targets=['client'], baseline=output, stdout=StringIO(),
+                         stderr=StringIO())
+
+    def test_invalid_options(self):
+        with self.assertRaises(CommandError):
+            call_command('benchmark_contacts', current_database=True, rows=[0], stdout=StringIO())
@@ -0,0 +1,119 @@
+import json
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from http import HTTPStatus
+from core import bulk
+from core.models import Agenda, AgendaVersion
+
+
+class BulkTestCase(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='admin', email='admin@fatec.sp.gov.br',
+                                              password='fatec')
+        self.other = User.objects.create_user(username='outro', password='fatec')
+        Agenda.objects.bulk_create([
+            Agenda(owner=self.owner, nome_completo=f'Ana Silva {letter}', telefone='19987654321',
+                   email=f'ana{letter}@fatec.sp.gov.br', nome_busca=f'ana silva {letter.lower()}')
+            for letter in 'ABCDE'
+        ] + [
+            Agenda(owner=self.owner, nome_completo='Bruno Souza', telefone='19912345678',
+                   email='bruno@fatec.sp.gov.br', nome_busca='bruno souza'),
+            Agenda(owner=self.other, nome_completo='Ana Silva', telefone='19987654321',
+                   email='ana@fatec.sp.gov.br', nome_busca='ana silva'),
+        ])
+        self.ids = list(Agenda.objects.filter(owner=self.owner).order_by('id').values_list('id', flat=True))
+        self.client = Client()
+        self.client.login(username='admin', password='fatec')
+
+    def post(self, name, data):
+        return self.client.post(reverse(name), json.dumps(data), content_type='application/json')
+
+
+class BulkDeleteTest(BulkTestCase):
+    def test_delete_by_ids(self):
+        """Testa a exclusão por ids, só dos contatos do usuário"""
+        foreign = Agenda.objects.get(owner=self.other).id
+        response = self.post('bulk_delete_contacts', {'ids': [*self.ids[:3], foreign, 999999]})
+        self.assertEqual(response.json(), {'affected': 3})
+        self.assertEqual(Agenda.objects.filter(owner=self.owner).count(), 3)
+        self.assertTrue(Agenda.objects.filter(id=foreign).exists())
+        self.assertEqual(AgendaVersion.current(self.owner.pk).row_count, 3)
+
+    def test_delete_by_filter(self):
+        response = self.post('bulk_delete_contacts', {'q': 'ana'})
+        self.assertEqual(response.json(), {'affected': 5})
+        self.assertEqual(list(Agenda.objects.filter(owner=self.owner).values_list('nome_completo', flat=True)),
+                         ['Bruno Souza'])
+        self.assertTrue(Agenda.objects.filter(owner=self.other).exists())
+
+    @override_settings(AGENDA_BULK_CHUNK_SIZE=2)
+    def test_one_delete_per_chunk(self):
+        """Testa que cada bloco de ids é um único DELETE"""
+        with CaptureQueriesContext(connection) as captured:
+            response = self.post('bulk_delete_contacts', {'ids': self.ids[:5]})
+        self.assertEqual(response.json(), {'affected': 5})
+        deletes = [q['sql'] for q in captured.captured_queries if q['sql'].startswith('DELETE')]
+        self.assertEqual(len(deletes), 3)
+        # Um marcador de versão por bloco: cada um em sua transação
+        touches = [q for q in captured.captured_queries
+                   if q['sql'].startswith('UPDATE "core_agendaversion"')]
+        self.assertEqual(len(touches), 3)
+
+    def test_invalid_requests(self):
+        for data in ({}, {'q': '  '}, {'ids': []}, {'ids': ['1']}, {'ids': [True]}, [1, 2]):
+            with self.subTest(data=data):
+                response = self.post('bulk_delete_contacts', data)
+                self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+                self.assertIn('error', response.json())
+        response = self.client.post(reverse('bulk_delete_contacts'), 'não é json',
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertEqual(Agenda.objects.count(), 7)
+
+    def test_requires_post_and_login(self):
+        self.assertEqual(self.client.get(reverse('bulk_delete_contacts')).status_code,
+                         HTTPStatus.METHOD_NOT_ALLOWED)
+        self.client.logout()
+        self.assertEqual(self.post('bulk_delete_contacts', {'ids': self.ids}).status_code, HTTPStatus.FOUND)
+        self.assertEqual(Agenda.objects.count(), 7)
+
+
+class BulkEditTest(BulkTestCase):
+    def test_edit_by_ids(self):
+        """Testa a edição parcial por ids, com as colunas de busca recalculadas"""
+        response = self.post('bulk_edit_contacts', {
+            'ids': self.ids[:2], 'fields': {'observacao': 'Colega', 'nome_completo': 'Ana Souza'}})
+        self.assertEqual(response.json(), {'affected': 2})
+        edited = Agenda.objects.filter(id__in=self.ids[:2])
+        self.assertEqual({(c.nome_completo, c.nome_busca, c.observacao) for c in edited},
+                         {('Ana Souza', 'ana souza', 'Colega')})
+        self.assertEqual(Agenda.objects.get(id=self.ids[2]).observacao, '')
+
+    @override_settings(AGENDA_BULK_CHUNK_SIZE=2)
+    def test_edit_by_filter_in_chunks(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.post('bulk_edit_contacts', {'q': 'ana', 'fields': {'telefone': '1133334444'}})
+        self.assertEqual(response.json(), {'affected': 5})
+        updates = [q['sql'] for q in captured.captured_queries if q['sql'].startswith('UPDATE "core_agenda"')]
+        self.assertEqual(len(updates), 3)
+        self.assertEqual(Agenda.objects.filter(telefone='1133334444').count(), 5)
+        self.assertEqual(Agenda.objects.get(owner=self.other).telefone, '19987654321')
+
+    def test_fields_are_validated(self):
+        """Testa que os campos passam pelas regras de AgendaForm"""
+        response = self.post('bulk_edit_contacts', {
+            'ids': self.ids, 'fields': {'telefone': '123', 'email': 'ana@gmail.com'}})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertEqual(set(response.json()['errors']), {'telefone', 'email'})
+        for fields in (None, {}, {'owner': 2}):
+            with self.subTest(fields=fields):
+                response = self.post('bulk_edit_contacts', {'ids': self.ids, 'fields': fields})
+                self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertFalse(Agenda.objects.exclude(telefone__in=['19987654321', '19912345678']).exists())
+
+    def test_clean_fields(self):
+        cleaned, errors = bulk.clean_fields({'nome_completo': ' Ana ', 'observacao': ''})
+        self.assertEqual((cleaned, errors), ({'nome_completo': 'Ana', 'observacao': ''}, {}))
@@ -0,0 +1,123 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, Client
+from django.urls import reverse
+from core import cache as list_cache
+from core.models import Agenda, AgendaVersion
+from core.tests.test_metrics import MetricsDirMixin
+
+
+class VersionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='dono', password='fatec')
+        self.contact = Agenda.objects.create(nome_completo='Ana Lima', telefone='19999999999',
+                                             email='ana@fatec.sp.gov.br', owner=self.owner)
+
+    def assertBumps(self, operation, owner=None):
+        owner = owner or self.owner
+        before = AgendaVersion.current(owner.pk).version
+        operation()
+        self.assertGreater(AgendaVersion.current(owner.pk).version, before)
+
+    def test_writes_bump_version(self):
+        """Testa que toda forma de escrita incrementa a versão da tabela"""
+        new = lambda: Agenda(nome_completo='Bruno', telefone='1133334444', email='b@fatec.sp.gov.br',
+                             owner=self.owner)
+        operations = {
+            'save': lambda: self.contact.save(),
+            'create': lambda: Agenda.objects.create(nome_completo='Carla', telefone='1133334444',
+                                                    email='c@fatec.sp.gov.br', owner=self.owner),
+            'update': lambda: Agenda.objects.filter(id=self.contact.id).update(observacao='x'),
+            'update_contact': lambda: Agenda.objects.filter(id=self.contact.id).update_contact(
+                nome_completo='Ana Maria'),
+            'bulk_create': lambda: Agenda.objects.bulk_create([new()]),
+            'bulk_update': lambda: Agenda.objects.bulk_update([self.contact], ['observacao']),
+            'queryset delete': lambda: Agenda.objects.filter(nome_completo='Bruno').delete(),
+            'delete': lambda: Agenda.objects.get(nome_completo='Carla').delete(),
+        }
+        for name, operation in operations.items():
+            with self.subTest(operation=name):
+                self.assertBumps(operation)
+
+    def test_noop_writes_keep_version(self):
+        """Testa que escritas sem linhas afetadas não invalidam o cache"""
+        version = AgendaVersion.current(self.owner.pk).version
+        Agenda.objects.filter(id=0).update(observacao='x')
+        Agenda.objects.filter(id=0).delete()
+        self.assertEqual(AgendaVersion.current(self.owner.pk).version, version)
+
+    def test_rollback_keeps_version(self):
+        """Testa que a versão só muda se a escrita for confirmada"""
+        version = AgendaVersion.current(self.owner.pk).version
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.contact.save()
+            raise RuntimeError
+        self.assertEqual(AgendaVersion.current(self.owner.pk).version, version)
+
+    def test_versions_are_per_owner(self):
+        """Testa que a escrita de um usuário não invalida a versão dos outros"""
+        other = User.objects.create_user(username='outro', password='fatec')
+        version = AgendaVersion.current(other.pk).version
+        self.contact.save()
+        Agenda.objects.filter(owner=self.owner).update(observacao='x')
+        self.assertEqual(AgendaVersion.current(other.pk).version, version)
+        self.assertBumps(lambda: Agenda.objects.create(nome_completo='Bruno', telefone='1133334444',
+                                                       email='b@fatec.sp.gov.br', owner=other),
+                         owner=other)
+
+    def test_missing_marker_restarts_ahead(self):
+        """Testa que, se o marcador for apagado, não há volta a versões antigas"""
+        version = AgendaVersion.current(self.owner.pk).version
+        AgendaVersion.objects.all().delete()
+        self.contact.save()
+        self.assertGreater(AgendaVersion.current(self.owner.pk).version, version)
+
+
+class ShowContactCacheTest(MetricsDirMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client = Client()
+        self.owner = User.objects.create_user(username='admin', email='admin@fatec.sp.gov.br',
+                                              password='fatec')
+        self.client.login(username='admin', password='fatec')
+        self.contact = Agenda.objects.create(nome_completo='Ana Lima', telefone='19999999999',
+                                             email='ana@fatec.sp.gov.br', owner=self.owner)
+
+    def test_second_get_is_a_hit(self):
+        """Testa que a segunda leitura vem do cache, sem consultar contatos"""
+        first = self.client.get(reverse('show_contact'))
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with self.assertNumQueries(3):  # sessão, usuário e versão da tabela
+            second = self.client.get(reverse('show_contact'))
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(list_cache.stats(), {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+    def test_parameters_are_part_of_the_key(self):
+        self.client.get(reverse('show_contact'))
+        response = self.client.get(reverse('show_contact'), {'q': 'ana'})
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+    def test_write_through_views_invalidates(self):
+        """Testa que edição, cadastro e exclusão nunca deixam página velha no cache"""
+        self.client.get(reverse('show_contact'))
+        self.client.post(reverse('edit_contact'), {
+            'id': self.contact.id, 'nome_completo': 'Ana Editada', 'telefone': '19999999999',
+            'email': 'ana@fatec.sp.gov.br', 'observacao': '',
+        })
+        self.assertContains(self.client.get(reverse('show_contact')), 'Ana Editada')
+        self.client.post(reverse('register_contact'), {
+            'nome_completo': 'Bruno Novo', 'telefone': '19999999999',
+            'email': 'bruno@fatec.sp.gov.br', 'observacao': '',
+        })
+        self.assertContains(self.client.get(reverse('show_contact')), 'Bruno Novo')
+        self.client.post(reverse('delete_contact'), {'id': self.contact.id})
+        self.assertNotContains(self.client.get(reverse('show_contact')), 'Ana Editada')
+
+    def test_stats_endpoint(self):
+        self.client.get(reverse('show_contact'))
+        response = self.client.get(reverse('cache_stats'))
+        self.assertEqual(response.json()['misses'], 1)
@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, Client, AsyncClient, override_settings
+from django.urls import reverse
+from http import HTTPStatus
+from core.middleware import user_key
+
+MIDDLEWARE = list(settings.MIDDLEWARE)
+if 'core.middleware.CachedUserMiddleware' not in MIDDLEWARE:
+    MIDDLEWARE.insert(MIDDLEWARE.index('django.contrib.auth.middleware.AuthenticationMiddleware') + 1,
+                      'core.middleware.CachedUserMiddleware')
+
+
+@override_settings(MIDDLEWARE=MIDDLEWARE, SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+class CachedUserMiddlewareTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='admin', email='admin@fatec.sp.gov.br',
+                                             password='fatec')
+        self.client.login(username='admin', password='fatec')
+
+    def test_no_session_or_user_queries(self):
+        """Testa que, com sessão e usuário em cache, só a versão da tabela é lida"""
+        self.client.get(reverse('show_contact'))
+        self.assertIsNotNone(cache.get(user_key(self.user.pk)))
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('show_contact'))
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_password_change_invalidates(self):
+        """Testa que a troca de senha encerra as sessões, mesmo com o usuário em cache"""
+        self.client.get(reverse('show_contact'))
+        self.user.set_password('nova')
+        self.user.save()
+        self.assertIsNone(cache.get(user_key(self.user.pk)))
+        response = self.client.get(reverse('show_contact'))
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_stale_entry_is_not_trusted(self):
+        """Testa que uma entrada com hash de sessão antigo não autentica"""
+        self.client.get(reverse('show_contact'))
+        stale = cache.get(user_key(self.user.pk))
+        User.objects.filter(pk=self.user.pk).update(password='!')  # sem post_save
+        stale.password = 'outra'
+        cache.set(user_key(self.user.pk), stale)
+        response = self.client.get(reverse('show_contact'))
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_logout_invalidates(self):
+        self.client.get(reverse('show_contact'))
+        self.client.post(reverse('logout'))
+        self.assertIsNone(cache.get(user_key(self.user.pk)))
+        response = self.client.get(reverse('show_contact'))
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    async def test_async_views_use_cached_user(self):
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        response = await client.get(reverse('async_show_contact'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIsNotNone(await cache.aget(user_key(self.user.pk)))
+        response = await client.get(reverse('async_show_contact'))
+        self.assertEqual(response['X-Cache'], 'HIT')
@@ -0,0 +1,90 @@
+import datetime
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.utils.http import http_date
+from http import HTTPStatus
+from core.models import Agenda, AgendaVersion
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='admin', email='admin@fatec.sp.gov.br',
+                                             password='fatec')
+        self.client.login(username='admin', password='fatec')
+        self.contact = Agenda.objects.create(nome_completo='Ana Lima', telefone='19999999999',
+                                             email='ana@fatec.sp.gov.br', owner=self.user)
+        # A última escrita fica segundos no passado: no mesmo segundo não há Last-Modified
+        AgendaVersion.objects.filter(owner=self.user).update(
+            updated_at=AgendaVersion.current(self.user.pk).updated_at - datetime.timedelta(seconds=5))
+
+    def urls(self):
+        return {
+            'show_contact': reverse('show_contact'),
+            'search_contact': reverse('search_contact') + '?q=ana',
+            'autocomplete_contact': reverse('autocomplete_contact') + '?q=ana',
+            'contact_detail': reverse('contact_detail', args=[self.contact.id]),
+        }
+
+    def test_responses_carry_validators(self):
+        """Testa que as leituras enviam ETag e Last-Modified"""
+        for name, url in self.urls().items():
+            with self.subTest(view=name):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertIn('ETag', response)
+                self.assertIn('Last-Modified', response)
+
+    def test_if_none_match_returns_304(self):
+        """Testa que o ETag atual gera 304 sem consultar a tabela de contatos"""
+        for name, url in self.urls().items():
+            with self.subTest(view=name):
+                etag = self.client.get(url)['ETag']
+                with self.assertNumQueries(3) as captured:  # sessão, usuário e versão
+                    response = self.client.get(url, headers={'if-none-match': etag})
+                self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+                self.assertEqual(response.content, b'')
+                self.assertFalse(any('"core_agenda"' in q['sql'] for q in captured.captured_queries))
+
+    def test_if_modified_since_returns_304(self):
+        updated_at = AgendaVersion.current(self.user.pk).updated_at
+        response = self.client.get(reverse('show_contact'),
+                                   headers={'if-modified-since': http_date(updated_at.timestamp() + 1)})
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_no_last_modified_in_the_write_second(self):
+        """Testa que, no segundo da escrita, só o ETag vale e um If-Modified-Since antigo não dá 304"""
+        earlier = AgendaVersion.current(self.user.pk).updated_at
+        self.contact.save()
+        updated_at = AgendaVersion.current(self.user.pk).updated_at
+        with mock.patch('core.views.timezone.now', return_value=updated_at):
+            response = self.client.get(reverse('show_contact'),
+                                       headers={'if-modified-since': http_date(earlier.timestamp() + 10)})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotIn('Last-Modified', response)
+        self.assertIn('ETag', response)
+
+    def test_write_changes_etag(self):
+        """Testa que depois de uma escrita o ETag antigo não vale mais"""
+        etag = self.client.get(reverse('show_contact'))['ETag']
+        self.client.post(reverse('edit_contact'), {
+            'id': self.contact.id, 'nome_completo': 'Ana Editada', 'telefone': '19999999999',
+            'email': 'ana@fatec.sp.gov.br', 'observacao': '',
+        })
+        response = self.client.get(reverse('show_contact'), headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, 'Ana Editada')
+
+    def test_etag_depends_on_user(self):
+        """Testa que usuários diferentes não compartilham o mesmo ETag"""
+        etag = self.client.get(reverse('show_contact'))['ETag']
+        User.objects.create_user(username='outro', email='outro@fatec.sp.gov.br', password='fatec')
+        other = Client()
+        other.login(username='outro', password='fatec')
+        response = other.get(reverse('show_contact'), headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
@@ -0,0 +1,143 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import Client, TestCase
+from django.urls import reverse
+from core.dedup import DuplicateFinder, UnionFind
+from core.models import Agenda
+from core.phonetic import phonetic_key
+
+
+class PhoneticKeyTest(TestCase):
+    def test_same_sound_same_key(self):
+        """Testa que grafias com a mesma pronúncia geram a mesma chave"""
+        pairs = [('Luiz Souza', 'Luis Sousa'), ('Thiago Rocha', 'Tiago Rocha'),
+                 ('Raphael Lima', 'Rafael Lima'), ('Kátia Gomes', 'Cátia Gomes'),
+                 ('Isabella Dias', 'Izabela Dias'), ('Maria da Silva', 'maria   SILVA'),
+                 ('Guilherme Ramos', 'Guilerme Ramos'), ('Wagner Nunes', 'Vagner Nunes'),
+                 ('Ana Gonçalves', 'Ana Gonsalves'), ('CONCEIÇÃO', 'Conseição')]
+        for first, second in pairs:
+            with self.subTest(first=first):
+                self.assertEqual(phonetic_key(first), phonetic_key(second))
+
+    def test_different_names(self):
+        self.assertNotEqual(phonetic_key('Ana Silva'), phonetic_key('Ana Santos'))
+        self.assertNotEqual(phonetic_key('Gabriel Lima'), phonetic_key('Gabriela Lima'))
+        self.assertEqual(phonetic_key(''), '')
+
+
+class UnionFindTest(TestCase):
+    def test_groups(self):
+        sets = UnionFind()
+        for a, b in ((1, 2), (3, 4), (2, 4), (7, 8)):
+            sets.union(a, b)
+        sets.union(1, 3)
+        self.assertEqual(sets.groups(), [[1, 2, 3, 4], [7, 8]])
+        self.assertEqual(sets.find(5), 5)
+
+
+class DuplicatesTestCase(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='admin', email='admin@fatec.sp.gov.br',
+                                              password='fatec')
+        self.other = User.objects.create_user(username='outro', password='fatec')
+        self.contacts = {}
+        for key, owner, nome, telefone, email in (
+            ('ana', self.owner, 'Ana Silva', '19987654321', 'ana@fatec.sp.gov.br'),
+            # Mesmo nome e o mesmo número com outro DDD e sem o nono dígito
+            ('ana_espacos', self.owner, 'ana  SILVA', '1187654321', 'ana.silva@fatec.sp.gov.br'),
+            # Mesmo nome, mas outra pessoa: nada além do nome em comum
+            ('ana_homonima', self.owner, 'Ana Silva', '11922223333', 'asilva@fatec.sp.gov.br'),
+            ('ana_telefone', self.owner, 'Ana Paula', '19987654321', 'paula@fatec.sp.gov.br'),
+            ('luis', self.owner, 'Luiz Souza', '11933334444', 'luiz@fatec.sp.gov.br'),
+            ('luis_email', self.owner, 'Luís Sousa', '11955556666', 'LUIZ@fatec.sp.gov.br'),
+            ('bruno', self.owner, 'Bruno', '11977778888', 'bruno@fatec.sp.gov.br'),
+            ('bruno_nome', self.owner, 'Bruno', '11999990000', 'bruno2@fatec.sp.gov.br'),
+            # Mesmo telefone, mas de outro usuário
+            ('outro', self.other, 'Ana Silva', '19987654321', 'ana@fatec.sp.gov.br'),
+        ):
+            self.contacts[key] = Agenda.objects.create(owner=owner, nome_completo=nome, telefone=telefone,
+                                                       email=email).id
+
+
+class DuplicateFinderTest(DuplicatesTestCase):
+    def test_clusters(self):
+        """Testa os grupos por nome com telefone ou e-mail, telefone e e-mail, sem cruzar usuários"""
+        finder = DuplicateFinder(chunk_size=3)
+        clusters = list(finder.clusters())
+        c = self.contacts
+        self.assertEqual({tuple(cluster.ids) for cluster in clusters},
+                         {(c['ana'], c['ana_espacos'], c['ana_telefone']), (c['luis'], c['luis_email'])})
+        self.assertEqual({cluster.owner_id for cluster in clusters}, {self.owner.id})
+        self.assertEqual(finder.rows, 9)
+
+    def test_keys(self):
+        finder = DuplicateFinder(keys=['telefone'])
+        clusters = list(finder.clusters(Agenda.objects.filter(owner=self.owner)))
+        self.assertEqual([cluster.ids for cluster in clusters],
+                         [[self.contacts['ana'], self.contacts['ana_telefone']]])
+
+    def test_describe(self):
+        finder = DuplicateFinder(chunk_size=2)
+        described = list(finder.describe(finder.clusters()))
+        self.assertEqual(len(described), 2)
+        ana = described[0]
+        self.assertEqual(ana['keep'], self.contacts['ana'])
+        self.assertEqual(ana['keys'], ['telefone', 'nome'])
+        self.assertEqual([contact['nome_completo'] for contact in ana['contacts']],
+                         ['Ana Silva', 'ana  SILVA', 'Ana Paula'])
+        self.assertEqual(described[1]['keys'], ['email', 'nome'])
+
+
+class DuplicateViewTest(DuplicatesTestCase):
+    def test_view(self):
+        """Testa o endpoint JSON com os grupos do usuário logado"""
+        client = Client()
+        client.login(username='admin', password='fatec')
+        response = client.get(reverse('duplicate_contacts'), {'limit': 1})
+        data = response.json()
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(len(data['clusters']), 1)
+        self.assertEqual(data['clusters'][0]['ids'][0], self.contacts['ana'])
+        self.assertTrue(response.has_header('ETag'))
+        self.assertEqual(data['next_offset'], 1)
+        data = client.get(reverse('duplicate_contacts'), {'limit': 1, 'offset': 1}).json()
+        self.assertEqual(data['clusters'][0]['ids'][0], self.contacts['luis'])
+        self.assertIsNone(data['next_offset'])
+
+    def test_view_cache(self):
+        """Testa que os grupos são calculados uma vez por versão dos contatos"""
+        cache.clear()
+        client = Client()
+        client.login(username='admin', password='fatec')
+        with mock.patch.object(DuplicateFinder, 'clusters', autospec=True,
+                               side_effect=DuplicateFinder.clusters) as clusters:
+            client.get(reverse('duplicate_contacts'))
+            client.get(reverse('duplicate_contacts'), {'offset': 1})
+            self.assertEqual(clusters.call_count, 1)
+            Agenda.objects.filter(id=self.contacts['ana_telefone']).delete()
+            data = client.get(reverse('duplicate_contacts')).json()
+            self.assertEqual(clusters.call_count, 2)
+        self.assertEqual(data['clusters'][0]['keys'], ['nome'])
+
+    def test_command(self):
+        output = os.path.join(tempfile.mkdtemp(), 'duplicatas.jsonl')
+        err = StringIO()
+        call_command('find_duplicates', output=output, stdout=StringIO(), stderr=err)
+        with open(output, encoding='utf-8') as f:
+            clusters = [json.loads(line) for line in f]
+        self.assertEqual([cluster['keep'] for cluster in clusters], [self.contacts['ana'], self.contacts['luis']])
+        self.assertIn('9 contatos lidos', err.getvalue())
+        self.assertIn('2 grupos, 3 contatos a remover', err.getvalue())
+
+        out = StringIO()
+        call_command('find_duplicates', owner='outro', stdout=out, stderr=StringIO())
+        self.assertEqual(out.getvalue(), '')
+        with self.assertRaises(CommandError):
+            call_command('find_duplicates', owner='ninguem', stdout=StringIO(), stderr=StringIO())
@@ -0,0 +1,113 @@
+import csv
+import io
+import json
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+from http import HTTPStatus
+from core.exporters import export_chunks, vcard_name
+from core.models import Agenda
+
+
+class ExportTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='dono', password='fatec')
+        self.ana = Agenda.objects.create(nome_completo='Ana Lúcia', telefone='19999999999',
+                                         email='ana@fatec.sp.gov.br', observacao='Linha 1\nvírgula, ponto;',
+                                         owner=self.owner)
+        self.bruno = Agenda.objects.create(nome_completo='Bruno Alves', telefone='1133334444',
+                                           email='bruno@fatec.sp.gov.br', observacao='',
+                                           owner=self.owner)
+
+    def export(self, format, **kwargs):
+        return ''.join(export_chunks(format, **kwargs))
+
+    def test_csv(self):
+        """Testa a exportação em CSV com cabeçalho"""
+        rows = list(csv.reader(io.StringIO(self.export('csv'))))
+        self.assertEqual(rows[0], ['id', 'nome_completo', 'telefone', 'email', 'observacao'])
+        self.assertEqual(rows[1], [str(self.ana.id), 'Ana Lúcia', '19999999999',
+                                   'ana@fatec.sp.gov.br', 'Linha 1\nvírgula, ponto;'])
+        self.assertEqual(len(rows), 3)
+
+    def test_jsonl(self):
+        """Testa a exportação em JSON Lines"""
+        lines = self.export('jsonl').splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(json.loads(lines[1])['nome_completo'], 'Bruno Alves')
+
+    def test_vcard(self):
+        """Testa a exportação em vCard 3.0 com escape de caracteres"""
+        output = self.export('vcard')
+        self.assertEqual(output.count('BEGIN:VCARD\r\nVERSION:3.0\r\n'), 2)
+        self.assertIn('FN:Ana Lúcia\r\n', output)
+        self.assertIn('NOTE:Linha 1\\nvírgula\\, ponto\\;\r\n', output)
+        self.assertIn('TEL;TYPE=CELL:1133334444\r\n', output)
+        self.assertIn('N:Lúcia;Ana;;;\r\n', output)
+        self.assertIn('N:Alves;Bruno;;;\r\n', output)
+
+    def test_vcard_name(self):
+        self.assertEqual(vcard_name('Renan Marques'), 'Marques;Renan;;;')
+        self.assertEqual(vcard_name('Ana Paula da Silva'), 'da Silva;Ana Paula;;;')
+        self.assertEqual(vcard_name('Renan'), ';Renan;;;')
+
+    def test_vcard_folding(self):
+        """Testa que nenhuma linha passa de 75 octetos e que a dobra não parte caracteres"""
+        self.ana.observacao = 'ção ' * 40
+        self.ana.save()
+        output = self.export('vcard')
+        lines = output.split('\r\n')
+        self.assertTrue(all(len(line.encode()) <= 75 for line in lines))
+        # Desdobrar (RFC 6350, 3.2) devolve o texto original
+        unfolded = output.replace('\r\n ', '')
+        self.assertIn('NOTE:' + 'ção ' * 40 + '\r\n', unfolded)
+
+    def test_chunks(self):
+        """Testa que a saída é entregue em pedaços do tamanho pedido"""
+        chunks = list(export_chunks('jsonl', chunk_size=1))
+        self.assertEqual(len(chunks), 2)
+
+    def test_iterator_projection(self):
+        """Testa que a consulta busca só as colunas exportadas"""
+        with self.assertNumQueries(1) as captured:
+            self.export('csv')
+        sql = captured.captured_queries[0]['sql']
+        self.assertNotIn('nome_busca', sql)
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command('export_contacts', '--format', 'jsonl', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
+
+
+class ExportViewTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.owner = User.objects.create_user(username='admin', email='admin@fatec.sp.gov.br',
+                                              password='fatec')
+        Agenda.objects.create(nome_completo='Ana Lima', telefone='19999999999',
+                              email='ana@fatec.sp.gov.br', owner=self.owner)
+
+    def test_requires_login(self):
+        response = self.client.get(reverse('export_contacts'))
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_streaming_response(self):
+        """Testa que a exportação usa StreamingHttpResponse"""
+        self.client.login(username='admin', password='fatec')
+        for format, content_type, extension in [('csv', 'text/csv', 'csv'),
+                                                ('jsonl', 'application/x-ndjson', 'jsonl'),
+                                                ('vcard', 'text/vcard', 'vcf')]:
+            with self.subTest(format=format):
+                response = self.client.get(reverse('export_contacts'), {'format': format})
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertTrue(response.streaming)
+                self.assertTrue(response['Content-Type'].startswith(content_type))
+                self.assertIn(f'contatos.{extension}', response['Content-Disposition'])
+                self.assertIn('Ana Lima', b''.join(response.streaming_content).decode())
+
+    def test_invalid_format(self):
+        self.client.login(username='admin', password='fatec')
+        response = self.client.get(reverse('export_contacts'), {'format': 'xml'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
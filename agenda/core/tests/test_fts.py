@@ -0,0 +1,104 @@
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client
+from django.urls import reverse
+from http import HTTPStatus
+from core import fts
+from core.models import Agenda
+
+
+class MatchExpressionTest(TestCase):
+    def test_terms_become_quoted_prefixes(self):
+        """Testa que a entrada do usuário vira termos entre aspas, por prefixo"""
+        self.assertEqual(fts.match_expression('João  silva'), '"João"* "silva"*')
+
+    def test_operators_are_neutralized(self):
+        """Testa que a sintaxe do FTS5 digitada pelo usuário não é interpretada"""
+        self.assertEqual(fts.match_expression('a" OR (b* NEAR'), '"a"* "OR"* "b"* "NEAR"*')
+        self.assertEqual(fts.match_expression('***'), '')
+
+
+class FullTextSearchTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='dono', password='fatec')
+        self.ana = Agenda.objects.create(nome_completo='Ana Lúcia', telefone='19999999999',
+                                         email='ana@fatec.sp.gov.br',
+                                         observacao='Prefere contato por telefone à tarde',
+                                         owner=self.owner)
+        self.bruno = Agenda.objects.create(nome_completo='Bruno Tarde', telefone='19999999998',
+                                           email='bruno@fatec.sp.gov.br', observacao='',
+                                           owner=self.owner)
+        self.carla = Agenda.objects.create(nome_completo='Carla Dias', telefone='19999999997',
+                                           email='carla@fatec.sp.gov.br',
+                                           observacao='Cliente importante', owner=self.owner)
+
+    def search(self, text):
+        return fts.full_text_search(Agenda.objects.all(), text)
+
+    def test_search_observacao(self):
+        """Testa a busca por palavras da observação"""
+        self.assertEqual(self.search('importante'), [self.carla])
+
+    def test_accents_and_prefix(self):
+        """Testa que acentos são ignorados e termos casam por prefixo"""
+        self.assertEqual(self.search('lucia'), [self.ana])
+        self.assertEqual(self.search('impor'), [self.carla])
+
+    def test_name_ranks_above_observacao(self):
+        """Testa que o nome pesa mais que a observação no ranking"""
+        self.assertEqual(self.search('tarde'), [self.bruno, self.ana])
+
+    def test_index_follows_update_and_delete(self):
+        """Testa que os gatilhos mantêm o índice após update() e delete()"""
+        Agenda.objects.filter(id=self.carla.id).update(observacao='Fornecedor')
+        self.assertEqual(self.search('importante'), [])
+        self.assertEqual(self.search('fornecedor'), [self.carla])
+        Agenda.objects.filter(id=self.carla.id).delete()
+        self.assertEqual(self.search('fornecedor'), [])
+
+    def test_index_follows_bulk_create(self):
+        Agenda.objects.bulk_create([Agenda(nome_completo='Diego Bulk', telefone='1133334444',
+                                           email='diego@fatec.sp.gov.br', owner=self.owner)])
+        self.assertEqual([c.nome_completo for c in self.search('bulk')], ['Diego Bulk'])
+
+    def test_limit(self):
+        self.assertEqual(len(fts.full_text_search(Agenda.objects.all(), 'fatec', limit=2)), 2)
+
+    def test_rebuild_command(self):
+        """Testa o comando que recria o índice"""
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {fts.TABLE}({fts.TABLE}) VALUES ('delete-all')")
+        self.assertEqual(self.search('importante'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Índice de busca recriado.', out.getvalue())
+        self.assertEqual(self.search('importante'), [self.carla])
+
+
+class SearchContactViewTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.owner = User.objects.create_user(username='admin', email='admin@fatec.sp.gov.br',
+                                              password='fatec')
+        Agenda.objects.create(nome_completo='Renan Marques', telefone='19987654321',
+                              email='renan@fatec.sp.gov.br', observacao='Colega de turma',
+                              owner=self.owner)
+
+    def test_requires_login(self):
+        response = self.client.get(reverse('search_contact'))
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_search(self):
+        """Testa a página de pesquisa por texto completo"""
+        self.client.login(username='admin', password='fatec')
+        response = self.client.get(reverse('search_contact'), {'q': 'turma'})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTemplateUsed(response, 'search_contact.html')
+        self.assertContains(response, 'Renan Marques')
+
+    def test_no_results(self):
+        self.client.login(username='admin', password='fatec')
+        response = self.client.get(reverse('search_contact'), {'q': 'inexistente'})
+        self.assertContains(response, 'Nenhum contato encontrado.')
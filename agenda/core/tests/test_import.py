@@ -0,0 +1,153 @@
+import csv
+import io
+import os
+import tempfile
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, Client
+from django.urls import reverse
+from http import HTTPStatus
+from core.forms import AgendaForm
+from core.importers import import_csv, validate_row
+from core.models import Agenda
+
+HEADER = 'nome_completo,telefone,email,observacao\n'
+
+
+def make_csv(rows):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(['nome_completo', 'telefone', 'email', 'observacao'])
+    writer.writerows(rows)
+    out.seek(0)
+    return out
+
+
+class ValidateRowTest(TestCase):
+    def test_same_errors_as_form(self):
+        """Testa que a validação da linha produz as mesmas mensagens de AgendaForm"""
+        cases = [
+            {'nome_completo': '', 'telefone': 'abc', 'email': 'x@gmail.com', 'observacao': ''},
+            {'nome_completo': 'Renan 1', 'telefone': '123', 'email': 'invalido', 'observacao': ''},
+            {'nome_completo': 'Renan', 'telefone': '1999999999999', 'email': '', 'observacao': ''},
+            {'nome_completo': 'A' * 151, 'telefone': ' 19999999999 ',
+             'email': 'a' * 250 + '@fatec.sp.gov.br', 'observacao': 'x\x00'},
+            {'nome_completo': 'Renan Marques', 'telefone': '19999999999',
+             'email': 'renan@fatec.sp.gov.br', 'observacao': 'ok'},
+        ]
+        for data in cases:
+            with self.subTest(data=data):
+                form = AgendaForm(data=data)
+                form.is_valid()
+                _, errors = validate_row(data)
+                self.assertEqual(errors, dict(form.errors))
+
+    def test_strips_values(self):
+        cleaned, errors = validate_row({'nome_completo': ' Ana ', 'telefone': '1999999999 ',
+                                        'email': 'ana@fatec.sp.gov.br'})
+        self.assertEqual(errors, {})
+        self.assertEqual(cleaned['nome_completo'], 'Ana')
+        self.assertEqual(cleaned['observacao'], '')
+
+
+class ImportCsvTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='dono', password='fatec')
+
+    def test_imports_valid_rows_and_reports_errors(self):
+        """Testa a importação com linhas válidas e inválidas"""
+        stream = make_csv([
+            ['João Silva', '19999999999', 'joao@fatec.sp.gov.br', 'primeiro'],
+            ['Maria 2', '19999999999', 'maria@fatec.sp.gov.br', ''],
+            ['Pedro Souza', '1133334444', 'pedro@gmail.com', ''],
+            ['Ana Lima', '1133335555', 'ana@fatec.sp.gov.br', ''],
+        ])
+        report = import_csv(stream, self.owner, batch_size=2)
+        self.assertEqual(report.rows, 4)
+        self.assertEqual(report.created, 2)
+        self.assertEqual(report.error_count, 2)
+        self.assertEqual([line for line, _ in report.errors], [3, 4])
+        self.assertIn('email', report.errors[1][1])
+        joao = Agenda.objects.get(nome_completo='João Silva')
+        self.assertEqual(joao.nome_busca, 'joao silva')
+        self.assertEqual(joao.owner, self.owner)
+
+    def test_batches_are_bulk_inserts(self):
+        """Testa que cada lote é inserido com um único INSERT"""
+        rows = [[f'Contato {chr(65 + i)}', '19999999999', f'c{i}@fatec.sp.gov.br', '']
+                for i in range(10)]
+        with self.assertNumQueries(5 * 4):  # savepoint, INSERT, versão e release por lote
+            report = import_csv(make_csv(rows), self.owner, batch_size=2)
+        self.assertEqual(report.created, 10)
+        self.assertEqual(Agenda.objects.count(), 10)
+
+    def test_error_report_is_capped(self):
+        """Testa que o relatório guarda só as primeiras linhas com erro"""
+        rows = [['', '', '', '']] * 5
+        report = import_csv(make_csv(rows), self.owner, max_errors=2)
+        self.assertEqual(report.error_count, 5)
+        self.assertEqual(len(report.errors), 2)
+        self.assertTrue(report.truncated)
+
+    def test_missing_columns(self):
+        with self.assertRaisesMessage(Exception, 'Colunas ausentes no CSV: telefone, email.'):
+            import_csv(io.StringIO('nome_completo\nAna\n'), self.owner)
+
+
+class ImportCommandTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='dono', password='fatec')
+
+    def test_command(self):
+        """Testa o comando manage.py import_contacts"""
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as f:
+            f.write(HEADER + 'Ana Lima,1133335555,ana@fatec.sp.gov.br,\nB 1,x,y,\n')
+        self.addCleanup(os.remove, f.name)
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_contacts', f.name, '--owner', 'dono', '--batch-size', '10',
+                     stdout=out, stderr=err)
+        self.assertIn('1 contatos importados, 1 linhas com erro de 2 lidas em', out.getvalue())
+        self.assertIn('linha 3: telefone: O telefone deve conter apenas números.', err.getvalue())
+        self.assertTrue(Agenda.objects.filter(nome_completo='Ana Lima', owner=self.owner).exists())
+
+    def test_command_missing_file(self):
+        with self.assertRaises(CommandError):
+            call_command('import_contacts', '/nao/existe.csv', '--owner', 'dono')
+
+    def test_command_unknown_owner(self):
+        with self.assertRaisesMessage(CommandError, "Usuário 'ninguem' não encontrado."):
+            call_command('import_contacts', '-', '--owner', 'ninguem')
+
+
+class ImportViewTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_user(username='admin', email='admin@fatec.sp.gov.br', password='fatec')
+        self.url = reverse('import_contacts')
+
+    def test_requires_login(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_upload(self):
+        """Testa o envio do CSV pela página de importação"""
+        self.client.login(username='admin', password='fatec')
+        content = (HEADER + 'Ana Lima,1133335555,ana@fatec.sp.gov.br,obs\n'
+                   'Bruno,123,bruno@fatec.sp.gov.br,\n').encode('utf-8')
+        response = self.client.post(self.url, {'arquivo': SimpleUploadedFile('c.csv', content)})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTemplateUsed(response, 'import_contacts.html')
+        self.assertEqual(response.context['report'].created, 1)
+        self.assertContains(response, 'Linha 3 – telefone: O telefone deve ter entre 10 e 11 dígitos.')
+
+    def test_upload_without_file(self):
+        self.client.login(username='admin', password='fatec')
+        response = self.client.post(self.url, {})
+        self.assertContains(response, 'Selecione um arquivo CSV.')
+
+    def test_upload_invalid_header(self):
+        self.client.login(username='admin', password='fatec')
+        response = self.client.post(self.url, {'arquivo': SimpleUploadedFile('c.csv', b'a,b\n1,2\n')})
+        self.assertContains(response, 'Colunas ausentes no CSV')
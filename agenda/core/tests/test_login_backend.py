@@ -0,0 +1,60 @@
+from django.contrib.auth import authenticate, get_user_model
+from django.db import connection
+from django.test import TestCase
+from core.backends import EmailBackend
+from core.forms import LoginForm
+
+UserModel = get_user_model()
+
+
+class EmailBackendTest(TestCase):
+    def setUp(self):
+        self.user = UserModel.objects.create_user(username='renan', email='renan@fatec.sp.gov.br',
+                                                  password='senha123')
+
+    def test_authenticates_by_email(self):
+        user = authenticate(email='renan@fatec.sp.gov.br', password='senha123')
+        self.assertEqual(user, self.user)
+        self.assertEqual(user.backend, 'core.backends.EmailBackend')
+
+    def test_rejects_wrong_password_and_unknown_email(self):
+        self.assertIsNone(authenticate(email='renan@fatec.sp.gov.br', password='errada'))
+        self.assertIsNone(authenticate(email='outro@fatec.sp.gov.br', password='senha123'))
+
+    def test_rejects_inactive_user(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(authenticate(email='renan@fatec.sp.gov.br', password='senha123'))
+
+    def test_duplicate_email_uses_matching_password(self):
+        """Testa que, com e-mail repetido, vale o usuário cuja senha confere"""
+        other = UserModel.objects.create_user(username='renan2', email='renan@fatec.sp.gov.br',
+                                              password='outrasenha')
+        self.assertEqual(authenticate(email='renan@fatec.sp.gov.br', password='outrasenha'), other)
+
+    def test_username_login_still_works(self):
+        """Testa que o login por username (admin) continua no ModelBackend"""
+        self.assertIsNone(EmailBackend().authenticate(None, username='renan', password='senha123'))
+        self.assertEqual(authenticate(username='renan', password='senha123'), self.user)
+
+
+class LoginQueriesTest(TestCase):
+    def setUp(self):
+        UserModel.objects.create_user(username='renan', email='renan@fatec.sp.gov.br',
+                                      password='senha123')
+
+    def test_successful_login_is_one_query(self):
+        """Testa que o login válido carrega o usuário uma única vez"""
+        form = LoginForm(data={'email': 'renan@fatec.sp.gov.br', 'password': 'senha123'})
+        with self.assertNumQueries(1):
+            self.assertTrue(form.is_valid())
+
+    def test_email_lookup_uses_index(self):
+        """Testa que a busca por e-mail usa o índice de auth_user.email"""
+        if connection.vendor != 'sqlite':
+            self.skipTest('plano de consulta específico do SQLite')
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN SELECT * FROM auth_user WHERE email = %s',
+                           ['renan@fatec.sp.gov.br'])
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('core_auth_user_email_idx', plan)
@@ -0,0 +1,222 @@
+import glob
+import os
+import shutil
+import tempfile
+import threading
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, Client, AsyncClient, override_settings
+from django.urls import path, reverse
+from http import HTTPStatus
+from agenda.urls import urlpatterns as project_urlpatterns
+from core import metrics
+from core.models import Agenda, AgendaVersion
+from core.views import metrics_view
+
+MIDDLEWARE = ['core.middleware.MetricsMiddleware'] + [
+    name for name in settings.MIDDLEWARE if name != 'core.middleware.MetricsMiddleware']
+
+# Rotas do projeto com /metrics, que só existe com AGENDA_METRICS ligado
+urlpatterns = project_urlpatterns + [path('metrics', metrics_view, name='metrics')]
+
+
+class MetricsDirMixin:
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        override = override_settings(AGENDA_METRICS=True, AGENDA_METRICS_DIR=self.directory,
+                                     ROOT_URLCONF='core.tests.test_metrics')
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+class MmapedDictTest(MetricsDirMixin, TestCase):
+    def test_values_survive_reopen(self):
+        """Testa que o arquivo guarda os valores e pode ser reaberto"""
+        path = os.path.join(self.directory, 'metrics-1-1.db')
+        store = metrics.MmapedDict(path)
+        store.add('a', 1)
+        store.add('b', 2.5)
+        store.add('a', 1)
+        store.close()
+        self.assertEqual(dict(metrics.MmapedDict.read(path)), {'a': 2.0, 'b': 2.5})
+        store = metrics.MmapedDict(path)
+        store.add('a', 1)
+        store.close()
+        self.assertEqual(dict(metrics.MmapedDict.read(path))['a'], 3.0)
+
+    def test_one_file_per_process(self):
+        """Testa que as threads de um processo escrevem no mesmo arquivo"""
+        threads = [threading.Thread(target=metrics.inc, args=('agenda_contacts', {}))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(os.listdir(self.directory), [f'metrics-{os.getpid()}.db'])
+        self.assertEqual(metrics.value('agenda_contacts'), 8)
+
+    def test_disabled(self):
+        """Testa que, com AGENDA_METRICS desligado, nada é gravado"""
+        with override_settings(AGENDA_METRICS=False):
+            metrics.inc('agenda_contacts', {})
+            metrics.observe_request('show_contact', 'GET', 200, 0.003, 4)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_file_grows(self):
+        path = os.path.join(self.directory, 'metrics-1-1.db')
+        store = metrics.MmapedDict(path)
+        keys = [f'chave-{i}' * 20 for i in range(1000)]
+        for key in keys:
+            store.add(key, 1)
+        store.close()
+        self.assertGreater(os.path.getsize(path), metrics.INITIAL_SIZE)
+        self.assertEqual(dict(metrics.MmapedDict.read(path)), dict.fromkeys(keys, 1.0))
+
+    def test_collect_sums_every_process(self):
+        """Testa a soma dos arquivos de processos diferentes"""
+        for name in ('metrics-1-1.db', 'metrics-2-1.db'):
+            store = metrics.MmapedDict(os.path.join(self.directory, name))
+            store.add(metrics.sample_key('agenda_db_queries_total', {'view': 'home'}), 3)
+            store.close()
+        self.assertEqual(metrics.collect(), {('agenda_db_queries_total', (('view', 'home'),)): 6.0})
+
+
+class RenderTest(MetricsDirMixin, TestCase):
+    def test_exposition_format(self):
+        """Testa HELP/TYPE, o histograma acumulado e o escape dos labels"""
+        metrics.observe_request('show_contact', 'GET', 200, 0.003, 4)
+        metrics.observe_request('show_contact', 'GET', 200, 0.2, 2)
+        metrics.observe_request('a"b', 'GET', 404, 20, 0)
+        output = metrics.render([('agenda_contacts', {}, 7)])
+        self.assertIn('# TYPE agenda_request_duration_seconds histogram', output)
+        self.assertIn('# TYPE agenda_requests_total counter', output)
+        self.assertIn('agenda_requests_total{method="GET",status="200",view="show_contact"} 2', output)
+        self.assertIn('agenda_request_duration_seconds_bucket{view="show_contact",le="0.005"} 1', output)
+        self.assertIn('agenda_request_duration_seconds_bucket{view="show_contact",le="0.1"} 1', output)
+        self.assertIn('agenda_request_duration_seconds_bucket{view="show_contact",le="0.25"} 2', output)
+        self.assertIn('agenda_request_duration_seconds_bucket{view="show_contact",le="+Inf"} 2', output)
+        self.assertIn('agenda_request_duration_seconds_sum{view="show_contact"} 0.203', output)
+        self.assertIn('agenda_request_duration_seconds_count{view="show_contact"} 2', output)
+        self.assertIn('agenda_request_duration_seconds_bucket{view="a\\"b",le="10"} 0', output)
+        self.assertIn('agenda_db_queries_total{view="show_contact"} 6', output)
+        self.assertIn('agenda_contacts 7', output)
+        self.assertTrue(output.endswith('\n'))
+
+
+class RowCountTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='admin', password='fatec')
+
+    def contact(self, nome, owner=None, **kwargs):
+        return Agenda(owner=owner or self.user, nome_completo=nome, telefone='19999999999',
+                      email='ana@fatec.sp.gov.br', **kwargs)
+
+    def assertRowCount(self):
+        self.assertEqual(AgendaVersion.current(self.user.pk).row_count, Agenda.objects.count())
+
+    def test_row_count_follows_writes(self):
+        """Testa o número de contatos mantido em AgendaVersion a cada escrita"""
+        ana = self.contact('Ana Lima')
+        ana.save()
+        self.assertRowCount()
+        ana.save()
+        self.assertRowCount()
+        Agenda.objects.bulk_create([self.contact('Bia'), self.contact('Caio')])
+        self.assertRowCount()
+        Agenda.objects.filter(nome_completo='Bia').delete()
+        self.assertRowCount()
+        ana.delete()
+        self.assertRowCount()
+        self.assertEqual(AgendaVersion.current(self.user.pk).row_count, 1)
+
+    def test_rows_are_counted_per_owner(self):
+        """Testa o contador de cada dono e o total, que sai com o dono excluído"""
+        other = User.objects.create_user(username='outro', password='fatec')
+        Agenda.objects.bulk_create([self.contact('Ana'), self.contact('Bia'),
+                                    self.contact('Caio', owner=other)])
+        self.assertEqual(AgendaVersion.current(other.pk).row_count, 1)
+        self.assertEqual(AgendaVersion.total_rows(), 3)
+        Agenda.objects.filter(nome_completo__in=['Bia', 'Caio']).delete()
+        self.assertEqual(AgendaVersion.current(self.user.pk).row_count, 1)
+        self.assertEqual(AgendaVersion.current(other.pk).row_count, 0)
+        self.user.delete()
+        self.assertEqual(AgendaVersion.total_rows(), Agenda.objects.count())
+
+    def test_recreated_marker_counts_rows(self):
+        self.contact('Ana').save()
+        AgendaVersion.objects.all().delete()
+        self.assertRowCount()
+
+
+@override_settings(MIDDLEWARE=MIDDLEWARE)
+class MetricsEndpointTest(MetricsDirMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = User.objects.create_user(username='admin', email='admin@fatec.sp.gov.br',
+                                             password='fatec')
+        Agenda.objects.create(owner=self.user, nome_completo='Ana Lima', telefone='19999999999',
+                              email='ana@fatec.sp.gov.br')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_endpoint(self):
+        """Testa o endpoint sem login, de um IP permitido, com contadores por view e gauges"""
+        self.client.get(reverse('show_contact'))
+        self.client.get(reverse('show_contact'))
+        self.client.get('/nao-existe/')
+        response = Client().get(reverse('metrics'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        output = response.content.decode()
+        self.assertIn('agenda_requests_total{method="GET",status="200",view="show_contact"} 2', output)
+        self.assertIn('agenda_requests_total{method="GET",status="404",view="unmatched"} 1', output)
+        self.assertIn('agenda_db_queries_total{view="show_contact"} 7', output)
+        self.assertIn('agenda_list_cache_requests_total{result="hit"} 1', output)
+        self.assertIn('agenda_list_cache_requests_total{result="miss"} 1', output)
+        self.assertIn('agenda_contacts 1', output)
+        self.assertEqual(len(glob.glob(os.path.join(self.directory, 'metrics-*.db'))), 1)
+
+    async def test_async_view(self):
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        await client.get(reverse('async_show_contact'))
+        samples = metrics.collect()
+        key = ('agenda_requests_total', (('method', 'GET'), ('status', '200'),
+                                         ('view', 'async_show_contact')))
+        self.assertEqual(samples[key], 1)
+        self.assertGreater(samples[('agenda_db_queries_total', (('view', 'async_show_contact'),))], 0)
+
+    @override_settings(MIDDLEWARE=['core.middleware.ServerTimingMiddleware'] + MIDDLEWARE)
+    def test_reuses_server_timing(self):
+        """Testa que as consultas contadas são as mesmas do header Server-Timing"""
+        response = self.client.get(reverse('show_contact'))
+        self.assertIn('desc="4 queries"', response['Server-Timing'])
+        samples = metrics.collect()
+        self.assertEqual(samples[('agenda_db_queries_total', (('view', 'show_contact'),))], 4)
+
+    def test_forbidden_ip(self):
+        """Testa o 403 para IPs fora de AGENDA_METRICS_ALLOWED_IPS sem usuário staff"""
+        self.assertEqual(Client(REMOTE_ADDR='10.0.0.5').get(reverse('metrics')).status_code,
+                         HTTPStatus.FORBIDDEN)
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.5').status_code,
+                         HTTPStatus.FORBIDDEN)
+        with override_settings(AGENDA_METRICS_ALLOWED_IPS=['10.0.0.0/8']):
+            self.assertEqual(Client(REMOTE_ADDR='10.0.0.5').get(reverse('metrics')).status_code,
+                             HTTPStatus.OK)
+
+    def test_staff(self):
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.5')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+
+class MetricsRouteTest(TestCase):
+    def test_route_needs_setting(self):
+        """Testa que, sem AGENDA_METRICS, a rota /metrics não existe"""
+        self.assertFalse(settings.AGENDA_METRICS)
+        self.assertEqual(Client().get('/metrics').status_code, HTTPStatus.NOT_FOUND)
@@ -1,9 +1,12 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
 from core.models import Agenda
 
 class AgendaModelTest(TestCase):
     def setUp(self):
+        self.owner = User.objects.create_user(username="renan", password="fatec")
         self.agenda = Agenda.objects.create(
+            owner=self.owner,
             nome_completo="Renan Marques",
             telefone="(19) 99999-9999",  # número fictício
             email="renan.marques3@fatec.sp.gov.br",
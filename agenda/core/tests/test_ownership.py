@@ -0,0 +1,109 @@
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, Client, AsyncClient
+from django.urls import reverse
+from http import HTTPStatus
+from core.fts import full_text_search
+from core.models import Agenda
+from core.search import search_contacts
+
+
+class OwnershipViewsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.ana = User.objects.create_user(username='ana', email='ana@fatec.sp.gov.br', password='fatec')
+        self.bruno = User.objects.create_user(username='bruno', email='bruno@fatec.sp.gov.br',
+                                              password='fatec')
+        self.da_ana = Agenda.objects.create(owner=self.ana, nome_completo='Carla Dias',
+                                            telefone='19999999999', email='carla@fatec.sp.gov.br',
+                                            observacao='Contato da Ana')
+        self.do_bruno = Agenda.objects.create(owner=self.bruno, nome_completo='Carlos Lima',
+                                              telefone='19999999998', email='carlos@fatec.sp.gov.br',
+                                              observacao='Contato do Bruno')
+        self.client = Client()
+        self.client.login(username='ana', password='fatec')
+
+    def test_list_and_search_show_only_own_contacts(self):
+        """Testa que lista, pesquisa e autocomplete mostram só os contatos do usuário"""
+        response = self.client.get(reverse('show_contact'), {'q': 'car'})
+        self.assertContains(response, 'Carla Dias')
+        self.assertNotContains(response, 'Carlos Lima')
+        response = self.client.get(reverse('search_contact'), {'q': 'contato'})
+        self.assertEqual(list(response.context['contacts']), [self.da_ana])
+        response = self.client.get(reverse('autocomplete_contact'), {'q': 'car'})
+        self.assertEqual([r['id'] for r in response.json()['results']], [self.da_ana.id])
+
+    def test_cached_list_is_per_user(self):
+        """Testa que a página em cache de um usuário não é servida a outro"""
+        self.client.get(reverse('show_contact'))
+        other = Client()
+        other.login(username='bruno', password='fatec')
+        response = other.get(reverse('show_contact'))
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertContains(response, 'Carlos Lima')
+        self.assertNotContains(response, 'Carla Dias')
+
+    def test_other_users_contact_is_not_found(self):
+        """Testa que detalhe, edição e exclusão não alcançam contatos de outro usuário"""
+        response = self.client.get(reverse('contact_detail', args=[self.do_bruno.id]))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        response = self.client.post(reverse('edit_contact'), {
+            'id': self.do_bruno.id, 'nome_completo': 'Invadido', 'telefone': '19999999999',
+            'email': 'x@fatec.sp.gov.br', 'observacao': ''})
+        self.assertEqual(response.context['errors'], 'Contato nao encontrado.')
+        response = self.client.post(reverse('delete_contact'), {'id': self.do_bruno.id})
+        self.assertEqual(response.context['errors'], 'Contato não encontrado.')
+        self.do_bruno.refresh_from_db()
+        self.assertEqual(self.do_bruno.nome_completo, 'Carlos Lima')
+
+    def test_register_sets_owner(self):
+        self.client.post(reverse('register_contact'), {
+            'nome_completo': 'Diego Novo', 'telefone': '19999999999',
+            'email': 'diego@fatec.sp.gov.br', 'observacao': ''})
+        self.assertEqual(Agenda.objects.get(nome_completo='Diego Novo').owner, self.ana)
+
+    def test_export_only_own_contacts(self):
+        response = self.client.get(reverse('export_contacts'), {'format': 'jsonl'})
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn('Carla Dias', content)
+        self.assertNotIn('Carlos Lima', content)
+
+    def test_export_command_owner(self):
+        out = StringIO()
+        call_command('export_contacts', '--format', 'jsonl', '--owner', 'bruno', stdout=out)
+        self.assertIn('Carlos Lima', out.getvalue())
+        self.assertNotIn('Carla Dias', out.getvalue())
+
+    async def test_async_views(self):
+        client = AsyncClient()
+        await client.aforce_login(self.bruno)
+        response = await client.get(reverse('async_show_contact'))
+        self.assertContains(response, 'Carlos Lima')
+        self.assertNotContains(response, 'Carla Dias')
+        response = await client.post(reverse('async_delete_contact'), {'id': self.da_ana.id})
+        self.assertEqual(response.context['errors'], 'Contato não encontrado.')
+
+
+class OwnerScopedQueriesTest(TestCase):
+    def setUp(self):
+        self.ana = User.objects.create_user(username='ana', password='fatec')
+        self.bruno = User.objects.create_user(username='bruno', password='fatec')
+        for i in range(5):
+            Agenda.objects.create(owner=self.bruno, nome_completo=f'Importante {chr(65 + i)}',
+                                  telefone='19999999999', email='b@fatec.sp.gov.br')
+        self.da_ana = Agenda.objects.create(owner=self.ana, nome_completo='Importante Z',
+                                            telefone='19999999999', email='a@fatec.sp.gov.br')
+
+    def test_full_text_limit_applies_after_owner_filter(self):
+        """Testa que o LIMIT do FTS não descarta os contatos do usuário"""
+        results = full_text_search(Agenda.objects.filter(owner=self.ana), 'importante', limit=2)
+        self.assertEqual(results, [self.da_ana])
+
+    def test_list_uses_owner_index(self):
+        """Testa que a lista e a busca usam os índices que começam por owner"""
+        plan = Agenda.objects.filter(owner=self.ana).order_by('nome_completo', 'id')[:51].explain()
+        self.assertIn('core_agenda_own_nome_id_idx', plan)
+        plan = search_contacts(Agenda.objects.filter(owner=self.ana), '1999').explain()
+        self.assertIn('core_agenda_own_tel_idx', plan)
@@ -0,0 +1,98 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from http import HTTPStatus
+from core.models import Agenda
+from core.pagination import keyset_paginate, encode_cursor, decode_cursor, get_page_size
+
+
+class CursorTest(TestCase):
+    def test_encode_decode_roundtrip(self):
+        """Testa se o cursor codificado volta para (nome, id)"""
+        cursor = encode_cursor('João da Silva', 42)
+        self.assertEqual(decode_cursor(cursor), ('João da Silva', 42))
+
+    def test_invalid_cursor_is_ignored(self):
+        """Testa que cursores inválidos são tratados como ausentes"""
+        for cursor in ('', 'lixo', '!!!', encode_cursor('x', 1)[:-3]):
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(decode_cursor(cursor))
+
+    @override_settings(AGENDA_PAGE_SIZE=10, AGENDA_MAX_PAGE_SIZE=20)
+    def test_page_size_limits(self):
+        """Testa o tamanho padrão e o limite máximo da página"""
+        self.assertEqual(get_page_size(None), 10)
+        self.assertEqual(get_page_size('5'), 5)
+        self.assertEqual(get_page_size('500'), 20)
+        self.assertEqual(get_page_size('abc'), 10)
+
+
+class KeysetPaginateTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='dono', password='fatec')
+        # Nomes repetidos garantem o desempate pelo id
+        for nome in ['Carla', 'Ana', 'Bruno', 'Ana', 'Diego', 'Bruno', 'Elisa']:
+            Agenda.objects.create(nome_completo=nome, telefone='19999999999',
+                                  email='a@fatec.sp.gov.br', owner=self.owner)
+        self.expected = list(Agenda.objects.order_by('nome_completo', 'id'))
+
+    def test_walk_forward_and_backward(self):
+        """Testa que avançar e voltar percorre a mesma ordem sem repetições"""
+        seen = []
+        page = keyset_paginate(Agenda.objects.all(), page_size=3)
+        self.assertFalse(page.has_previous)
+        seen.extend(page.items)
+        pages = [page]
+        while page.has_next:
+            page = keyset_paginate(Agenda.objects.all(), after=page.next_cursor, page_size=3)
+            seen.extend(page.items)
+            pages.append(page)
+        self.assertEqual(seen, self.expected)
+        self.assertEqual([len(p) for p in pages], [3, 3, 1])
+
+        back = keyset_paginate(Agenda.objects.all(), before=pages[-1].previous_cursor, page_size=3)
+        self.assertEqual(back.items, pages[1].items)
+        self.assertTrue(back.has_next)
+        self.assertTrue(back.has_previous)
+
+    def test_first_page_from_previous(self):
+        """Testa que voltar até o início não oferece página anterior"""
+        second = keyset_paginate(Agenda.objects.all(), after=encode_cursor(
+            self.expected[2].nome_completo, self.expected[2].id), page_size=3)
+        first = keyset_paginate(Agenda.objects.all(), before=second.previous_cursor, page_size=3)
+        self.assertEqual(first.items, self.expected[:3])
+        self.assertFalse(first.has_previous)
+
+    def test_single_query_per_page(self):
+        """Testa que cada página custa uma única consulta"""
+        with self.assertNumQueries(1):
+            keyset_paginate(Agenda.objects.all(), after=encode_cursor('Bruno', 0), page_size=2)
+
+
+class ShowContactPaginationTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.owner = User.objects.create_user(username='admin', email='admin@fatec.sp.gov.br',
+                                              password='fatec')
+        self.client.login(username='admin', password='fatec')
+        for i in range(5):
+            Agenda.objects.create(nome_completo=f'Contato {chr(65 + i)}', telefone='19999999999',
+                                  email='a@fatec.sp.gov.br', owner=self.owner)
+
+    def test_next_link(self):
+        """Testa que a lista mostra o link da próxima página"""
+        response = self.client.get(reverse('show_contact'), {'page_size': 2})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(len(response.context['contacts']), 2)
+        page = response.context['page']
+        self.assertContains(response, f'after={page.next_cursor}')
+        self.assertNotContains(response, 'Anterior')
+
+    def test_follow_cursor(self):
+        """Testa que o cursor leva à página seguinte"""
+        first = self.client.get(reverse('show_contact'), {'page_size': 2}).context['page']
+        response = self.client.get(reverse('show_contact'),
+                                   {'page_size': 2, 'after': first.next_cursor})
+        self.assertContains(response, 'Contato C')
+        self.assertNotContains(response, 'Contato A')
+        self.assertContains(response, 'Anterior')
@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, Client, AsyncClient, override_settings
+from django.urls import reverse
+from core import profiling
+from core.models import Agenda
+
+MIDDLEWARE = ['core.middleware.ProfilingMiddleware'] + [
+    name for name in settings.MIDDLEWARE if name != 'core.middleware.ProfilingMiddleware']
+
+
+class ProfilingTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        override = override_settings(MIDDLEWARE=MIDDLEWARE, AGENDA_PROFILING_DIR=self.directory,
+                                     AGENDA_PROFILING_SAMPLE_RATE=0, AGENDA_PROFILING_TOKEN='segredo')
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = User.objects.create_user(username='admin', email='admin@fatec.sp.gov.br',
+                                             password='fatec')
+        Agenda.objects.create(owner=self.user, nome_completo='Ana Lima', telefone='19999999999',
+                              email='ana@fatec.sp.gov.br')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+
+class ProfilingMiddlewareTest(ProfilingTestCase):
+    def test_not_profiled_by_default(self):
+        response = self.client.get(reverse('show_contact'))
+        self.assertNotIn(profiling.HEADER, response)
+        self.assertEqual(profiling.profile_files(), [])
+
+    def test_header_with_token(self):
+        """Testa o perfil pedido pelo header com o token"""
+        response = self.client.get(reverse('show_contact'), headers={profiling.HEADER: 'segredo'})
+        name = response[profiling.HEADER]
+        [profile] = profiling.profile_files()
+        self.assertEqual(os.path.basename(profile.path), name)
+        self.assertEqual((profile.view, profile.method, profile.status), ('show_contact', 'GET', 200))
+
+    def test_wrong_token_is_ignored(self):
+        response = self.client.get(reverse('show_contact'), headers={profiling.HEADER: 'errado'})
+        self.assertNotIn(profiling.HEADER, response)
+
+    @override_settings(AGENDA_PROFILING_TOKEN='')
+    def test_header_needs_configured_token(self):
+        response = self.client.get(reverse('show_contact'), headers={profiling.HEADER: ''})
+        self.assertNotIn(profiling.HEADER, response)
+
+    @override_settings(AGENDA_PROFILING_SAMPLE_RATE=1)
+    def test_sample_rate_and_rotation(self):
+        """Testa o sorteio e a rotação que guarda só os perfis mais recentes"""
+        with override_settings(AGENDA_PROFILING_KEEP=2):
+            names = [self.client.get(reverse('show_contact'))[profiling.HEADER] for _ in range(3)]
+        files = profiling.profile_files()
+        self.assertEqual([os.path.basename(profile.path) for profile in files], names[1:])
+
+    def test_one_profile_at_a_time(self):
+        profiler = profiling.start()
+        try:
+            self.assertIsNone(profiling.start())
+            response = self.client.get(reverse('show_contact'), headers={profiling.HEADER: 'segredo'})
+        finally:
+            profiling.stop(profiler)
+        self.assertNotIn(profiling.HEADER, response)
+        profiler = profiling.start()
+        self.assertIsNotNone(profiler)
+        profiling.stop(profiler)
+
+    async def test_async_view(self):
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        response = await client.get(reverse('async_show_contact'),
+                                    headers={profiling.HEADER: 'segredo'})
+        self.assertIn(profiling.HEADER, response)
+        self.assertEqual(profiling.profile_files()[0].view, 'async_show_contact')
+
+
+class ProfileHotspotsCommandTest(ProfilingTestCase):
+    def test_reports_hotspots(self):
+        """Testa o resumo por view e a lista de funções somando os perfis"""
+        for name in ('show_contact', 'show_contact', 'home'):
+            self.client.get(reverse(name), headers={profiling.HEADER: 'segredo'})
+        out = StringIO()
+        call_command('profile_hotspots', top=10, stdout=out)
+        output = out.getvalue()
+        self.assertIn('3 perfis:', output)
+        self.assertIn('show_contact: 2 requisições', output)
+        self.assertIn('home: 1 requisições', output)
+        self.assertIn('cumulative', output)
+
+        out = StringIO()
+        call_command('profile_hotspots', view='home', sort='tottime', stdout=out)
+        self.assertIn('1 perfis:', out.getvalue())
+        self.assertNotIn('show_contact', out.getvalue())
+
+    def test_no_profiles(self):
+        with self.assertRaises(CommandError):
+            call_command('profile_hotspots', stdout=StringIO())
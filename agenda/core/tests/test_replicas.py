@@ -0,0 +1,137 @@
+from unittest import skipUnless
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connections, router
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from http import HTTPStatus
+from core import replicas
+from core.middleware import ReplicaPinningMiddleware
+from core.models import Agenda
+
+
+@replicas.replica_reads
+def read_view(request):
+    return HttpResponse(replicas.read_alias() or 'default')
+
+
+@override_settings(AGENDA_READ_REPLICAS=['replica1', 'replica2'],
+                   DATABASE_ROUTERS=['core.replicas.ReplicaRouter'])
+class ReplicaRouterTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.token = replicas.current.set(replicas.Routing())
+
+    def tearDown(self):
+        replicas.current.reset(self.token)
+
+    def test_reads_go_to_a_replica_inside_the_view(self):
+        """Testa que só os GETs das views marcadas leem das réplicas"""
+        self.assertIn(read_view(self.factory.get('/')).content, (b'replica1', b'replica2'))
+        self.assertEqual(read_view(self.factory.post('/')).content, b'default')
+        self.assertIsNone(replicas.read_alias())
+
+    def test_pinned_client_reads_the_primary(self):
+        replicas.current.get().pinned = True
+        self.assertEqual(read_view(self.factory.get('/')).content, b'default')
+
+    def test_router(self):
+        """Testa que sessão e usuário ficam no primário e que uma escrita encerra as leituras na réplica"""
+        replicas.current.get().alias = 'replica2'
+        self.assertEqual(router.db_for_read(Agenda), 'replica2')
+        self.assertEqual(router.db_for_read(User), 'default')
+        self.assertEqual(router.db_for_write(Agenda), 'default')
+        self.assertTrue(replicas.current.get().wrote)
+        self.assertEqual(router.db_for_read(Agenda), 'default')
+        self.assertFalse(router.allow_migrate('replica1', 'core'))
+        self.assertTrue(router.allow_migrate('default', 'core'))
+
+    def test_without_middleware_everything_is_primary(self):
+        replicas.current.set(None)
+        self.assertEqual(read_view(self.factory.get('/')).content, b'default')
+
+
+class ReplicaPinningMiddlewareTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_write_pins_the_client(self):
+        """Testa que a requisição que escreve recebe o cookie que fixa o primário"""
+        def write(request):
+            replicas.current.get().wrote = True
+            return HttpResponse()
+        response = ReplicaPinningMiddleware(write)(self.factory.post('/'))
+        cookie = response.cookies[replicas.PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], replicas.DEFAULT_PIN_SECONDS)
+        self.assertTrue(cookie['httponly'])
+        self.assertIsNone(replicas.current.get())
+
+    def test_read_does_not_pin(self):
+        response = ReplicaPinningMiddleware(lambda request: HttpResponse())(self.factory.get('/'))
+        self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+
+    def test_cookie_marks_the_request_as_pinned(self):
+        def view(request):
+            return HttpResponse(str(replicas.current.get().pinned))
+        request = self.factory.get('/')
+        request.COOKIES[replicas.PIN_COOKIE] = '1'
+        self.assertEqual(ReplicaPinningMiddleware(view)(request).content, b'True')
+
+
+# Com réplicas de verdade: AGENDA_SQLITE_REPLICAS=2 python manage.py test core.tests.test_replicas
+@skipUnless(settings.AGENDA_READ_REPLICAS, 'sem réplicas configuradas (AGENDA_SQLITE_REPLICAS)')
+class SQLiteReplicasTest(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='admin', email='admin@fatec.sp.gov.br',
+                                              password='fatec')
+        Agenda.objects.create(nome_completo='Renan Marques', telefone='19987654321',
+                              email='renan@fatec.sp.gov.br', owner=self.owner)
+        self.client = Client()
+        self.client.login(username='admin', password='fatec')
+
+    def agenda_queries(self, view, data=None, **kwargs):
+        """Consultas a core_agenda de uma requisição, por alias."""
+        captures = {alias: CaptureQueriesContext(connections[alias]) for alias in connections}
+        for capture in captures.values():
+            capture.__enter__()
+        try:
+            response = (self.client.post(view, data, **kwargs) if data is not None
+                        else self.client.get(view, **kwargs))
+            if response.streaming:
+                # A exportação só consulta o banco ao ser lida
+                response.getvalue()
+        finally:
+            for capture in captures.values():
+                capture.__exit__(None, None, None)
+        return response, {alias: sum('"core_agenda"' in q['sql'] for q in capture.captured_queries)
+                          for alias, capture in captures.items()}
+
+    def test_reads_use_the_replicas(self):
+        """Testa que a lista, a busca, a exportação e o detalhe leem das réplicas"""
+        detail = reverse('contact_detail', args=[Agenda.objects.get().id])
+        for view in (reverse('show_contact'), reverse('search_contact') + '?q=renan',
+                     reverse('export_contacts'), detail):
+            with self.subTest(view=view):
+                response, queries = self.agenda_queries(view)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertEqual(queries['default'], 0)
+                self.assertGreater(sum(queries.values()), 0)
+                self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+
+    def test_read_your_writes_after_redirect(self):
+        """Testa que depois de um cadastro o cliente lê do primário"""
+        response, _ = self.agenda_queries(reverse('register_contact'), {
+            'nome_completo': 'Ana Souza', 'telefone': '19912345678',
+            'email': 'ana@fatec.sp.gov.br', 'observacao': ''}, follow=True)
+        self.assertRedirects(response, reverse('home'))
+        self.assertIn(replicas.PIN_COOKIE, self.client.cookies)
+        response, queries = self.agenda_queries(reverse('show_contact'))
+        self.assertContains(response, 'Ana Souza')
+        self.assertGreater(queries['default'], 0)
+        self.assertEqual(sum(queries.values()), queries['default'])
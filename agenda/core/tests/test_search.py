@@ -0,0 +1,186 @@
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, Client
+from django.urls import reverse
+from http import HTTPStatus
+from core.models import Agenda
+from core.normalization import normalize_name, normalize_email, phone_digits
+from core.search import search_contacts
+
+
+class NormalizationTest(TestCase):
+    def test_normalize_name(self):
+        """Testa que o nome fica minúsculo, sem acentos e espaços extras"""
+        self.assertEqual(normalize_name('  João   da  CONCEIÇÃO '), 'joao da conceicao')
+
+    def test_normalize_email(self):
+        self.assertEqual(normalize_email(' Renan.Marques@FATEC.sp.gov.br '), 'renan.marques@fatec.sp.gov.br')
+
+    def test_phone_digits(self):
+        self.assertEqual(phone_digits('(19) 99999-0000'), '19999990000')
+
+
+class SearchFieldsTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='dono', password='fatec')
+
+    def test_fields_filled_on_create(self):
+        """Testa que as colunas de busca são preenchidas ao salvar"""
+        agenda = Agenda.objects.create(nome_completo='Márcia Antônia', telefone='(19) 3333-4444',
+                                       email='Marcia@fatec.sp.gov.br', owner=self.owner)
+        agenda.refresh_from_db()
+        self.assertEqual(agenda.nome_busca, 'marcia antonia')
+        self.assertEqual(agenda.telefone_digitos, '1933334444')
+        self.assertEqual(agenda.email_busca, 'marcia@fatec.sp.gov.br')
+        self.assertEqual(agenda.nome_fonetico, 'marsia antonia')
+
+    def test_fields_kept_in_sync_on_update(self):
+        """Testa que save(update_fields=...) também atualiza a busca"""
+        agenda = Agenda.objects.create(nome_completo='Ana', telefone='1933334444',
+                                       email='ana@fatec.sp.gov.br', owner=self.owner)
+        agenda.nome_completo = 'Ângela'
+        agenda.save(update_fields=['nome_completo'])
+        agenda.refresh_from_db()
+        self.assertEqual(agenda.nome_busca, 'angela')
+        self.assertEqual(agenda.nome_fonetico, 'anjela')
+
+
+class SearchContactsTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='dono', password='fatec')
+        self.joao = Agenda.objects.create(nome_completo='João Silva', telefone='19987654321',
+                                          email='joao.silva@fatec.sp.gov.br', owner=self.owner)
+        self.joana = Agenda.objects.create(nome_completo='Joana Souza', telefone='11912345678',
+                                           email='joana@fatec.sp.gov.br', owner=self.owner)
+        self.pedro = Agenda.objects.create(nome_completo='Pedro Jorge', telefone='1133334444',
+                                           email='pedro@fatec.sp.gov.br', owner=self.owner)
+
+    def search(self, query):
+        return set(search_contacts(Agenda.objects.all(), query))
+
+    def test_name_prefix_without_accent(self):
+        """Testa que 'joao' encontra 'João' e que a busca é por prefixo do nome"""
+        self.assertEqual(self.search('joao'), {self.joao})
+        self.assertEqual(self.search('JO'), {self.joao, self.joana})
+        self.assertEqual(self.search('jorge'), set())
+
+    def test_email_prefix(self):
+        self.assertEqual(self.search('pedro@'), {self.pedro})
+        self.assertEqual(self.search('joana@fatec.sp.gov.br'), {self.joana})
+
+    def test_phone_digits(self):
+        """Testa a busca pelos dígitos do telefone, com ou sem máscara"""
+        self.assertEqual(self.search('(11) 9123'), {self.joana})
+        self.assertEqual(self.search('11'), {self.joana, self.pedro})
+
+    def test_empty_query_returns_all(self):
+        self.assertEqual(self.search('  '), {self.joao, self.joana, self.pedro})
+
+    def test_search_uses_index(self):
+        """Testa que a busca por nome não faz varredura da tabela"""
+        plan = search_contacts(Agenda.objects.filter(owner=self.owner), 'jo').explain()
+        self.assertIn('core_agenda_own_nome_busca_idx', plan)
+        self.assertNotIn('SCAN core_agenda\n', plan + '\n')
+
+
+class ShowContactSearchTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.owner = User.objects.create_user(username='admin', email='admin@fatec.sp.gov.br',
+                                              password='fatec')
+        self.client.login(username='admin', password='fatec')
+        Agenda.objects.create(nome_completo='João Silva', telefone='19987654321',
+                              email='joao@fatec.sp.gov.br', owner=self.owner)
+        Agenda.objects.create(nome_completo='Maria Souza', telefone='11912345678',
+                              email='maria@fatec.sp.gov.br', owner=self.owner)
+
+    def test_search_in_list_view(self):
+        """Testa o modo de busca da lista de contatos"""
+        response = self.client.get(reverse('show_contact'), {'q': 'joão'})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, 'João Silva')
+        self.assertNotContains(response, 'Maria Souza')
+        self.assertEqual(response.context['query'], 'joão')
+
+    def test_search_without_results(self):
+        response = self.client.get(reverse('show_contact'), {'q': 'zzz'})
+        self.assertContains(response, 'Nenhum contato encontrado.')
+
+
+class FuzzySearchTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.owner = User.objects.create_user(username='admin', email='admin@fatec.sp.gov.br',
+                                              password='fatec')
+        self.client.login(username='admin', password='fatec')
+        self.luiz = Agenda.objects.create(nome_completo='Luiz Souza', telefone='19987654321',
+                                          email='luiz@fatec.sp.gov.br', owner=self.owner)
+        self.tereza = Agenda.objects.create(nome_completo='Tereza da Silva', telefone='11912345678',
+                                            email='tereza@fatec.sp.gov.br', owner=self.owner)
+        self.thiago = Agenda.objects.create(nome_completo='Thiago Lima', telefone='1133334444',
+                                            email='thiago@fatec.sp.gov.br', owner=self.owner)
+
+    def search(self, query, fuzzy=True):
+        return set(search_contacts(Agenda.objects.all(), query, fuzzy=fuzzy))
+
+    def test_same_sound(self):
+        """Testa que grafias com a mesma pronúncia se encontram só na busca aproximada"""
+        self.assertEqual(self.search('Luis Sousa'), {self.luiz})
+        self.assertEqual(self.search('luis'), {self.luiz})
+        self.assertEqual(self.search('Teresa Silva'), {self.tereza})
+        self.assertEqual(self.search('tiag'), {self.thiago})
+        self.assertEqual(self.search('Luis', fuzzy=False), set())
+
+    def test_particles_and_other_fields(self):
+        """Testa que partículas não geram chave e que e-mail e telefone seguem a busca exata"""
+        self.assertEqual(self.search('da'), set())
+        self.assertEqual(self.search('tereza@'), {self.tereza})
+        self.assertEqual(self.search('(11) 9123'), {self.tereza})
+
+    def test_uses_index(self):
+        plan = search_contacts(Agenda.objects.filter(owner=self.owner), 'luis', fuzzy=True).explain()
+        self.assertIn('core_agenda_own_nome_fon_idx', plan)
+        self.assertNotIn('SCAN core_agenda\n', plan + '\n')
+
+    def test_search_view(self):
+        response = self.client.get(reverse('search_contact'), {'q': 'luis', 'fuzzy': '1'})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.context['contacts'], [self.luiz])
+        self.assertTrue(response.context['fuzzy'])
+        response = self.client.get(reverse('search_contact'), {'q': 'luis'})
+        self.assertEqual(response.context['contacts'], [])
+
+    def test_autocomplete(self):
+        response = self.client.get(reverse('autocomplete_contact'), {'q': 'teresa', 'fuzzy': '1'})
+        self.assertEqual(response.json()['results'], [{'id': self.tereza.id, 'nome_completo': 'Tereza da Silva'}])
+
+    def test_backfill_command(self):
+        """Testa o preenchimento da chave dos contatos gravados antes da coluna"""
+        Agenda.objects.update(nome_fonetico='')
+        Agenda.objects.filter(id=self.thiago.id).update(nome_fonetico='antiga')
+        out = StringIO()
+        call_command('backfill_phonetic', batch_size=1, stdout=out)
+        self.assertIn('2 contatos atualizados de 2 lidos', out.getvalue())
+        self.assertEqual(self.search('luis'), {self.luiz})
+        self.assertEqual(self.search('tiago'), set())
+
+        out = StringIO()
+        call_command('backfill_phonetic', '--all', stdout=out)
+        self.assertIn('1 contatos atualizados de 3 lidos', out.getvalue())
+        self.assertEqual(self.search('tiago'), {self.thiago})
+
+
+class PhoneticMigrationTest(TransactionTestCase):
+    def test_migration_fills_existing_contacts(self):
+        """Testa que a migração 0009 preenche a chave dos contatos já gravados"""
+        owner = User.objects.create_user(username='admin', password='fatec')
+        call_command('migrate', 'core', '0008', verbosity=0)
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO core_agenda (owner_id, nome_completo, telefone, email, observacao, "
+                           "nome_busca, telefone_digitos, email_busca) VALUES (%s, 'Ana Gonçalves', "
+                           "'19999999999', 'ana@fatec.sp.gov.br', '', 'ana goncalves', '19999999999', "
+                           "'ana@fatec.sp.gov.br')", [owner.pk])
+        call_command('migrate', 'core', verbosity=0)
+        self.assertEqual(Agenda.objects.get().nome_fonetico, 'ana gonsalves')
@@ -0,0 +1,95 @@
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from core import synthetic
+from core.forms import AgendaForm
+from core.models import Agenda, AgendaVersion
+
+
+class SyntheticContactsTest(TestCase):
+    def test_contacts_pass_form_validation(self):
+        """Testa que os contatos gerados passam por AgendaForm"""
+        for data in synthetic.generate(seed=7, start=0, count=500):
+            form = AgendaForm(data)
+            self.assertTrue(form.is_valid(), (data, form.errors))
+            self.assertIn(len(data['telefone']), (10, 11))
+            self.assertTrue(data['email'].endswith('@fatec.sp.gov.br'))
+
+    def test_deterministic(self):
+        """Testa que a mesma semente e início geram os mesmos contatos"""
+        self.assertEqual(synthetic.generate(1, 100, 50), synthetic.generate(1, 100, 50))
+        self.assertNotEqual(synthetic.generate(1, 100, 50), synthetic.generate(2, 100, 50))
+
+    def test_unique_emails(self):
+        emails = [data['email'] for data in synthetic.generate(3, 0, 5000)]
+        self.assertEqual(len(set(emails)), len(emails))
+
+    def test_batches(self):
+        self.assertEqual(synthetic.batches(10, 25, 10), [(10, 10), (20, 10), (30, 5)])
+
+    def test_search_columns(self):
+        [data] = synthetic.generate_rows(1, 0, 1)
+        self.assertEqual(data['nome_busca'], synthetic.ascii_lower(data['nome_completo']))
+        self.assertEqual(data['telefone_digitos'], data['telefone'])
+
+
+class SeedContactsCommandTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='admin', password='fatec')
+
+    def seed(self, **options):
+        out = StringIO()
+        call_command('seed_contacts', owner='admin', stdout=out, stderr=StringIO(), **options)
+        return out.getvalue()
+
+    def test_creates_contacts(self):
+        """Testa a carga em lotes e o contador de contatos de AgendaVersion"""
+        output = self.seed(count=120, batch_size=25)
+        self.assertIn('120 contatos criados para admin', output)
+        self.assertIn('  50/120', output)
+        self.assertEqual(Agenda.objects.filter(owner=self.owner).count(), 120)
+        self.assertEqual(AgendaVersion.current(self.owner.pk).row_count, 120)
+        contact = Agenda.objects.order_by('id').first()
+        self.assertEqual(contact.nome_busca, synthetic.ascii_lower(contact.nome_completo))
+
+    def test_same_seed_same_contacts(self):
+        self.seed(count=30, seed=5, batch_size=7)
+        expected = [(data['nome_completo'], data['email']) for data in
+                    synthetic.generate(5, 0, 7) + synthetic.generate(5, 7, 7)]
+        created = Agenda.objects.order_by('id').values_list('nome_completo', 'email')[:14]
+        self.assertEqual(list(created), expected)
+
+    def test_continues_numbering(self):
+        """Testa que uma segunda carga continua a numeração, sem repetir e-mails"""
+        self.seed(count=20)
+        self.seed(count=20)
+        emails = list(Agenda.objects.values_list('email', flat=True))
+        self.assertEqual(len(set(emails)), 40)
+
+    def test_sqlite_uses_one_process(self):
+        err = StringIO()
+        call_command('seed_contacts', owner='admin', count=10, workers=4, stdout=StringIO(), stderr=err)
+        self.assertIn('um processo', err.getvalue())
+        self.assertEqual(Agenda.objects.count(), 10)
+
+    def test_invalid_options(self):
+        with self.assertRaises(CommandError):
+            self.seed(count=0)
+        with self.assertRaises(CommandError):
+            call_command('seed_contacts', owner='ninguem', count=10, stdout=StringIO())
+
+
+class DeferIndexesTest(TransactionTestCase):
+    # O schema editor do SQLite não roda dentro da transação de um TestCase
+    def test_indexes_are_recreated(self):
+        """Testa que os índices são recriados ao final da carga"""
+        User.objects.create_user(username='admin', password='fatec')
+        call_command('seed_contacts', owner='admin', count=10, defer_indexes=True, stdout=StringIO())
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Agenda._meta.db_table)
+        for index in Agenda._meta.indexes:
+            self.assertIn(index.name, constraints)
+        self.assertEqual(Agenda.objects.count(), 10)
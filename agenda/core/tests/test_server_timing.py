@@ -0,0 +1,83 @@
+import re
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.template.loader import get_template
+from django.test import TestCase, Client, AsyncClient, override_settings
+from django.urls import reverse
+from core import timing
+from core.models import Agenda
+
+MIDDLEWARE = ['core.middleware.ServerTimingMiddleware'] + [
+    name for name in settings.MIDDLEWARE if name != 'core.middleware.ServerTimingMiddleware']
+
+SERVER_TIMING = re.compile(
+    r'^db;dur=(?P<db>[\d.]+);desc="(?P<queries>\d+) queries", '
+    r'template;dur=(?P<template>[\d.]+), total;dur=(?P<total>[\d.]+)$')
+
+
+@override_settings(MIDDLEWARE=MIDDLEWARE)
+class ServerTimingMiddlewareTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='admin', email='admin@fatec.sp.gov.br',
+                                             password='fatec')
+        Agenda.objects.create(owner=self.user, nome_completo='Ana Lima', telefone='19999999999',
+                              email='ana@fatec.sp.gov.br')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def timings(self, response):
+        match = SERVER_TIMING.match(response['Server-Timing'])
+        self.assertIsNotNone(match, response['Server-Timing'])
+        return match
+
+    def test_header(self):
+        """Testa o header com banco, template, total e número de consultas"""
+        response = self.client.get(reverse('show_contact'))
+        timings = self.timings(response)
+        self.assertEqual(int(timings['queries']), 4)  # sessão, usuário, versão e a página
+        self.assertGreater(float(timings['template']), 0)
+        self.assertGreaterEqual(float(timings['total']), float(timings['db']))
+
+    def test_cached_page_has_no_template_time(self):
+        self.client.get(reverse('show_contact'))
+        timings = self.timings(self.client.get(reverse('show_contact')))
+        self.assertEqual(int(timings['queries']), 3)
+        self.assertEqual(float(timings['template']), 0)
+
+    @override_settings(AGENDA_SLOW_REQUEST_MS=0, AGENDA_SLOW_QUERY_MS=0)
+    def test_slow_request_and_query_are_logged(self):
+        with self.assertLogs('core.timing', 'WARNING') as logs:
+            self.client.get(reverse('show_contact'))
+        output = '\n'.join(logs.output)
+        self.assertIn('Requisição lenta: GET /show_contact/', output)
+        self.assertIn('Consulta lenta', output)
+        self.assertIn('core_agenda', output)
+
+    def test_fast_request_is_not_logged(self):
+        with self.assertNoLogs('core.timing', 'WARNING'):
+            self.client.get(reverse('show_contact'))
+
+    def test_timings_reset_after_request(self):
+        self.client.get(reverse('show_contact'))
+        self.assertIsNone(timing.current.get())
+        self.assertIn(timing.record_query, connection.execute_wrappers)
+
+    async def test_async_views(self):
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        response = await client.get(reverse('async_show_contact'))
+        timings = self.timings(response)
+        self.assertGreater(int(timings['queries']), 0)
+        self.assertGreater(float(timings['template']), 0)
+
+
+class TimedTemplateTest(TestCase):
+    def test_render_outside_request(self):
+        """Testa que, sem requisição medida, o template renderiza normalmente"""
+        template = get_template('logout.html')
+        self.assertIsInstance(template, timing.TimedTemplate)
+        self.assertIn('<html', template.render({}))
+        self.assertEqual(template.origin.template_name, 'logout.html')
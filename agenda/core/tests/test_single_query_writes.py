@@ -0,0 +1,78 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from http import HTTPStatus
+from core.models import Agenda
+
+
+def agenda_queries(captured):
+    # Apenas as consultas à tabela de contatos (sessão e usuário ficam de fora)
+    return [q['sql'] for q in captured.captured_queries if '"core_agenda"' in q['sql']]
+
+
+class SingleQueryWritesTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.owner = User.objects.create_user(username='admin', email='admin@fatec.sp.gov.br',
+                                              password='fatec')
+        self.client.login(username='admin', password='fatec')
+        self.contact = Agenda.objects.create(nome_completo='Renan Marques', telefone='19987654321',
+                                             email='renan@fatec.sp.gov.br', observacao='Teste',
+                                             owner=self.owner)
+        self.data = {
+            'id': self.contact.id,
+            'nome_completo': 'Renan Editado',
+            'telefone': '19912345678',
+            'email': 'Renan.Editado@fatec.sp.gov.br',
+            'observacao': 'Editado',
+        }
+
+    def test_edit_is_a_single_update(self):
+        """Testa que a edição válida faz um único UPDATE"""
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(reverse('edit_contact'), self.data)
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        queries = agenda_queries(captured)
+        self.assertEqual(len(queries), 1, queries)
+        self.assertTrue(queries[0].startswith('UPDATE'))
+
+    def test_edit_keeps_search_fields(self):
+        """Testa que o UPDATE também atualiza as colunas de busca"""
+        self.client.post(reverse('edit_contact'), self.data)
+        self.contact.refresh_from_db()
+        self.assertEqual(self.contact.nome_completo, 'Renan Editado')
+        self.assertEqual(self.contact.nome_busca, 'renan editado')
+        self.assertEqual(self.contact.email_busca, 'renan.editado@fatec.sp.gov.br')
+        self.assertEqual(self.contact.telefone_digitos, '19912345678')
+
+    def test_edit_not_found_message(self):
+        """Testa que a mensagem de contato inexistente foi mantida"""
+        for contact_id in (9999, 'abc'):
+            with self.subTest(id=contact_id):
+                response = self.client.post(reverse('edit_contact'), dict(self.data, id=contact_id))
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertEqual(response.context['errors'], 'Contato nao encontrado.')
+
+    def test_edit_invalid_form_not_found_message(self):
+        """Testa que o contato inexistente tem prioridade sobre erros do formulário"""
+        response = self.client.post(reverse('edit_contact'), dict(self.data, id=9999, telefone='x'))
+        self.assertEqual(response.context['errors'], 'Contato nao encontrado.')
+
+    def test_delete_is_a_single_delete(self):
+        """Testa que a exclusão faz um único DELETE"""
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(reverse('delete_contact'), {'id': self.contact.id})
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        queries = agenda_queries(captured)
+        self.assertEqual(len(queries), 1, queries)
+        self.assertTrue(queries[0].startswith('DELETE'))
+        self.assertFalse(Agenda.objects.filter(id=self.contact.id).exists())
+
+    def test_delete_not_found_message(self):
+        for contact_id in (9999, 'abc'):
+            with self.subTest(id=contact_id):
+                response = self.client.post(reverse('delete_contact'), {'id': contact_id})
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertEqual(response.context['errors'], 'Contato não encontrado.')
@@ -0,0 +1,93 @@
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from http import HTTPStatus
+from core import throttle
+from core.forms import LoginForm
+from core.tests.test_metrics import MetricsDirMixin
+
+
+@override_settings(AGENDA_LOGIN_EMAIL_LIMIT=3, AGENDA_LOGIN_IP_LIMIT=5, AGENDA_LOGIN_WINDOW=60)
+class SlidingWindowTest(MetricsDirMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_counts_failures_per_scope(self):
+        for _ in range(2):
+            throttle.record_failure('Ana@fatec.sp.gov.br', '10.0.0.1', now=1000)
+        self.assertEqual(throttle.attempts('email', 'ana@fatec.sp.gov.br', now=1000), 2)
+        self.assertEqual(throttle.attempts('ip', '10.0.0.1', now=1000), 2)
+        self.assertIsNone(throttle.blocked_scope('ana@fatec.sp.gov.br', '10.0.0.1', now=1000))
+        throttle.record_failure('ana@fatec.sp.gov.br', None, now=1000)
+        self.assertEqual(throttle.blocked_scope('ana@fatec.sp.gov.br', '10.0.0.2', now=1000), 'email')
+
+    def test_ip_limit_across_emails(self):
+        """Testa que muitos e-mails diferentes do mesmo IP também são bloqueados"""
+        for i in range(5):
+            throttle.record_failure(f'u{i}@fatec.sp.gov.br', '10.0.0.1', now=1000)
+        self.assertEqual(throttle.blocked_scope('novo@fatec.sp.gov.br', '10.0.0.1', now=1000), 'ip')
+
+    def test_window_slides(self):
+        """Testa que falhas da janela anterior pesam proporcionalmente e depois expiram"""
+        for _ in range(3):
+            throttle.record_failure('ana@fatec.sp.gov.br', None, now=1190)  # janela [1140, 1200)
+        self.assertEqual(throttle.attempts('email', 'ana@fatec.sp.gov.br', now=1215), 3 * 0.75)
+        self.assertIsNone(throttle.blocked_scope('ana@fatec.sp.gov.br', None, now=1215))
+        self.assertEqual(throttle.attempts('email', 'ana@fatec.sp.gov.br', now=1260), 0)
+
+    def test_reset_and_stats(self):
+        for _ in range(3):
+            throttle.record_failure('ana@fatec.sp.gov.br', None, now=1000)
+        throttle.blocked_scope('ana@fatec.sp.gov.br', None, now=1000)
+        self.assertEqual(throttle.stats(), {'blocked_email': 1, 'blocked_ip': 0})
+        throttle.reset('ana@fatec.sp.gov.br', now=1000)
+        self.assertEqual(throttle.attempts('email', 'ana@fatec.sp.gov.br', now=1000), 0)
+
+
+@override_settings(AGENDA_LOGIN_EMAIL_LIMIT=2, AGENDA_LOGIN_IP_LIMIT=10)
+class LoginThrottleTest(MetricsDirMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client = Client()
+        User.objects.create_user(username='admin', email='admin@fatec.sp.gov.br', password='fatec')
+
+    def post(self, password):
+        return self.client.post(reverse('login'), {'email': 'admin@fatec.sp.gov.br',
+                                                   'password': password})
+
+    def test_blocked_before_hashing(self):
+        """Testa que, acima do limite, a senha nem chega a ser verificada"""
+        self.post('errada')
+        self.post('errada')
+        with mock.patch('core.forms.authenticate') as authenticate:
+            response = self.post('fatec')
+        authenticate.assert_not_called()
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertContains(response, 'Muitas tentativas de login.', status_code=429)
+
+    def test_success_resets_email_counter(self):
+        self.post('errada')
+        self.assertRedirects(self.post('fatec'), reverse('home'), fetch_redirect_response=False)
+        self.assertEqual(throttle.attempts('email', 'admin@fatec.sp.gov.br'), 0)
+
+    def test_stats_endpoint(self):
+        self.post('errada')
+        self.post('errada')
+        self.post('errada')
+        self.client.login(username='admin', password='fatec')
+        response = self.client.get(reverse('throttle_stats'))
+        self.assertEqual(response.json(), {'blocked_email': 1, 'blocked_ip': 0})
+        # O mesmo contador, somado entre os processos, no /metrics
+        self.assertContains(self.client.get(reverse('metrics')), 'agenda_login_blocked_total{scope="email"} 1')
+
+    def test_form_without_request_uses_email_only(self):
+        data = {'email': 'admin@fatec.sp.gov.br', 'password': 'errada'}
+        LoginForm(data).is_valid()
+        LoginForm(data).is_valid()
+        form = LoginForm(data)
+        self.assertFalse(form.is_valid())
+        self.assertTrue(form.throttled)
@@ -0,0 +1,238 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, OperationalError, connection
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+from core import unique_keys
+from core.importers import DATABASE_ERROR, DUPLICATE_ERROR, get_upsert_key, import_csv
+from core.models import Agenda, AgendaVersion, unique_constraint
+from core.tests.test_import import make_csv
+
+
+# O comando altera o esquema: TransactionTestCase, e as chaves são removidas no tearDown
+class UniqueContactsTestCase(TransactionTestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='admin', password='fatec')
+        self.other = User.objects.create_user(username='outro', password='fatec')
+
+    def tearDown(self):
+        call_command('unique_contacts', 'drop', stdout=StringIO())
+
+    def add_keys(self, *keys):
+        out = StringIO()
+        call_command('unique_contacts', 'add', keys=list(keys or ('email', 'telefone')), stdout=out)
+        return out.getvalue()
+
+    def contact(self, nome, telefone, email, owner=None, observacao=''):
+        return Agenda(owner=owner or self.owner, nome_completo=nome, telefone=telefone,
+                      email=email, observacao=observacao)
+
+
+class UniqueContactsCommandTest(UniqueContactsTestCase):
+    def test_add_and_drop(self):
+        self.assertIn('email: criada', self.add_keys('email'))
+        out = StringIO()
+        call_command('unique_contacts', stdout=out)
+        self.assertIn('email: criada', out.getvalue())
+        self.assertIn('telefone: ausente', out.getvalue())
+
+        Agenda.objects.create(owner=self.owner, nome_completo='Ana Silva', telefone='19987654321',
+                              email='ana@fatec.sp.gov.br')
+        # O mesmo e-mail em outra grafia, ou de outro dono
+        with self.assertRaises(IntegrityError):
+            Agenda.objects.create(owner=self.owner, nome_completo='Ana Paula', telefone='11911112222',
+                                  email='ANA@fatec.sp.gov.br')
+        Agenda.objects.create(owner=self.other, nome_completo='Ana Silva', telefone='19987654321',
+                              email='ana@fatec.sp.gov.br')
+
+        out = StringIO()
+        call_command('unique_contacts', 'drop', stdout=out)
+        self.assertIn('email: ausente', out.getvalue())
+        Agenda.objects.create(owner=self.owner, nome_completo='Ana Paula', telefone='11911112222',
+                              email='ana@fatec.sp.gov.br')
+
+    def test_refuses_duplicates(self):
+        """Testa que a chave não é criada enquanto houver duplicatas a fazer merge"""
+        for nome in ('Ana Silva', 'Ana Paula'):
+            Agenda.objects.create(owner=self.owner, nome_completo=nome, telefone='19987654321',
+                                  email=f'{nome.split()[1].lower()}@fatec.sp.gov.br')
+        with self.assertRaisesMessage(CommandError, 'find_duplicates --keys telefone'):
+            self.add_keys('telefone')
+        self.assertIn('email: criada', self.add_keys('email'))
+
+
+class MigrateTest(UniqueContactsTestCase):
+    def test_migrate_restores_keys(self):
+        """Testa que as chaves apagadas pela recriação de core_agenda voltam depois do migrate"""
+        self.add_keys('email')
+        out = StringIO()
+        call_command('migrate', 'core', '0008', verbosity=0, stdout=out)
+        call_command('migrate', 'core', verbosity=1, stdout=out)
+        self.assertEqual(unique_keys.installed(), {'email'})
+        self.assertIn('Chave única email de unique_contacts recriada.', out.getvalue())
+
+    def test_restore_refuses_duplicates(self):
+        self.add_keys('email')
+        call_command('unique_contacts', 'drop', stdout=StringIO())
+        for nome in ('Ana Silva', 'Ana Paula'):
+            Agenda.objects.create(owner=self.owner, nome_completo=nome, telefone='19987654321',
+                                  email='ana@fatec.sp.gov.br')
+        self.assertEqual(unique_keys.restore(['email', 'telefone']), ([], {'email': 1, 'telefone': 1}))
+        self.assertEqual(unique_keys.installed(), set())
+
+
+class UpsertTest(UniqueContactsTestCase):
+    def test_upsert(self):
+        """Testa inseridos/atualizados e o row_count do marcador"""
+        self.add_keys('email')
+        Agenda.objects.create(owner=self.owner, nome_completo='Ana Silva', telefone='19987654321',
+                              email='ana@fatec.sp.gov.br')
+        before = AgendaVersion.current(self.owner.pk)
+        inserted, updated = Agenda.objects.upsert([
+            self.contact('Ana Paula Silva', '19987654321', 'Ana@fatec.sp.gov.br', observacao='nova'),
+            self.contact('Bruno Lima', '11977778888', 'bruno@fatec.sp.gov.br'),
+            self.contact('Bruno Lima Souza', '11977778888', 'bruno@fatec.sp.gov.br'),
+            self.contact('Ana Silva', '19987654321', 'ana@fatec.sp.gov.br', owner=self.other),
+        ], 'email')
+        self.assertEqual((inserted, updated), (2, 1))
+        self.assertEqual(Agenda.objects.count(), 3)
+        ana = Agenda.objects.get(owner=self.owner, email_busca='ana@fatec.sp.gov.br')
+        self.assertEqual((ana.nome_completo, ana.observacao), ('Ana Paula Silva', 'nova'))
+        self.assertEqual(ana.nome_busca, 'ana paula silva')
+        # Vale a última linha com a mesma chave
+        self.assertEqual(Agenda.objects.get(email='bruno@fatec.sp.gov.br').nome_completo, 'Bruno Lima Souza')
+        after = AgendaVersion.current(self.owner.pk)
+        self.assertEqual(after.row_count, 2)
+        self.assertGreater(after.version, before.version)
+        self.assertEqual(AgendaVersion.current(self.other.pk).row_count, 1)
+
+    def test_reimport_is_idempotent(self):
+        self.add_keys('telefone')
+        rows = [['João Silva', '19999999999', 'joao@fatec.sp.gov.br', 'primeiro'],
+                ['Maria Souza', '11988887777', 'maria@fatec.sp.gov.br', '']]
+        report = import_csv(make_csv(rows), self.owner, upsert_key='telefone')
+        self.assertEqual((report.created, report.updated), (2, 0))
+        rows[0][3] = 'atualizado'
+        report = import_csv(make_csv(rows), self.owner, upsert_key='telefone')
+        self.assertEqual((report.created, report.updated, report.error_count), (0, 2, 0))
+        self.assertEqual(Agenda.objects.count(), 2)
+        self.assertEqual(Agenda.objects.get(telefone='19999999999').observacao, 'atualizado')
+        self.assertEqual(AgendaVersion.current(self.owner.pk).row_count, 2)
+
+    def test_import_counts_repeated_keys(self):
+        """Testa que as linhas do lote com a mesma chave contam como repetidas"""
+        self.add_keys('telefone')
+        rows = [['João Silva', '19999999999', 'joao@fatec.sp.gov.br', 'primeiro'],
+                ['Maria Souza', '11988887777', 'maria@fatec.sp.gov.br', ''],
+                ['João da Silva', '19999999999', 'joao@fatec.sp.gov.br', 'segundo']]
+        report = import_csv(make_csv(rows), self.owner, upsert_key='telefone')
+        self.assertEqual((report.rows, report.created, report.updated, report.duplicates), (3, 2, 0, 1))
+        self.assertEqual(Agenda.objects.get(telefone='19999999999').observacao, 'segundo')
+
+    def test_import_reports_duplicate_rows(self):
+        """Testa que, fora do modo upsert, o lote é refeito linha a linha e só as duplicadas falham"""
+        self.add_keys('email')
+        Agenda.objects.create(owner=self.owner, nome_completo='Ana Silva', telefone='19987654321',
+                              email='ana@fatec.sp.gov.br')
+        rows = [['João Silva', '19999999999', 'joao@fatec.sp.gov.br', ''],
+                ['Ana Paula', '11911112222', 'ana@fatec.sp.gov.br', ''],
+                ['Maria Souza', '11988887777', 'maria@fatec.sp.gov.br', '']]
+        report = import_csv(make_csv(rows), self.owner, batch_size=10)
+        self.assertEqual((report.created, report.error_count), (2, 1))
+        self.assertEqual(report.errors, [(3, {'contato': [DUPLICATE_ERROR]})])
+        self.assertEqual(Agenda.objects.count(), 3)
+        self.assertEqual(AgendaVersion.current(self.owner.pk).row_count, 3)
+
+    def test_import_command(self):
+        self.add_keys('email')
+        Agenda.objects.create(owner=self.owner, nome_completo='Ana Silva', telefone='19987654321',
+                              email='ana@fatec.sp.gov.br')
+        path = os.path.join(tempfile.mkdtemp(), 'contatos.csv')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(make_csv([['Ana Paula', '11911112222', 'ana@fatec.sp.gov.br', '']]).getvalue())
+        out = StringIO()
+        call_command('import_contacts', path, owner='admin', upsert='email', stdout=out)
+        self.assertIn('0 contatos importados, 1 atualizados, 0 repetidos no arquivo', out.getvalue())
+        self.assertEqual(Agenda.objects.get().nome_completo, 'Ana Paula')
+
+
+class RegisterContactTest(UniqueContactsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_keys('email')
+        Agenda.objects.create(owner=self.owner, nome_completo='Ana Silva', telefone='19987654321',
+                              email='ana@fatec.sp.gov.br')
+        self.client = Client()
+        self.client.login(username='admin', password='fatec')
+        self.data = {'nome_completo': 'Ana Paula', 'telefone': '11911112222',
+                     'email': 'ana@fatec.sp.gov.br', 'observacao': 'nova'}
+
+    def test_duplicate_error(self):
+        """Testa a mensagem de duplicata no formulário, nas views síncrona e assíncrona"""
+        for name in ('register_contact', 'async_register_contact'):
+            with self.subTest(view=name):
+                response = self.client.post(reverse(name), self.data)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, DUPLICATE_ERROR)
+        self.assertEqual(Agenda.objects.count(), 1)
+
+    def test_database_error(self):
+        """Testa que uma falha do banco vira mensagem no formulário, não erro 500"""
+        with mock.patch('core.views.write_queue.run', side_effect=OperationalError('database is locked')), \
+                self.assertLogs('core.views', 'ERROR'):
+            response = self.client.post(reverse('register_contact'), self.data)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, DATABASE_ERROR)
+
+    @override_settings(AGENDA_UPSERT_KEY='telefone')
+    def test_upsert_without_key(self):
+        """Testa que, sem a chave no banco, o upsert fica desligado e o cadastro insere"""
+        with self.assertLogs('core.unique_keys', 'WARNING'):
+            self.assertIsNone(get_upsert_key())
+        response = self.client.post(reverse('register_contact'), dict(self.data, email='nova@fatec.sp.gov.br'))
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        self.assertEqual(Agenda.objects.count(), 2)
+        with self.assertRaisesMessage(CommandError, 'unique_contacts add --keys telefone'):
+            call_command('import_contacts', '-', owner='admin', upsert='telefone', stdout=StringIO())
+
+    @override_settings(AGENDA_UPSERT_KEY='telefone', AGENDA_UNIQUE_KEYS_TTL=0)
+    def test_key_added_by_another_process(self):
+        """Testa que uma chave criada fora deste processo liga o upsert sem reiniciar"""
+        with self.assertLogs('core.unique_keys', 'WARNING'):
+            self.assertIsNone(get_upsert_key())
+        # Como outro processo faria: sem passar por install(), que limparia o cache
+        with connection.schema_editor() as editor:
+            editor.execute(unique_constraint('telefone').create_sql(Agenda, editor))
+        self.assertEqual(get_upsert_key(), 'telefone')
+
+    @override_settings(AGENDA_UPSERT_KEY='email')
+    def test_upsert(self):
+        self.client.post(reverse('register_contact'), self.data)
+        self.assertEqual(Agenda.objects.get().nome_completo, 'Ana Paula')
+        self.data['observacao'] = 'assíncrona'
+        self.client.post(reverse('async_register_contact'), self.data)
+        contact = Agenda.objects.get()
+        self.assertEqual(contact.observacao, 'assíncrona')
+        self.assertEqual(AgendaVersion.current(self.owner.pk).row_count, 1)
+
+
+class BulkEditTest(UniqueContactsTestCase):
+    def test_duplicate_key_conflict(self):
+        """Testa que o mesmo e-mail em vários contatos responde 409, sem alterar o bloco"""
+        self.add_keys('email')
+        ids = [Agenda.objects.create(owner=self.owner, nome_completo=nome, telefone='19987654321',
+                                     email=f'{nome.lower()}@fatec.sp.gov.br').id for nome in ('Ana', 'Bruno')]
+        client = Client()
+        client.login(username='admin', password='fatec')
+        response = client.post(reverse('bulk_edit_contacts'),
+                               json.dumps({'ids': ids, 'fields': {'email': 'todos@fatec.sp.gov.br'}}),
+                               content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json(), {'error': DUPLICATE_ERROR})
+        self.assertFalse(Agenda.objects.filter(email='todos@fatec.sp.gov.br').exists())
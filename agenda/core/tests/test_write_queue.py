@@ -0,0 +1,152 @@
+import asyncio
+import contextvars
+import threading
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from core import write_queue
+from core.models import Agenda, AgendaVersion
+
+request_id = contextvars.ContextVar('request_id', default=None)
+
+
+def create(owner, nome):
+    return Agenda.objects.create(nome_completo=nome, telefone='19987654321',
+                                 email=f'{nome.lower()}@fatec.sp.gov.br', owner=owner)
+
+
+class SQLitePragmasTest(TestCase):
+    def test_connection_pragmas(self):
+        """Testa que o init_command configura cada conexão do SQLite"""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA temp_store')
+            self.assertEqual(cursor.fetchone()[0], 2)  # MEMORY
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+
+class WriteQueueTest(TransactionTestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='admin', password='fatec')
+        self.queue = write_queue.WriteQueue(max_batch=8, max_wait_ms=500)
+        self.batches = []
+        commit = self.queue._commit
+
+        def record(batch):
+            self.batches.append(len(batch))
+            commit(batch)
+        self.queue._commit = record
+
+    def test_groups_writes_in_one_batch(self):
+        """Testa que escritas enviadas juntas viram um único commit"""
+        futures = [self.queue.submit(create, self.owner, nome) for nome in ('Ana', 'Bruno', 'Carla')]
+        contacts = [future.result(timeout=5) for future in futures]
+        self.assertEqual(self.batches, [3])
+        self.assertEqual([c.nome_completo for c in contacts], ['Ana', 'Bruno', 'Carla'])
+        self.assertEqual(Agenda.objects.count(), 3)
+        self.assertEqual(AgendaVersion.current(self.owner.pk).row_count, 3)
+
+    def test_failure_does_not_undo_the_batch(self):
+        """Testa que o savepoint desfaz só a escrita que falhou"""
+        def failing():
+            create(self.owner, 'Bruno')
+            raise ValueError('falhou')
+        futures = [self.queue.submit(create, self.owner, 'Ana'), self.queue.submit(failing),
+                   self.queue.submit(create, self.owner, 'Carla')]
+        futures[0].result(timeout=5)
+        with self.assertRaisesMessage(ValueError, 'falhou'):
+            futures[1].result(timeout=5)
+        futures[2].result(timeout=5)
+        self.assertEqual(self.batches, [3])
+        self.assertEqual(sorted(Agenda.objects.values_list('nome_completo', flat=True)), ['Ana', 'Carla'])
+        self.assertEqual(AgendaVersion.current(self.owner.pk).row_count, 2)
+
+    def test_nested_submit_runs_inline(self):
+        """Testa que uma escrita enviada de dentro da fila não espera por ela mesma"""
+        def outer():
+            return self.queue.submit(create, self.owner, 'Ana').result(timeout=5)
+        contact = self.queue.submit(outer).result(timeout=5)
+        self.assertEqual(contact.nome_completo, 'Ana')
+        self.assertEqual(self.batches, [1])
+
+    def test_runs_in_the_submitter_context(self):
+        """Testa que a escrita vê as ContextVars de quem a enviou (ex.: core.timing)"""
+        token = request_id.set('abc')
+        try:
+            future = self.queue.submit(request_id.get)
+        finally:
+            request_id.reset(token)
+        self.assertEqual(future.result(timeout=5), 'abc')
+
+
+class RunTest(TransactionTestCase):
+    def test_disabled_runs_inline(self):
+        with override_settings(AGENDA_WRITE_QUEUE=False):
+            self.assertIs(write_queue.run(threading.current_thread), threading.current_thread())
+
+    def test_enabled_runs_in_the_writer_thread(self):
+        with override_settings(AGENDA_WRITE_QUEUE=True):
+            thread = write_queue.run(threading.current_thread)
+            self.assertEqual(thread.name, 'agenda-write-queue')
+            self.assertIs(asyncio.run(write_queue.arun(threading.current_thread)), thread)
+
+    @override_settings(AGENDA_WRITE_QUEUE=True, AGENDA_WRITE_QUEUE_TIMEOUT=0.1)
+    def test_timeout(self):
+        """Testa o erro depois do prazo e que a escrita que nem começou é cancelada"""
+        owner = User.objects.create_user(username='admin', password='fatec')
+        queue, release = write_queue.WriteQueue(), threading.Event()
+        busy = queue.submit(release.wait)
+        with mock.patch.object(write_queue, 'get_queue', return_value=queue):
+            with self.assertRaisesMessage(write_queue.WriteQueueTimeout, 'não respondeu em 0.1 s'):
+                write_queue.run(create, owner, 'Ana')
+            with self.assertRaises(write_queue.WriteQueueTimeout):
+                asyncio.run(write_queue.arun(create, owner, 'Bruno'))
+        release.set()
+        busy.result(timeout=5)
+        self.assertEqual(queue.submit(Agenda.objects.count).result(timeout=5), 0)
+
+    def test_writes_inline_without_thread(self):
+        """Testa a escrita direta quando a thread de escrita não pode ser iniciada"""
+        queue = write_queue.WriteQueue()
+        with mock.patch.object(threading.Thread, 'start', side_effect=RuntimeError):
+            future = queue.submit(threading.current_thread)
+        self.assertIs(future.result(timeout=0), threading.current_thread())
+
+
+@override_settings(AGENDA_WRITE_QUEUE=True)
+class ViewsWithWriteQueueTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='admin', email='admin@fatec.sp.gov.br',
+                                              password='fatec')
+        self.client = Client()
+        self.client.login(username='admin', password='fatec')
+        self.data = {'nome_completo': 'Renan Marques', 'telefone': '19987654321',
+                     'email': 'renan@fatec.sp.gov.br', 'observacao': 'Teste'}
+
+    def test_register_edit_and_delete(self):
+        """Testa o CRUD das views com as escritas passando pela fila"""
+        response = self.client.post(reverse('register_contact'), self.data)
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        contact = Agenda.objects.get(owner=self.owner)
+
+        response = self.client.post(reverse('edit_contact'),
+                                    dict(self.data, id=contact.id, nome_completo='Renan Editado'))
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        contact.refresh_from_db()
+        self.assertEqual(contact.nome_completo, 'Renan Editado')
+
+        self.client.post(reverse('delete_contact'), {'id': contact.id})
+        self.assertFalse(Agenda.objects.exists())
+        self.assertEqual(AgendaVersion.current(self.owner.pk).row_count, 0)
+
+    def test_async_register(self):
+        response = self.client.post(reverse('async_register_contact'), self.data)
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        self.assertTrue(Agenda.objects.filter(owner=self.owner, nome_completo='Renan Marques').exists())
@@ -15,6 +15,7 @@ class ViewTests(TestCase):
             password='testpass123'
         )
         self.contact = Agenda.objects.create(
+            owner=self.user,
             nome_completo='Renan Marques Test',
             telefone='19987654321',
             email='renan.marques3@fatec.sp.gov.br',
@@ -142,7 +143,9 @@ class ViewTests(TestCase):
         response = self.client.get(reverse('edit_contact'))
         self.assertEqual(response.status_code, HTTPStatus.OK)
         self.assertTemplateUsed(response, 'edit_contact.html')
-        self.assertIn('contacts', response.context)
+        # Os contatos são carregados sob demanda pelo autocomplete
+        self.assertNotIn('contacts', response.context)
+        self.assertContains(response, reverse('autocomplete_contact'))
     
     def test_edit_contact_view_post_valid(self):
         """Testa edição de contato com dados válidos"""
@@ -198,7 +201,9 @@ class ViewTests(TestCase):
         response = self.client.get(reverse('delete_contact'))
         self.assertEqual(response.status_code, HTTPStatus.OK)
         self.assertTemplateUsed(response, 'delete_contact.html')
-        self.assertIn('contacts', response.context)
+        # Os contatos são carregados sob demanda pelo autocomplete
+        self.assertNotIn('contacts', response.context)
+        self.assertContains(response, reverse('autocomplete_contact'))
     
     def test_delete_contact_view_post_valid(self):
         """Testa exclusão de contato válida"""
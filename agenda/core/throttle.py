@@ -0,0 +1,83 @@
+import hashlib
+import time
+
+from django.conf import settings
+
+from core import metrics
+from core.cache import get_cache
+
+# Limite de tentativas de login com falha, por e-mail e por IP.
+# Janela deslizante aproximada por dois contadores fixos no cache (janela
+# atual e anterior, esta com peso proporcional ao tempo que ainda cobre).
+# A verificação roda antes do authenticate(), então uma tentativa bloqueada
+# não calcula o hash da senha. Os bloqueios são contados em core.metrics
+# (agenda_login_blocked_total), somados entre os processos.
+
+DEFAULT_LIMITS = {'email': 5, 'ip': 20}
+DEFAULT_WINDOW = 300
+
+
+def get_limits():
+    return {
+        'email': getattr(settings, 'AGENDA_LOGIN_EMAIL_LIMIT', DEFAULT_LIMITS['email']),
+        'ip': getattr(settings, 'AGENDA_LOGIN_IP_LIMIT', DEFAULT_LIMITS['ip']),
+    }
+
+
+def get_window():
+    return getattr(settings, 'AGENDA_LOGIN_WINDOW', DEFAULT_WINDOW)
+
+
+def identities(email, ip):
+    values = {'email': (email or '').strip().lower(), 'ip': ip or ''}
+    return {scope: value for scope, value in values.items() if value}
+
+
+def _key(scope, value, bucket):
+    digest = hashlib.md5(value.encode(), usedforsecurity=False).hexdigest()
+    return f'agenda:login:{scope}:{digest}:{bucket}'
+
+
+def attempts(scope, value, now=None):
+    """Falhas estimadas na janela deslizante que termina em now."""
+    window = get_window()
+    now = time.time() if now is None else now
+    bucket, offset = divmod(now, window)
+    current, previous = _key(scope, value, int(bucket)), _key(scope, value, int(bucket) - 1)
+    counts = get_cache().get_many([current, previous])
+    return counts.get(current, 0) + counts.get(previous, 0) * (1 - offset / window)
+
+
+def blocked_scope(email, ip, now=None):
+    """Retorna 'email' ou 'ip' se o limite foi atingido, senão None."""
+    limits = get_limits()
+    for scope, value in identities(email, ip).items():
+        if attempts(scope, value, now) >= limits[scope]:
+            metrics.inc('agenda_login_blocked_total', {'scope': scope})
+            return scope
+    return None
+
+
+def record_failure(email, ip, now=None):
+    window = get_window()
+    now = time.time() if now is None else now
+    cache = get_cache()
+    for scope, value in identities(email, ip).items():
+        key = _key(scope, value, int(now // window))
+        # Dura duas janelas: ainda conta, com peso, na janela seguinte
+        cache.add(key, 0, timeout=2 * window)
+        cache.incr(key)
+
+
+def reset(email, now=None):
+    """Zera as falhas do e-mail após um login válido."""
+    value = identities(email, None).get('email')
+    if value:
+        bucket = int((time.time() if now is None else now) // get_window())
+        get_cache().delete_many([_key('email', value, bucket), _key('email', value, bucket - 1)])
+
+
+def stats():
+    # Lido das métricas: zerado com AGENDA_METRICS desligado
+    return {f'blocked_{scope}': int(metrics.value('agenda_login_blocked_total', {'scope': scope}))
+            for scope in DEFAULT_LIMITS}
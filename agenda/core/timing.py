@@ -0,0 +1,93 @@
+import logging
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates
+
+# Medição por requisição do tempo gasto no banco e nos templates, usada por
+# ServerTimingMiddleware. Os ganchos ficam instalados sempre (toda conexão
+# recebe record_query ao abrir, ver core.signals) e só medem quando há uma
+# requisição medida na ContextVar; fora dela custam um ContextVar.get().
+# A ContextVar acompanha a requisição também nas threads do sync_to_async,
+# onde as views síncronas usam outras conexões no deploy ASGI.
+
+logger = logging.getLogger('core.timing')
+
+DEFAULT_SLOW_REQUEST_MS = 500
+DEFAULT_SLOW_QUERY_MS = 100
+
+current = ContextVar('agenda_request_timings', default=None)
+
+
+def get_thresholds():
+    return (getattr(settings, 'AGENDA_SLOW_REQUEST_MS', DEFAULT_SLOW_REQUEST_MS),
+            getattr(settings, 'AGENDA_SLOW_QUERY_MS', DEFAULT_SLOW_QUERY_MS))
+
+
+class RequestTimings:
+    def __init__(self, slow_query_ms=DEFAULT_SLOW_QUERY_MS):
+        self.slow_query_ms = slow_query_ms
+        self.start = perf_counter()
+        self.db = 0.0
+        self.queries = 0
+        self.template = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = perf_counter() - start
+            self.db += elapsed
+            self.queries += 1
+            if elapsed * 1000 >= self.slow_query_ms:
+                logger.warning('Consulta lenta (%.1f ms): %s', elapsed * 1000, sql[:1000])
+
+    @property
+    def total(self):
+        return perf_counter() - self.start
+
+    def header(self):
+        return (f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries", '
+                f'template;dur={self.template * 1000:.1f}, total;dur={self.total * 1000:.1f}')
+
+
+def record_query(execute, sql, params, many, context):
+    timings = current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings(execute, sql, params, many, context)
+
+
+def install(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class TimedTemplate:
+    """Template do backend do Django que soma o tempo de render à requisição."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        timings = current.get()
+        if timings is None:
+            return self.template.render(context, request)
+        start = perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            timings.template += perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
@@ -0,0 +1,87 @@
+import logging
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Count
+
+from core.models import UNIQUE_KEYS, Agenda, unique_constraint
+
+# Chaves únicas opcionais por dono (core.models.UNIQUE_KEYS), criadas e
+# removidas por "manage.py unique_contacts".
+#
+# Elas não estão no Meta nem no estado das migrações, e no SQLite toda migração
+# que recria core_agenda (AddField, AlterField) as apaga. Por isso pre_migrate
+# anota as chaves presentes e post_migrate recria as que sumiram (core.signals);
+# se já houver duplicatas, o migrate avisa e a chave fica ausente.
+#
+# O upsert (AGENDA_UPSERT_KEY) depende da chave: sem ela o INSERT ... ON
+# CONFLICT falha. is_installed() guarda a resposta do banco por
+# AGENDA_UNIQUE_KEYS_TTL segundos: criada ou removida a chave por outro processo
+# (unique_contacts com os servidores no ar), o upsert liga ou desliga sozinho
+# nesse prazo, sem reiniciar. No próprio processo, install/uninstall já limpam.
+
+logger = logging.getLogger('core.unique_keys')
+
+DEFAULT_TTL = 60
+
+# (banco, chave) -> (instalada, válido até)
+_installed = {}
+
+
+def installed(using=DEFAULT_DB_ALIAS):
+    """Chaves de UNIQUE_KEYS presentes no banco (vazio se core_agenda não existe)."""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if Agenda._meta.db_table not in connection.introspection.table_names(cursor):
+            return set()
+        names = set(connection.introspection.get_constraints(cursor, Agenda._meta.db_table))
+    return {key for key in UNIQUE_KEYS if unique_constraint(key).name in names}
+
+
+def is_installed(key, using=DEFAULT_DB_ALIAS):
+    """Como installed(), para uma chave, relido do banco a cada AGENDA_UNIQUE_KEYS_TTL segundos."""
+    now = time.monotonic()
+    cached = _installed.get((using, key))
+    if cached is None or cached[1] <= now:
+        value = key in installed(using)
+        if not value and (cached is None or cached[0]):
+            logger.warning('Chave única %s ausente em %s: o upsert fica desligado '
+                           '(crie-a com "manage.py unique_contacts add --keys %s").', key, using, key)
+        ttl = getattr(settings, 'AGENDA_UNIQUE_KEYS_TTL', DEFAULT_TTL)
+        _installed[using, key] = cached = (value, now + ttl)
+    return cached[0]
+
+
+def duplicate_groups(key, using=DEFAULT_DB_ALIAS):
+    """Quantos grupos de contatos de um mesmo dono repetem a chave."""
+    return (Agenda.objects.using(using).values('owner', UNIQUE_KEYS[key])
+            .annotate(contatos=Count('id')).filter(contatos__gt=1).count())
+
+
+def install(keys, using=DEFAULT_DB_ALIAS):
+    with connections[using].schema_editor() as editor:
+        for key in keys:
+            # SQL direto: no SQLite, add_constraint refaz a tabela a partir
+            # do Meta, onde estas chaves não estão
+            editor.execute(unique_constraint(key).create_sql(Agenda, editor))
+    _installed.clear()
+
+
+def uninstall(keys, using=DEFAULT_DB_ALIAS):
+    with connections[using].schema_editor() as editor:
+        for key in keys:
+            editor.execute(unique_constraint(key).remove_sql(Agenda, editor))
+    _installed.clear()
+
+
+def restore(keys, using=DEFAULT_DB_ALIAS):
+    """Recria as chaves de keys que sumiram; retorna (recriadas, {chave: duplicatas})."""
+    missing = [key for key in keys if key not in installed(using)]
+    blocked = {key: duplicate_groups(key, using) for key in missing}
+    blocked = {key: groups for key, groups in blocked.items() if groups}
+    restored = [key for key in missing if key not in blocked]
+    if restored:
+        install(restored, using)
+    _installed.clear()
+    return restored, blocked
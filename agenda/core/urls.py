@@ -1,5 +1,10 @@
+from django.conf import settings
 from django.urls import path
-from core.views import login, logout, home, delete_contact, register_contact, edit_contact, show_contact
+from core import async_views
+from core.views import login, logout, home, delete_contact, register_contact, edit_contact, show_contact, search_contact, \
+    autocomplete_contact, contact_detail, import_contacts, \
+    export_contacts, cache_stats, throttle_stats, metrics_view, bulk_delete_contacts, bulk_edit_contacts, \
+    duplicate_contacts
 
 
 urlpatterns = [
@@ -8,7 +13,28 @@ urlpatterns = [
     path('index/', home, name='index'),
     path('register_contact/', register_contact , name='register_contact'),
     path('show_contact/', show_contact, name='show_contact'),
+    path('search_contact/', search_contact, name='search_contact'),
+    path('contacts/autocomplete/', autocomplete_contact, name='autocomplete_contact'),
+    path('contacts/<int:id>/', contact_detail, name='contact_detail'),
+    path('contacts/duplicates/', duplicate_contacts, name='duplicate_contacts'),
+    path('import_contacts/', import_contacts, name='import_contacts'),
+    path('export_contacts/', export_contacts, name='export_contacts'),
+    path('cache_stats/', cache_stats, name='cache_stats'),
+    path('throttle_stats/', throttle_stats, name='throttle_stats'),
     path('edit_contact/', edit_contact, name='edit_contact'),
     path('delete_contact/', delete_contact, name='delete_contact'),
-    path('', home,name='home')
-]
\ No newline at end of file
+    path('contacts/bulk_delete/', bulk_delete_contacts, name='bulk_delete_contacts'),
+    path('contacts/bulk_edit/', bulk_edit_contacts, name='bulk_edit_contacts'),
+    path('', home,name='home'),
+
+    # Versões assíncronas (ASGI), usadas também pelo benchmark_async_views
+    path('async/login/', async_views.login, name='async_login'),
+    path('async/logout/', async_views.logout, name='async_logout'),
+    path('async/register_contact/', async_views.register_contact, name='async_register_contact'),
+    path('async/show_contact/', async_views.show_contact, name='async_show_contact'),
+    path('async/edit_contact/', async_views.edit_contact, name='async_edit_contact'),
+    path('async/delete_contact/', async_views.delete_contact, name='async_delete_contact'),
+]
+
+if settings.AGENDA_METRICS:
+    urlpatterns.append(path('metrics', metrics_view, name='metrics'))
@@ -1,19 +1,68 @@
+import io
+import logging
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, IntegrityError
+from django.http import (HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse,
+                         StreamingHttpResponse)
 from django.shortcuts import render, redirect
+from django.utils import timezone
 from core.forms import LoginForm, AgendaForm
 from django.contrib.auth import login as auth_login, logout as auth_logout
 from django.contrib.auth.decorators import login_required
-from core.models import Agenda
+from django.views.decorators.http import condition, require_POST
+from core import bulk, cache as list_cache, metrics, throttle, write_queue
+from core.models import Agenda, AgendaVersion
+from core.dedup import DuplicateFinder
+from core.exporters import FORMATS, export_chunks
+from core.fts import full_text_search
+from core.importers import DATABASE_ERROR, DUPLICATE_ERROR, get_upsert_key, import_csv
+from core.pagination import keyset_paginate
+from core.replicas import read_alias, replica_reads
+from core.search import search_contacts
+
+SEARCH_LIMIT = 20
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+DUPLICATES_LIMIT = 50
+DUPLICATES_MAX_LIMIT = 500
+
+logger = logging.getLogger('core.views')
+
+# GET condicional das leituras: o marcador de modificação dos contatos do
+# usuário é lido uma vez por requisição e, se o cliente já tem a versão atual,
+# a resposta é 304 sem consultar os contatos nem renderizar o template.
+
+def _contacts_version(request):
+    if not hasattr(request, '_contacts_version'):
+        request._contacts_version = AgendaVersion.current(request.user.pk)
+    return request._contacts_version
+
+def _contacts_etag(request, *args, **kwargs):
+    return f'{_contacts_version(request).tag}-{request.user.pk}'
+
+def _contacts_last_modified(request, *args, **kwargs):
+    # Last-Modified tem resolução de um segundo: enviado no mesmo segundo da
+    # escrita, uma segunda escrita nesse segundo não mudaria a data, e quem só
+    # manda If-Modified-Since receberia um 304 desatualizado. Até o segundo
+    # virar, só o ETag vale.
+    updated_at = _contacts_version(request).updated_at
+    if int(updated_at.timestamp()) >= int(timezone.now().timestamp()):
+        return None
+    return updated_at
+
+contacts_condition = condition(etag_func=_contacts_etag, last_modified_func=_contacts_last_modified)
 
 def login(request):
     if request.user.is_authenticated:
         return redirect("home")
     if request.method == "POST":
-        form = LoginForm(request.POST)
+        form = LoginForm(request.POST, request=request)
         if form.is_valid():
             auth_login(request, form.user)
             return redirect("home")
         context = {'acesso_negado': True}
-        return render(request, 'login.html', {'form':form})
+        return render(request, 'login.html', {'form':form}, status=429 if form.throttled else 200)
     return render(request, 'login.html', {'form':LoginForm()})
 
         
@@ -29,6 +78,14 @@ def home(request):
     context = {}
     return render(request, 'index.html', context)
 
+def _register(contact):
+    """Grava o contato novo; no modo upsert, atualiza o do dono com a mesma chave."""
+    upsert_key = get_upsert_key()
+    if upsert_key:
+        Agenda.objects.upsert([contact], upsert_key)
+    else:
+        contact.save()
+
 @login_required
 def register_contact(request):
     context = {}
@@ -47,7 +104,20 @@ def register_contact(request):
 
         form = AgendaForm(data)
         if form.is_valid():
-            form.save()
+            contact = form.save(commit=False)
+            contact.owner = request.user
+            try:
+                write_queue.run(_register, contact)
+            except IntegrityError:
+                # Chave única do dono (unique_contacts) fora do modo upsert
+                form.add_error(None, DUPLICATE_ERROR)
+                context = {'error': True, 'form': form}
+                return render(request, 'register_contact.html', context)
+            except DatabaseError:
+                logger.exception('Falha ao gravar o contato')
+                form.add_error(None, DATABASE_ERROR)
+                context = {'error': True, 'form': form}
+                return render(request, 'register_contact.html', context)
             context = {'success': True, 'data': form}
             return redirect("home")
         else:
@@ -56,16 +126,193 @@ def register_contact(request):
     return render(request, 'register_contact.html', context)
 
 @login_required
+@replica_reads
+@contacts_condition
 def show_contact(request):
-    contacts = Agenda.objects.all().order_by('nome_completo')
-    context = {'contacts':contacts}
-    return render(request, 'show_contact.html', context)
+    key = list_cache.page_key(f'lista:{request.user.pk}', _contacts_version(request).tag, request.GET.dict())
+    content = list_cache.get_page(key)
+    if content is not None:
+        response = HttpResponse(content)
+        response['X-Cache'] = 'HIT'
+        return response
+    query = request.GET.get('q', '').strip()
+    page = keyset_paginate(
+        search_contacts(Agenda.objects.filter(owner=request.user), query),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        page_size=request.GET.get('page_size'),
+    )
+    context = {'contacts':page.items, 'page':page, 'query':query}
+    response = render(request, 'show_contact.html', context)
+    list_cache.set_page(key, response.content)
+    response['X-Cache'] = 'MISS'
+    return response
+
+@login_required
+def cache_stats(request):
+    return JsonResponse(list_cache.stats())
 
 @login_required
+def throttle_stats(request):
+    return JsonResponse(throttle.stats())
+
+def metrics_view(request):
+    # Lido pelo Prometheus, que não tem sessão: vale o IP, ou um usuário staff
+    if not (metrics.ip_allowed(request.META.get('REMOTE_ADDR')) or request.user.is_staff):
+        return HttpResponseForbidden()
+    extra = [('agenda_contacts', {}, AgendaVersion.total_rows())]
+    return HttpResponse(metrics.render(extra), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def _is_fuzzy(request):
+    return request.GET.get('fuzzy') in ('1', 'on', 'true')
+
+@login_required
+@replica_reads
+@contacts_condition
+def search_contact(request):
+    query = request.GET.get('q', '').strip()
+    fuzzy = _is_fuzzy(request)
+    contacts = Agenda.objects.filter(owner=request.user)
+    if not query:
+        contacts = []
+    elif fuzzy:
+        # Busca aproximada: nomes com a mesma pronúncia, pela chave fonética
+        contacts = list(search_contacts(contacts, query, fuzzy=True)
+                        .order_by('nome_completo', 'id')[:SEARCH_LIMIT])
+    else:
+        contacts = full_text_search(contacts, query, limit=SEARCH_LIMIT)
+    context = {'contacts':contacts, 'query':query, 'fuzzy':fuzzy}
+    return render(request, 'search_contact.html', context)
+
+@login_required
+@replica_reads
+@contacts_condition
+def autocomplete_contact(request):
+    query = request.GET.get('q', '')
+    try:
+        limit = int(request.GET.get('limit', AUTOCOMPLETE_LIMIT))
+    except ValueError:
+        limit = AUTOCOMPLETE_LIMIT
+    limit = max(1, min(limit, AUTOCOMPLETE_MAX_LIMIT))
+    results = (search_contacts(Agenda.objects.filter(owner=request.user), query, fuzzy=_is_fuzzy(request))
+               .order_by('nome_completo', 'id')
+               .values('id', 'nome_completo')[:limit])
+    return JsonResponse({'results': list(results)})
+
+@login_required
+@replica_reads
+@contacts_condition
+def contact_detail(request, id):
+    contact = (Agenda.objects.filter(id=id, owner=request.user)
+               .values('id', 'nome_completo', 'telefone', 'email', 'observacao')
+               .first())
+    if contact is None:
+        return JsonResponse({'error': "Contato não encontrado."}, status=404)
+    return JsonResponse(contact)
+
+@login_required
+@replica_reads
+@contacts_condition
+def duplicate_contacts(request):
+    try:
+        limit = int(request.GET.get('limit', DUPLICATES_LIMIT))
+    except ValueError:
+        limit = DUPLICATES_LIMIT
+    limit = max(1, min(limit, DUPLICATES_MAX_LIMIT))
+    try:
+        offset = max(0, int(request.GET.get('offset', 0)))
+    except ValueError:
+        offset = 0
+    finder = DuplicateFinder()
+    # Os grupos só mudam com uma escrita nos contatos: guardados pela versão
+    # do marcador, cada página só descreve os seus
+    key = list_cache.page_key(f'duplicatas:{request.user.pk}', _contacts_version(request).tag, {})
+    clusters = list_cache.get_or_set(
+        key, lambda: list(finder.clusters(Agenda.objects.filter(owner=request.user))))
+    end = offset + limit
+    return JsonResponse({
+        'count': len(clusters),
+        'next_offset': end if end < len(clusters) else None,
+        'clusters': list(finder.describe(clusters[offset:end])),
+    })
+
+@login_required
+def import_contacts(request):
+    context = {}
+    if request.method == "POST":
+        upload = request.FILES.get('arquivo')
+        if upload is None:
+            context = {'error': True, 'errors': "Selecione um arquivo CSV."}
+            return render(request, 'import_contacts.html', context)
+        # O arquivo é lido em fluxo, sem carregar o conteúdo inteiro na memória
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            report = import_csv(stream, request.user, upsert_key=get_upsert_key())
+        except (ValidationError, UnicodeDecodeError) as error:
+            message = ' '.join(error.messages) if isinstance(error, ValidationError) \
+                else "O arquivo deve estar codificado em UTF-8."
+            context = {'error': True, 'errors': message}
+            return render(request, 'import_contacts.html', context)
+        except DatabaseError:
+            # Os lotes anteriores ao que falhou ficam gravados
+            logger.exception('Falha ao importar contatos')
+            context = {'error': True, 'errors': DATABASE_ERROR}
+            return render(request, 'import_contacts.html', context)
+        finally:
+            stream.detach()
+        context = {'success': True, 'report': report}
+    return render(request, 'import_contacts.html', context)
+
+@login_required
+@replica_reads
+def export_contacts(request):
+    format = request.GET.get('format', 'csv')
+    if format not in FORMATS:
+        return HttpResponseBadRequest("Formato inválido. Use csv, jsonl ou vcard.")
+    content_type, extension = FORMATS[format]
+    # A resposta é lida depois que a view retorna: a réplica fica presa na consulta
+    queryset = Agenda.objects.filter(owner=request.user).using(read_alias())
+    response = StreamingHttpResponse(export_chunks(format, queryset), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="contatos.{extension}"'
+    return response
+
+@login_required
+@require_POST
+def bulk_delete_contacts(request):
+    try:
+        queryset, ids, _ = bulk.parse_request(request.body, Agenda.objects.filter(owner=request.user))
+    except ValidationError as error:
+        return JsonResponse({'error': ' '.join(error.messages)}, status=400)
+    return JsonResponse({'affected': bulk.delete_contacts(queryset, ids)})
+
+@login_required
+@require_POST
+def bulk_edit_contacts(request):
+    try:
+        queryset, ids, data = bulk.parse_request(request.body, Agenda.objects.filter(owner=request.user))
+        fields, errors = bulk.clean_fields(data.get('fields'))
+    except ValidationError as error:
+        return JsonResponse({'error': ' '.join(error.messages)}, status=400)
+    if errors:
+        return JsonResponse({'errors': errors}, status=400)
+    try:
+        affected = bulk.update_contacts(queryset, fields, ids)
+    except IntegrityError:
+        # O mesmo e-mail ou telefone em vários contatos, com a chave única do dono
+        # (unique_contacts); os blocos anteriores ao que falhou ficam gravados
+        return JsonResponse({'error': DUPLICATE_ERROR}, status=409)
+    return JsonResponse({'affected': affected})
+
+def _parse_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+@login_required
+@replica_reads
 def edit_contact(request):
     context = {}
-    contacts = Agenda.objects.all().order_by('id')
-    context = {'contacts':contacts}
     if request.method == "POST":
         id = request.POST.get('id')
         nome = request.POST.get('nome_completo')
@@ -75,9 +322,6 @@ def edit_contact(request):
         if not id:
             context = {'error': True, 'errors': "ID nao encontrado."}
             return render(request, 'edit_contact.html', context)
-        if not Agenda.objects.filter(id=id).exists():
-            context = {'error': True, 'errors': "Contato nao encontrado."}
-            return render(request, 'edit_contact.html', context)
         data = {
             'nome_completo': nome,
             'telefone': telefone,
@@ -86,40 +330,43 @@ def edit_contact(request):
         }
 
         form = AgendaForm(data)
+        pk = _parse_id(id)
         if form.is_valid():
-            agenda = Agenda.objects.get(id=id)
-            agenda.nome_completo = nome
-            agenda.telefone = telefone
-            agenda.email = email
-            agenda.observacao = observacao
-            agenda.save()
-            context = {'success': True, 'data': form}
-            return redirect("home")
-        else:
-            context = {'error': True, 'form': form, 'contacts':contacts}
+            # Um único UPDATE; nenhuma linha afetada significa contato inexistente
+            updated = pk is not None and write_queue.run(
+                Agenda.objects.filter(id=pk, owner=request.user).update_contact, **form.cleaned_data)
+            if updated:
+                context = {'success': True, 'data': form}
+                return redirect("home")
+            context = {'error': True, 'errors': "Contato nao encontrado."}
             return render(request, 'edit_contact.html', context)
+        if pk is None or not Agenda.objects.filter(id=pk, owner=request.user).exists():
+            context = {'error': True, 'errors': "Contato nao encontrado."}
+            return render(request, 'edit_contact.html', context)
+        context = {'error': True, 'form': form}
+        return render(request, 'edit_contact.html', context)
     if request.method == "GET":
-        context = {'contacts':contacts}
         return render(request, 'edit_contact.html', context)
     return render(request, 'edit_contact.html', context)
 
 @login_required
+@replica_reads
 def delete_contact(request):
     context = {}
     if request.method == "GET":
-        contacts = Agenda.objects.all().order_by('id')
-        context = {'contacts':contacts}
         return render(request, 'delete_contact.html', context)
     if request.method == "POST":
         id = request.POST.get('id')
         if not id:
             context = {'error': True, 'errors': "ID não encontrado."}
             return render(request, 'delete_contact.html', context)
-        if not Agenda.objects.filter(id=id).exists():
+        pk = _parse_id(id)
+        # Um único DELETE; nenhuma linha afetada significa contato inexistente
+        contacts = Agenda.objects.filter(id=pk, owner=request.user)
+        deleted = write_queue.run(contacts.delete)[0] if pk is not None else 0
+        if not deleted:
             context = {'error': True, 'errors': "Contato não encontrado."}
             return render(request, 'delete_contact.html', context)
-        agenda = Agenda.objects.get(id=id)
-        agenda.delete()
         context = {'success': True}
         return redirect("home")
-    return render(request, 'delete_contact.html', context)
\ No newline at end of file
+    return render(request, 'delete_contact.html', context)
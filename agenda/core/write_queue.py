@@ -0,0 +1,172 @@
+import asyncio
+import contextvars
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from time import monotonic
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import OperationalError, close_old_connections, transaction
+
+# Fila de escritas do processo (AGENDA_WRITE_QUEUE). Uma thread única executa
+# as escritas das views e agrupa as que chegam juntas numa só transação: no
+# SQLite, as threads do processo deixam de disputar a trava de escrita e o
+# commit (com o fsync do WAL) é pago uma vez por grupo. Cada escrita roda num
+# savepoint, então a falha de uma não desfaz as outras do grupo; quem enviou
+# só recebe o resultado depois do commit.
+#
+# A escrita roda em outra thread e em outra conexão: não envie escritas de
+# dentro de um transaction.atomic(), que não as veria nem as desfaria.
+#
+# Quem envia espera no máximo AGENDA_WRITE_QUEUE_TIMEOUT segundos e recebe
+# WriteQueueTimeout, um erro de banco como os que as views já tratam. Se a
+# thread não puder ser iniciada, a escrita é feita direto, na thread de quem
+# enviou.
+
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_WAIT_MS = 2
+DEFAULT_TIMEOUT = 30
+
+
+class WriteQueueTimeout(OperationalError):
+    pass
+
+
+def enabled():
+    return getattr(settings, 'AGENDA_WRITE_QUEUE', False)
+
+
+class WriteQueue:
+    def __init__(self, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        if threading.current_thread() is self._thread:
+            # Escrita disparada por outra escrita (ex.: um signal): já está no grupo
+            future.set_result(fn(*args, **kwargs))
+            return future
+        if not self._start():
+            future.set_result(fn(*args, **kwargs))
+            return future
+        # O contexto vai junto: as consultas contam na medição da requisição (core.timing)
+        self._queue.put((future, contextvars.copy_context(), fn, args, kwargs))
+        return future
+
+    def _start(self):
+        """Garante a thread de escrita viva; False se ela não pôde ser iniciada."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                thread = threading.Thread(target=self._run, name='agenda-write-queue', daemon=True)
+                try:
+                    thread.start()
+                except RuntimeError:
+                    # Sem threads novas (limite do sistema, interpretador encerrando)
+                    return False
+                self._thread = thread
+            return True
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get(timeout=max(deadline - monotonic(), 0)))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                close_old_connections()
+                self._commit(batch)
+            except Exception as error:
+                for future, *_ in batch:
+                    if not future.done():
+                        future.set_exception(error)
+            finally:
+                close_old_connections()
+
+    def _commit(self, batch):
+        outcomes = []
+        try:
+            with transaction.atomic():
+                for future, context, fn, args, kwargs in batch:
+                    if not future.set_running_or_notify_cancel():
+                        outcomes.append(None)
+                        continue
+                    try:
+                        with transaction.atomic():
+                            outcomes.append((True, context.run(fn, *args, **kwargs)))
+                    except Exception as error:
+                        outcomes.append((False, error))
+        except Exception as error:
+            # Falha no BEGIN ou no COMMIT: nenhuma escrita do grupo foi gravada
+            outcomes = [outcome and (False, error) for outcome in outcomes]
+            outcomes += [(False, error)] * (len(batch) - len(outcomes))
+        for (future, *_), outcome in zip(batch, outcomes):
+            if outcome is None or future.done():
+                continue
+            ok, value = outcome
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+
+_write_queue = None
+_write_queue_lock = threading.Lock()
+
+
+def get_queue():
+    global _write_queue
+    with _write_queue_lock:
+        if _write_queue is None:
+            _write_queue = WriteQueue(
+                getattr(settings, 'AGENDA_WRITE_QUEUE_MAX_BATCH', DEFAULT_MAX_BATCH),
+                getattr(settings, 'AGENDA_WRITE_QUEUE_MAX_WAIT_MS', DEFAULT_MAX_WAIT_MS),
+            )
+        return _write_queue
+
+
+def get_timeout():
+    return getattr(settings, 'AGENDA_WRITE_QUEUE_TIMEOUT', DEFAULT_TIMEOUT)
+
+
+def _timed_out(future, timeout):
+    # Cancelada, a escrita não roda mais; se já começou, pode ainda ser gravada
+    future.cancel()
+    return WriteQueueTimeout(f'A fila de escritas não respondeu em {timeout} s.')
+
+
+def run(fn, *args, **kwargs):
+    """Executa a escrita pela fila, se ligada, ou direto; devolve o resultado de fn.
+
+    WriteQueueTimeout se a fila não responder em AGENDA_WRITE_QUEUE_TIMEOUT segundos.
+    """
+    if not enabled():
+        return fn(*args, **kwargs)
+    future = get_queue().submit(fn, *args, **kwargs)
+    timeout = get_timeout()
+    try:
+        return future.result(timeout)
+    except FutureTimeoutError:
+        raise _timed_out(future, timeout) from None
+
+
+async def arun(fn, *args, **kwargs):
+    if not enabled():
+        return await sync_to_async(fn)(*args, **kwargs)
+    future = get_queue().submit(fn, *args, **kwargs)
+    timeout = get_timeout()
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+    except asyncio.TimeoutError:
+        raise _timed_out(future, timeout) from None